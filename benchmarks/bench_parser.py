@@ -0,0 +1,216 @@
+"""
+Wiki table parser benchmark over the stored cell corpus (benchmarks/wiki_cell_corpus.json).
+
+Run from the repository root:
+    python -m benchmarks.bench_parser [--cells 200000] [--repeat 3]
+    python -m benchmarks.bench_parser --write-corpus [--seed 0]
+
+The corpus holds 'wiki' cells in the formats of the Recipes table and 'fuzz' cells:
+seeded variations of them (spacing, separators, number formats, casing, missing parts,
+empty cells). Each entry stores the raw cell and its expected parse.
+
+The benchmark replicates the corpus to --cells cells per column. It times the per-cell
+functions (scrub_table_data then parse_* on every cell) against the batch column
+parser used by update_recipes_table_from_html, and prints the coverage report of
+formats, including the unmatched ones.
+--write-corpus regenerates the fuzz cells and the expected parses with the current parser.
+"""
+import argparse, json, os, sys, time
+import numpy as np
+import pandas as pd
+import lib.scrape_data as scrape_data
+import lib.wiki_parser as wiki_parser
+
+DEFAULT_CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wiki_cell_corpus.json")
+
+# Cells in the formats of the wiki Recipes table (before scrub_table_data)
+WIKI_CELLS = {
+    "Ingredients": [
+        "30 × Iron Ore30 / min", "3 × Iron Ingot\xa015 / min", "1 × Iron Rod10 / min",
+        "6 × Iron Plate30 / min12 × Screw60 / min", "2 × Copper Ingot\xa010 / min",
+        "3 × Crude Oil\xa030 / min", "8 × Heavy Oil Residue\xa040 / min",
+        "5 × Reinforced Iron Plate3 / min20 × Rotor\xa012 / min",
+        "16 × Alclad Aluminum Sheet\xa07.5 / min", "1,200 × Water1,200 / min",
+        "2 × Quartz Crystal\xa022.5 / min3 × Coal\xa045 / min", "",
+        "Craft Bench × 4", "4 × Caterium Ore\xa045 / min",
+    ],
+    "Products": [
+        "30 × Iron Ingot30 / min", "2 × Iron Plate\xa020 / min", "4 × Screw\xa040 / min",
+        "2 × Plastic\xa020 / min1 × Heavy Oil Residue\xa010 / min", "1 × Fuel\xa040 / min",
+        "1 × Reinforced Iron Plate\xa05 / min", "3 × Cable\xa030 / min",
+        "1,000 × Nitrogen Gas\xa01,000 / min", "0.5 × Turbo Fuel\xa018.75 / min",
+    ],
+    "Produced in": [
+        "Smelter 2 sec", "Constructor 4 sec", "Assembler 12 sec", "Manufacturer 60 sec", "Refinery 6 sec",
+        "Foundry 4 sec", "Blender 6 sec", "Packager 2 sec", "Converter 6 sec",
+        "Particle Accelerator 8 sec 250 - 750 MW", "Particle Accelerator 20 sec 500 - 1,500 MW",
+        "Quantum Encoder 60 sec 0 - 2,000 MW", "Nuclear Power Plant 300 sec", "Smelter 2.5 sec",
+        "Craft Bench × 4 Constructor 4 sec", "Equipment Workshop × 10", "Hadron Collider 8 sec 1,000 MW",
+        "Build Gun", "",
+    ],
+    "Unlocked by": [
+        ("Iron Ingot", "Onboarding"), ("Screw", "Tier 0 - HUB Upgrade 3"), ("Wire", "Tier 0 - HUB Upgrade 2"),
+        ("Reinforced Iron Plate", "Tier 2 - Part Assembly"), ("Plastic", "Tier 5 - Oil Processing"),
+        ("Caterium Ingot", "MAM Caterium - Caterium"), ("Quickwire", "MAM Caterium - Quickwire"),
+        ("Silica", "Tier 5 - Oil Processing OR MAM Quartz - Silica"),
+        ("Bolted Iron Plate Alternate", "Tier 2 - Part Assembly"), ("Cast Screw Alternate", "Hard Drive"),
+        ("Iron Wire Alternate", "MAM Caterium - Caterium"), ("Nobelisk", "MAM Sulfur - The Nobelisk Detonator"),
+        ("Biomass (Leaves)", "Tier 0 - HUB Upgrade 6"), ("Portable Miner", "Tier 0 - HUB Upgrade 1"),
+        ("Power Shard", "MAM Power Slugs - Slug Scanning"), ("Unknown", "Quest Reward"),
+    ],
+}
+
+# --- Fuzzing ---
+
+_FUZZ_STEPS = [
+    lambda s, rng: s.replace(" ", "  "),
+    lambda s, rng: s.replace(" ", "\xa0"),
+    lambda s, rng: s.replace("×", "x"),
+    lambda s, rng: s.replace("×", "X"),
+    lambda s, rng: s.replace(" - ", " – "),
+    lambda s, rng: s.replace(" - ", "-"),
+    lambda s, rng: s.replace("sec", "Sec"),
+    lambda s, rng: s.replace("MW", "mw"),
+    lambda s, rng: s.replace("/ min", "/min"),
+    lambda s, rng: s.replace("0", "0,000") if rng.random() < 0.5 else s.replace("0", "0.25"),
+    lambda s, rng: s.upper(),
+    lambda s, rng: s + " [1]",
+    lambda s, rng: "  " + s + "\n",
+    lambda s, rng: s[: int(rng.integers(0, max(len(s), 1)))],
+    lambda s, rng: s.replace("Iron", "Iron 2"),
+    lambda s, rng: "Craft Bench × " + str(int(rng.integers(1, 20))) + " " + s,
+]
+
+def fuzz_cells(cells, n, seed=0):
+    # n variations of the cells, each with one to three random fuzz steps
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n):
+        cell = cells[int(rng.integers(0, len(cells)))]
+        for step in rng.choice(len(_FUZZ_STEPS), size=int(rng.integers(1, 4)), replace=False):
+            cell = _FUZZ_STEPS[step](cell, rng)
+        out.append(cell)
+    return out
+
+def parse_cells(column, cells, recipes, report):
+    """
+    Scrubs and parses the cells of one column (recipes are the recipe names of the
+    'Unlocked by' cells), recording them in report with their positions as labels.
+    """
+    scrubbed = wiki_parser.scrub_column(cells)
+    labels = range(len(cells))
+    if column == "Unlocked by":
+        return wiki_parser.parse_unlocked_column(wiki_parser.scrub_column(recipes), scrubbed, report, labels)
+    if column == "Produced in":
+        return wiki_parser.parse_machine_column(scrubbed, scrape_data.MACHINE_POWER_CONSUMPTION, report, labels)
+    return wiki_parser.parse_materials_column(scrubbed, report, column, labels)
+
+def corpus_report(entries) -> wiki_parser.ParseReport:
+    # Formats and failures of the corpus cells, per column
+    report = wiki_parser.ParseReport()
+    for column in WIKI_CELLS:
+        cells = [e for e in entries if e["column"] == column]
+        parse_cells(column, [e["cell"] for e in cells], [e.get("recipe") for e in cells], report)
+    return report
+
+def build_corpus(seed=0, n_fuzz=150) -> list:
+    """
+    Corpus entries {"column", "source", "cell", "recipe" (Unlocked by only), "expected", "failed"}:
+    the wiki cells, fuzzed variations and a missing (None) cell per column, with the parse
+    of the current batch parser as "expected" and "failed" set when it reported the cell.
+    """
+    entries = []
+    for column, cells in WIKI_CELLS.items():
+        if column == "Unlocked by":
+            names = [name for name, _ in cells]
+            raw = [cell for _, cell in cells]
+            fuzzed = fuzz_cells(raw, n_fuzz, seed)
+            rng = np.random.default_rng(seed + 1)
+            fuzzed_names = [names[int(i)] if rng.random() < 0.8 else names[int(i)] + " Alternate"
+                            for i in rng.integers(0, len(names), n_fuzz)]
+            rows = [("wiki", n, c) for n, c in cells] + [("fuzz", n, c) for n, c in zip(fuzzed_names, fuzzed)] + \
+                   [("fuzz", "Iron Plate", None), ("fuzz", "Iron Plate Alternate", None)]
+        else:
+            rows = [("wiki", None, c) for c in cells] + [("fuzz", None, c) for c in fuzz_cells(cells, n_fuzz, seed)] + \
+                   [("fuzz", None, None)]
+        report = wiki_parser.ParseReport()
+        parsed = parse_cells(column, [cell for _, _, cell in rows], [name for _, name, _ in rows], report)
+        failed = {row for row, _, _ in report.failures.get(column, [])}
+        for i, ((source, name, cell), value) in enumerate(zip(rows, parsed)):
+            entry = {"column": column, "source": source, "cell": cell, "expected": value, "failed": i in failed}
+            if column == "Unlocked by":
+                entry["recipe"] = name
+            entries.append(entry)
+    return entries
+
+def read_corpus(corpus_file=DEFAULT_CORPUS_FILE) -> list:
+    with open(corpus_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_corpus(entries, corpus_file=DEFAULT_CORPUS_FILE):
+    with open(corpus_file, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=1, ensure_ascii=False)
+
+# --- Benchmark ---
+
+def corpus_table(entries, n_cells) -> pd.DataFrame:
+    # A Recipes-like table of n_cells rows whose columns cycle through the corpus cells of each column
+    columns = {}
+    for column in ("Ingredients", "Products", "Produced in", "Unlocked by"):
+        cells = [e for e in entries if e["column"] == column]
+        picks = [cells[i % len(cells)] for i in range(n_cells)]
+        columns[column] = [e["cell"] for e in picks]
+        if column == "Unlocked by":
+            columns["Recipe"] = [e["recipe"] for e in picks]
+    return pd.DataFrame(columns)[scrape_data.DEFAULT_RECIPE_DF_COLS]
+
+def parse_per_cell(table: pd.DataFrame):
+    # The per-cell path: scrub every cell, then one parse call per cell
+    df = table.map(scrape_data.scrub_table_data)
+    products = [scrape_data.parse_materials(s) for s in df["Products"]]
+    ingredients = [scrape_data.parse_materials(s) for s in df["Ingredients"]]
+    produced_in = [scrape_data.parse_machine_and_power(s) for s in df["Produced in"]]
+    unlocked = [scrape_data.parse_unlocked_by(name, s) for name, s in zip(df["Recipe"], df["Unlocked by"])]
+    return products, ingredients, produced_in, unlocked
+
+def parse_batch(table: pd.DataFrame):
+    return wiki_parser.parse_recipe_table(table, scrape_data.MACHINE_POWER_CONSUMPTION, drop_unproduced=False)
+
+def _best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_FILE)
+    parser.add_argument("--cells", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--write-corpus", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.write_corpus:
+        entries = build_corpus(args.seed)
+        write_corpus(entries, args.corpus)
+        print(f"Wrote {len(entries)} corpus cells to {args.corpus}")
+        return 0
+
+    entries = read_corpus(args.corpus)
+    table = corpus_table(entries, args.cells)
+    per_cell = _best_of(lambda: parse_per_cell(table), args.repeat)
+    batch = _best_of(lambda: parse_batch(table), args.repeat)
+    n = len(table) * 5
+    print(f"{len(table)} rows ({n} cells), best of {args.repeat}:")
+    print(f"  per-cell functions {per_cell:8.3f} s  {n / per_cell:12,.0f} cells/s")
+    print(f"  batch parser       {batch:8.3f} s  {n / batch:12,.0f} cells/s  ({per_cell / batch:.1f}x)")
+    print()
+    print("Corpus coverage:")
+    print(corpus_report(entries).format_report())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
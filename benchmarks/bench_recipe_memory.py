@@ -0,0 +1,73 @@
+"""
+Memory benchmark: list-of-dicts recipes (as loaded from JSON) vs the array-backed RecipeStore.
+
+Run from the repository root:
+    python -m benchmarks.bench_recipe_memory [json_file] [--scale N]
+
+--scale replicates the recipe set N times (with renamed recipes/materials) to
+approximate large modded datasets. Without a scraped recipe file (the default
+json_file is missing) a synthetic set of SYNTHETIC_RECIPES recipes is used instead.
+"""
+import argparse, copy, gc, json, os, tracemalloc
+import lib.scrape_data as scrape_data
+from lib.recipe_store import RecipeStore
+from benchmarks.synthetic_recipes import generate_recipes
+
+SYNTHETIC_RECIPES = 1000
+
+def scaled_recipes(recipes, scale):
+    if scale <= 1:
+        return recipes
+    out = []
+    for k in range(scale):
+        for recipe in recipes:
+            r = copy.deepcopy(recipe)
+            r["Recipe"] = f"{r['Recipe']} #{k}"
+            for field in ("Ingredients", "Products"):
+                for item in r.get(field) or []:
+                    item["Material"] = f"{item['Material']} #{k}"
+            out.append(r)
+    return out
+
+def measure(build):
+    # Returns (retained bytes, peak bytes, result) of build() under tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained, peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("json_file", nargs="?")
+    parser.add_argument("--scale", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.json_file is not None:
+        if not os.path.exists(args.json_file):
+            parser.error(f"recipe file not found: {args.json_file}")
+        recipes = scrape_data.load_recipes_from_json(args.json_file)
+    elif os.path.exists(scrape_data.DEFAULT_RECIPE_JSON_FILE):
+        recipes = scrape_data.load_recipes_from_json(scrape_data.DEFAULT_RECIPE_JSON_FILE)
+    else:
+        print(f"{scrape_data.DEFAULT_RECIPE_JSON_FILE} not found, using {SYNTHETIC_RECIPES} synthetic recipes")
+        recipes = generate_recipes(SYNTHETIC_RECIPES)
+    recipes = scaled_recipes(recipes, args.scale)
+    payload = json.dumps(recipes)
+    del recipes
+
+    dicts_retained, dicts_peak, recipes = measure(lambda: json.loads(payload))
+    store_retained, store_peak, store = measure(lambda: RecipeStore.from_records(json.loads(payload)))
+    _, _, materials_df = measure(lambda: scrape_data.get_materials_df(store))
+
+    print(f"Recipes: {len(recipes)}  Materials: {len(materials_df)}")
+    print(f"{'Representation':<24}{'Retained (KiB)':>16}{'Peak (KiB)':>14}")
+    print(f"{'list of dicts':<24}{dicts_retained / 1024:>16.1f}{dicts_peak / 1024:>14.1f}")
+    print(f"{'RecipeStore':<24}{store_retained / 1024:>16.1f}{store_peak / 1024:>14.1f}")
+    print(f"RecipeStore arrays: {store.nbytes / 1024:.1f} KiB")
+    print(f"Materials DataFrame (deep): {materials_df.memory_usage(deep=True).sum() / 1024:.1f} KiB")
+    print(f"Retained ratio (store / dicts): {store_retained / max(dicts_retained, 1):.2f}")
+
+if __name__ == "__main__":
+    main()
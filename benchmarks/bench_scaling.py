@@ -0,0 +1,221 @@
+"""
+Scaling benchmark over synthetic recipe sets (see benchmarks/synthetic_recipes.py).
+
+Run from the repository root:
+    python -m benchmarks.bench_scaling [--sizes 100 1000 10000 100000] [--repeat 3]
+                                       [--save-baseline] [--tolerance 0.5] [--no-memory]
+
+Times each phase at every size, best of --repeat runs:
+    load          RecipeStore.from_json of the generated file
+    materials_df  get_materials_df
+    unlock_filter unlocked_mask + subset for a mid-game options profile
+    model_build   CompiledRecipeModel
+    lp_build      PuLP problem construction ("lp.build" profiling span)
+    solve         CBC solve of three end materials ("lp.solve" profiling span)
+    diff          get_recipe_diffs against a version with 1% changed/removed/added recipes
+
+Results are compared with the stored baselines (benchmarks/baselines.json): a phase
+regresses when it is slower than its baseline by more than --tolerance (relative) and
+MIN_REGRESSION_S (absolute). The exit status is 1 if any phase regressed.
+--save-baseline stores the results of this run as the new baselines instead.
+
+Memory is measured in a separate run per size, in a fresh process so its peak RSS
+covers only the phases: the tracemalloc peak of each phase and the process peak RSS
+(the CBC subprocess is not included). Sizes listed in MEMORY_BUDGETS_MIB fail the run
+when a phase or the peak RSS exceeds its budget.
+"""
+import argparse, json, multiprocessing, os, platform, sys, tempfile
+from concurrent.futures import ProcessPoolExecutor
+import pulp
+import lib.scrape_data as scrape_data
+import lib.profiling as profiling
+from lib.recipe_store import RecipeStore
+from lib.recipe_optimization import CompiledRecipeModel
+from benchmarks.synthetic_recipes import generate_recipes, end_materials, mutate_recipes
+
+DEFAULT_SIZES      = [100, 1000, 10000, 100000]
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+PHASES             = ["load", "materials_df", "unlock_filter", "model_build", "lp_build", "solve", "diff"]
+MIN_REGRESSION_S   = 0.005  # differences below this are timer noise at the small sizes
+SPAN_NAMES         = {"lp_build": "lp.build", "solve": "lp.solve"}  # phases timed by the solver's own spans
+# Peak traced allocations per phase and process peak RSS, in MiB
+# (about 1.5x the measurements on x86_64 Linux, Python 3.11)
+MEMORY_BUDGETS_MIB = {
+    10000:  {"load": 36, "materials_df": 2, "unlock_filter": 1.5, "model_build": 6, "lp_build": 15,
+             "solve": 18, "diff": 66, "peak_rss": 320},
+    100000: {"load": 360, "materials_df": 24, "unlock_filter": 16, "model_build": 60, "lp_build": 150,
+             "solve": 185, "diff": 660, "peak_rss": 2100},
+}
+OPTIONS            = {"tier": 5, "sections": ["Tier 5 Section 1", "Tier 5 Section 2"],
+                      "mam": {"Research 1": [f"Research 1 Node {i}" for i in range(1, 9)]}, "alternate": []}
+
+def run_once(recipe_file, new_recipe_file, demand):
+    # Runs every phase once, each in a profiling span named after it (see SPAN_NAMES)
+    with profiling.span("load"):
+        store = RecipeStore.from_json(recipe_file)
+    with profiling.span("materials_df"):
+        scrape_data.get_materials_df(store)
+    with profiling.span("unlock_filter"):
+        store.subset(store.unlocked_mask(OPTIONS))
+    with profiling.span("model_build"):
+        model = CompiledRecipeModel(store)
+    model.solve_demand(demand, pulp.PULP_CBC_CMD(msg=False))
+    with profiling.span("diff"):
+        scrape_data.get_recipe_diffs(recipe_file, new_recipe_file)
+
+def _phase_seconds(since) -> dict:
+    names = {SPAN_NAMES.get(phase, phase): phase for phase in PHASES}
+    seconds = dict.fromkeys(PHASES, 0.0)
+    for name, _, duration, *_ in profiling.spans(since):
+        if name in names:
+            seconds[names[name]] += duration / 1e9
+    return seconds
+
+def measure_memory(recipe_file, new_recipe_file, demand) -> dict:
+    """
+    {phase: peak traced MiB, "peak_rss": MiB} of one run with memory profiling.
+    Meant to run in a fresh process (see run_size).
+    """
+    profiling.enable(memory=True)
+    run_once(recipe_file, new_recipe_file, demand)
+    memory = profiling.memory_by_phase()
+    result = {phase: memory[SPAN_NAMES.get(phase, phase)][1] / 2**20 for phase in PHASES}
+    rss = profiling.peak_rss()
+    if rss is not None:
+        result["peak_rss"] = rss / 2**20
+    return result
+
+def run_size(n_recipes, repeat, workdir, seed=0, measure_memory_usage=True):
+    """
+    Generates a recipe set of n_recipes (and its mutated version for the diff) and
+    returns ({phase: best seconds over repeat runs}, measure_memory result or None).
+    """
+    recipes = generate_recipes(n_recipes, seed=seed)
+    demand = {mat: 10.0 for mat in end_materials(recipes)}
+    recipe_file = os.path.join(workdir, f"recipes_{n_recipes}.json")
+    new_recipe_file = os.path.join(workdir, f"recipes_{n_recipes}_new.json")
+    with open(recipe_file, "w", encoding="utf-8") as f:
+        json.dump(recipes, f)
+    with open(new_recipe_file, "w", encoding="utf-8") as f:
+        json.dump(mutate_recipes(recipes, seed=seed + 1), f)
+    del recipes
+
+    was_enabled = profiling.is_enabled()
+    profiling.enable()
+    try:
+        runs = []
+        for _ in range(repeat):
+            mark = profiling.mark()
+            run_once(recipe_file, new_recipe_file, demand)
+            runs.append(_phase_seconds(mark))
+    finally:
+        profiling.enable(was_enabled)
+        profiling.reset()
+    timings = {phase: min(run[phase] for run in runs) for phase in PHASES}
+
+    memory = None
+    if measure_memory_usage:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            memory = pool.submit(measure_memory, recipe_file, new_recipe_file, demand).result()
+    return timings, memory
+
+def find_regressions(results: dict, baselines: dict, tolerance: float) -> list:
+    """
+    (size, phase, baseline s, current s) for every phase slower than its baseline by more
+    than tolerance (relative) and MIN_REGRESSION_S. Sizes/phases without a baseline are skipped.
+    """
+    regressions = []
+    for size, timings in results.items():
+        base = baselines.get(str(size), {})
+        for phase, seconds in timings.items():
+            if phase in base and seconds > base[phase] * (1.0 + tolerance) and seconds - base[phase] > MIN_REGRESSION_S:
+                regressions.append((size, phase, base[phase], seconds))
+    return regressions
+
+def find_budget_overruns(memory: dict) -> list:
+    # (size, phase, budget MiB, measured MiB) for every measurement above MEMORY_BUDGETS_MIB
+    overruns = []
+    for size, usage in memory.items():
+        for phase, budget in MEMORY_BUDGETS_MIB.get(size, {}).items():
+            if usage.get(phase, 0.0) > budget:
+                overruns.append((size, phase, budget, usage[phase]))
+    return overruns
+
+def format_memory(memory: dict) -> str:
+    columns = PHASES + ["peak_rss"]
+    lines = ["Peak memory (MiB, budget in brackets):", f"{'Recipes':>8}  " + "".join(f"{c:>20}" for c in columns)]
+    for size, usage in memory.items():
+        budgets = MEMORY_BUDGETS_MIB.get(size, {})
+        cells = []
+        for column in columns:
+            text = "-" if column not in usage else f"{usage[column]:.1f}"
+            if column in budgets:
+                text += f" [{budgets[column]}]"
+            cells.append(f"{text:>20}")
+        lines.append(f"{size:>8}  " + "".join(cells))
+    return "\n".join(lines)
+
+def read_baselines(baseline_file=DEFAULT_BASELINE_FILE) -> dict:
+    if not os.path.exists(baseline_file):
+        return {}
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+def write_baselines(results: dict, baseline_file=DEFAULT_BASELINE_FILE):
+    # Merges into the stored baselines so a run over some sizes keeps the others
+    merged = read_baselines(baseline_file)
+    merged.update({str(size): timings for size, timings in results.items()})
+    with open(baseline_file, "w", encoding="utf-8") as f:
+        json.dump({"machine": f"{platform.machine()} {platform.system()}, Python {platform.python_version()}",
+                   "results": merged}, f, indent=2, sort_keys=True)
+
+def format_results(results: dict, baselines: dict) -> str:
+    lines = [f"{'Recipes':>8}  {'Phase':<14}{'Seconds':>10}{'Baseline':>10}{'Ratio':>8}"]
+    for size, timings in results.items():
+        base = baselines.get(str(size), {})
+        for phase, seconds in timings.items():
+            if phase in base:
+                lines.append(f"{size:>8}  {phase:<14}{seconds:>10.4f}{base[phase]:>10.4f}{seconds / max(base[phase], 1e-9):>8.2f}")
+            else:
+                lines.append(f"{size:>8}  {phase:<14}{seconds:>10.4f}{'-':>10}{'-':>8}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the memory run and its budgets")
+    args = parser.parse_args(argv)
+
+    results, memory = {}, {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results[size], usage = run_size(size, args.repeat, workdir, args.seed, not args.no_memory)
+            if usage is not None:
+                memory[size] = usage
+            print(f"{size} recipes done", file=sys.stderr, flush=True)
+
+    overruns = find_budget_overruns(memory)
+    if args.save_baseline:
+        write_baselines(results, args.baseline)
+        print(format_results(results, {}))
+        print(f"Baselines saved to {args.baseline}")
+        regressions = []
+    else:
+        baselines = read_baselines(args.baseline)
+        print(format_results(results, baselines))
+        regressions = find_regressions(results, baselines, args.tolerance)
+    if memory:
+        print(format_memory(memory))
+    for size, phase, base, seconds in regressions:
+        print(f"REGRESSION: {phase} at {size} recipes took {seconds:.4f}s (baseline {base:.4f}s)")
+    for size, phase, budget, used in overruns:
+        print(f"OVER BUDGET: {phase} at {size} recipes peaked at {used:.1f} MiB (budget {budget} MiB)")
+    return 1 if regressions or overruns else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
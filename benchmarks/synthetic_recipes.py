@@ -0,0 +1,181 @@
+"""
+Synthetic recipe datasets in the Appendix A JSON format, for benchmarks and tests.
+
+Run from the repository root:
+    python -m benchmarks.synthetic_recipes out.json [--recipes N] [--fan-in F] [--fan-out F]
+                                                    [--cycle-density D] [--alternate-ratio R] [--seed S]
+
+The graph mirrors the wiki data: base resources produced by 'Resource Extraction'
+recipes, then parts in DEPTH production levels, each with one standard recipe whose
+ingredients come from the level below (or are resources), so every material can be
+produced and chains stay about as deep as the game's at any dataset size.
+On top of that:
+  - alternate recipes (Alternate: True) produce an existing part from other ingredients,
+  - cycle recipes consume a later part and produce an earlier material (like recycling),
+    closing cycles in the material graph,
+  - byproducts (fan-out above 1) are extra products drawn from earlier materials.
+"""
+import argparse, json
+import numpy as np
+from typing import Dict, List
+
+MACHINES_BY_FAN_IN = ["Constructor", "Assembler", "Manufacturer"]
+MACHINE_POWER = {"Resource Extraction": 0.05, "Smelter": 4, "Constructor": 4, "Assembler": 15,
+                 "Manufacturer": 55, "Refinery": 30}
+TIERS = 10
+DEPTH = 12
+MAM_RATIO = 0.1
+LOCALITY = 200  # ingredients are drawn from LOCALITY neighbouring parts of the level below, like real production chains
+
+def _counts(rng, mean, size):
+    # Integers >= 1 with the given mean (1 + Poisson(mean - 1))
+    return 1 + rng.poisson(max(mean - 1.0, 0.0), size)
+
+def _quantity(rng):
+    return float(5 * rng.integers(1, 13))
+
+def _pick(rng, pool, k):
+    # k distinct material ids from pool (fewer if the pool is smaller)
+    return rng.choice(pool, size=min(k, len(pool)), replace=False).tolist()
+
+def _unlocked_by(rng, position, alternate=False):
+    if rng.random() < MAM_RATIO:
+        tree = f"Research {int(rng.integers(1, 6))}"
+        return {"Tier": None, "MAM Research": [{"Tree": tree, "Node": f"{tree} Node {int(rng.integers(1, 9))}"}],
+                "Alternate": alternate}
+    level = min(TIERS - 1, int(position * TIERS))
+    return {"Tier": [{"Level": level, "Section": f"Tier {level} Section {int(rng.integers(1, 5))}"}],
+            "MAM Research": None, "Alternate": alternate}
+
+def _recipe(name, ingredients, products, machine, unlocked_by):
+    return {
+        "Recipe": name,
+        "Ingredients": [{"Material": mat, "Quantity": qty} for mat, qty in ingredients],
+        "Produced in": [{"Machine": machine, "Pwr Cons": MACHINE_POWER.get(machine, 4)}],
+        "Products": [{"Material": mat, "Quantity": qty} for mat, qty in products],
+        "Unlocked by": unlocked_by,
+    }
+
+def generate_recipes(n_recipes: int, fan_in: float = 2.0, fan_out: float = 1.2, cycle_density: float = 0.05,
+                     alternate_ratio: float = 0.2, n_base: int = None, seed: int = 0) -> List[Dict]:
+    """
+    Returns about n_recipes recipes (exactly n_recipes when it is at least twice n_base).
+    fan_in / fan_out are the mean ingredients / products per recipe, cycle_density the
+    share of cycle recipes and alternate_ratio the share of alternate recipes.
+    The same arguments always give the same recipes.
+    """
+    rng = np.random.default_rng(seed)
+    if n_base is None:
+        n_base = max(3, min(20, n_recipes // 50))
+    n_extra = int(n_recipes * alternate_ratio) + int(n_recipes * cycle_density)
+    n_parts = max(1, n_recipes - n_base - n_extra)
+    names = [f"Resource {i}" for i in range(n_base)] + [f"Part {i}" for i in range(n_parts)]
+
+    recipes = [_recipe(f"{names[i]} Extraction", [], [(names[i], 60.0)], "Resource Extraction", "")
+               for i in range(n_base)]
+
+    # Parts are numbered level by level; level_start[l] is the first part of level l
+    level_start = np.searchsorted(np.arange(n_parts) * DEPTH // n_parts, np.arange(DEPTH + 1))
+    resources = np.arange(n_base)
+
+    def pool_below(target):
+        # Resources plus the parts of the level below around the same relative position
+        p = target - n_base
+        level = int(np.searchsorted(level_start, p, side="right")) - 1
+        if level == 0:
+            return resources
+        lo, hi = level_start[level - 1], level_start[level]
+        centre = lo + (p - level_start[level]) * (hi - lo) // max(level_start[level + 1] - level_start[level], 1)
+        start = max(lo, min(centre - LOCALITY // 2, hi - LOCALITY))
+        return np.concatenate([resources, n_base + np.arange(start, min(hi, start + LOCALITY))])
+
+    def ingredients_for(target, k):
+        return [(names[m], _quantity(rng)) for m in _pick(rng, pool_below(target), k)]
+
+    def products_for(target, k):
+        extra = _pick(rng, pool_below(target), k - 1) if k > 1 else []
+        return [(names[target], _quantity(rng))] + [(names[m], _quantity(rng)) for m in extra]
+
+    fan_ins = _counts(rng, fan_in, n_parts)
+    fan_outs = _counts(rng, fan_out, n_parts)
+    for p in range(n_parts):
+        target = n_base + p
+        k = int(fan_ins[p])
+        machine = "Refinery" if fan_outs[p] > 1 else MACHINES_BY_FAN_IN[min(k, 3) - 1]
+        # Parts made straight from resources are smelted, like ingots
+        if target < 2 * n_base and k == 1:
+            machine = "Smelter"
+        recipes.append(_recipe(names[target], ingredients_for(target, k), products_for(target, int(fan_outs[p])),
+                               machine, _unlocked_by(rng, p / n_parts)))
+
+    for a in range(int(n_recipes * alternate_ratio)):
+        target = n_base + int(rng.integers(0, n_parts))
+        k = int(_counts(rng, fan_in, 1)[0])
+        recipes.append(_recipe(f"{names[target]} Alternate {a}", ingredients_for(target, k), products_for(target, 1),
+                               MACHINES_BY_FAN_IN[min(k, 3) - 1],
+                               _unlocked_by(rng, (target - n_base) / n_parts, alternate=True)))
+
+    for c in range(int(n_recipes * cycle_density)):
+        # Consumes a part and gives back a material of the level below it
+        source = n_base + int(rng.integers(0, n_parts))
+        target = int(rng.choice(pool_below(source)))
+        recipes.append(_recipe(f"Recycled {names[target]} {c}", [(names[source], _quantity(rng))],
+                               [(names[target], _quantity(rng))], "Refinery",
+                               _unlocked_by(rng, (source - n_base) / n_parts)))
+    return recipes
+
+def end_materials(recipes: List[Dict], k: int = 3) -> List[str]:
+    # The k last parts that no recipe consumes (good demand targets: they need the deepest chains)
+    consumed = {item["Material"] for r in recipes for item in r["Ingredients"]}
+    ends = []
+    for r in reversed(recipes):
+        if r["Unlocked by"] and not r["Unlocked by"]["Alternate"] and not r["Recipe"].startswith("Recycled"):
+            mat = r["Products"][0]["Material"]
+            if mat not in consumed and mat not in ends:
+                ends.append(mat)
+                if len(ends) == k:
+                    break
+    return ends
+
+def mutate_recipes(recipes: List[Dict], change_ratio: float = 0.01, seed: int = 1) -> List[Dict]:
+    """
+    A new version of a recipe list for diff benchmarks: about change_ratio of the recipes
+    get a new power value, as many are removed and as many new recipes are added.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(recipes)
+    k = max(1, int(n * change_ratio))
+    picked = rng.choice(n, size=min(n, 2 * k), replace=False)
+    changed, removed = set(picked[:k].tolist()), set(picked[k:].tolist())
+    out = []
+    for i, recipe in enumerate(recipes):
+        if i in removed:
+            continue
+        if i in changed:
+            machine = recipe["Produced in"][0]
+            recipe = dict(recipe, **{"Produced in": [dict(machine, **{"Pwr Cons": machine["Pwr Cons"] + _quantity(rng)})]})
+        out.append(recipe)
+    for j in range(k):
+        base = recipes[int(rng.integers(0, n))]
+        out.append(dict(base, Recipe=f"{base['Recipe']} Mk{j + 2}"))
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("json_file")
+    parser.add_argument("--recipes", type=int, default=1000)
+    parser.add_argument("--fan-in", type=float, default=2.0)
+    parser.add_argument("--fan-out", type=float, default=1.2)
+    parser.add_argument("--cycle-density", type=float, default=0.05)
+    parser.add_argument("--alternate-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    recipes = generate_recipes(args.recipes, args.fan_in, args.fan_out, args.cycle_density,
+                               args.alternate_ratio, seed=args.seed)
+    with open(args.json_file, "w", encoding="utf-8") as f:
+        json.dump(recipes, f, indent=2)
+    print(f"Wrote {len(recipes)} recipes to {args.json_file}")
+
+if __name__ == "__main__":
+    main()
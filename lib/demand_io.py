@@ -0,0 +1,88 @@
+import csv, json, os
+from typing import Dict, Iterable, Tuple
+
+# --- Bulk demand import ---
+
+MATERIAL_KEYS = ("Material", "material", "Name", "name")
+AMOUNT_KEYS   = ("Amount", "amount", "Quantity", "quantity", "Requested", "requested", "Rate", "rate")
+
+def aggregate_demands(pairs: Iterable[Tuple[str, object]], source: str = "") -> Dict[str, float]:
+    """
+    Sums (material, amount) pairs into one entry per material, keeping first-seen order.
+    Amounts must parse as floats > 0.
+    """
+    demands = {}
+    for i, (material, amount) in enumerate(pairs, start=1):
+        material = str(material).strip() if material is not None else ""
+        if not material:
+            raise ValueError(f"{source}entry {i}: missing material name.")
+        try:
+            value = float(amount)
+        except (TypeError, ValueError):
+            raise ValueError(f"{source}entry {i} ({material}): amount '{amount}' is not a number.")
+        if not value > 0:
+            raise ValueError(f"{source}entry {i} ({material}): amount must be > 0, got {value}.")
+        demands[material] = demands.get(material, 0.0) + value
+    return demands
+
+def _pick(record: dict, keys, file_path):
+    for key in keys:
+        if key in record:
+            return record[key]
+    raise ValueError(f"{file_path}: record {record} has none of the keys {list(keys)}.")
+
+def _json_pairs(data, file_path):
+    # {"Material": amount, ...}
+    if isinstance(data, dict):
+        return list(data.items())
+    # [{"Material": ..., "Amount": ...}, ...] or [[material, amount], ...]
+    if isinstance(data, list):
+        pairs = []
+        for item in data:
+            if isinstance(item, dict):
+                pairs.append((_pick(item, MATERIAL_KEYS, file_path), _pick(item, AMOUNT_KEYS, file_path)))
+            elif isinstance(item, (list, tuple)) and len(item) == 2:
+                pairs.append(tuple(item))
+            else:
+                raise ValueError(f"{file_path}: unsupported demand entry {item!r}.")
+        return pairs
+    raise ValueError(f"{file_path}: expected a JSON object or list of demands.")
+
+def _csv_pairs(f, file_path):
+    rows = [row for row in csv.reader(f) if row and any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    material_col, amount_col = 0, 1
+    header = [cell.strip() for cell in rows[0]]
+    # The first row is a header only if it names a material or amount column;
+    # anything else is data and goes through the usual number/column checks
+    if any(cell in MATERIAL_KEYS or cell in AMOUNT_KEYS for cell in header):
+        rows = rows[1:]
+        for i, cell in enumerate(header):
+            if cell in MATERIAL_KEYS:
+                material_col = i
+            elif cell in AMOUNT_KEYS:
+                amount_col = i
+    pairs = []
+    for row in rows:
+        if len(row) <= max(material_col, amount_col):
+            raise ValueError(f"{file_path}: row {row} has too few columns.")
+        pairs.append((row[material_col], row[amount_col].strip()))
+    return pairs
+
+def load_demands(file_path) -> Dict[str, float]:
+    """
+    Reads material demands (per minute) from a CSV or JSON file.
+    CSV: 'Material,Amount' rows, header optional. JSON: {"Material": amount} or a list
+    of {"Material": ..., "Amount"/"Quantity"/"Requested": ...} records.
+    Repeated materials are summed into a single entry.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+        if ext == ".json":
+            pairs = _json_pairs(json.load(f), file_path)
+        elif ext in (".csv", ".txt"):
+            pairs = _csv_pairs(f, file_path)
+        else:
+            raise ValueError(f"Unsupported demand file type: {ext or file_path}. Use .csv or .json.")
+    return aggregate_demands(pairs, source=f"{os.path.basename(file_path)}: ")
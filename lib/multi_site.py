@@ -0,0 +1,256 @@
+"""
+Multi-site factory planning.
+
+A plan spread over several sites, each with its own unlocks, local resource nodes
+and demands, connected by transfer links:
+
+    {
+      "sites": [
+        {"name": "North", "demand": {"Iron Plate": 60}, "resources": {"Iron Ore": 480}, "options": -1},
+        {"name": "South", "demand": {"Reinforced Iron Plate": 5}, "resources": {"Copper Ore": 300}}
+      ],
+      "links": [
+        {"from": "North", "to": "South", "materials": ["Iron Plate", "Screw"], "capacity": 1200, "cost": 0.0}
+      ]
+    }
+
+"resources" caps the extraction of raw resources at a site (per min); a site listing
+resources cannot extract any other RESOURCE_MAXIMUMS material, a site without the key
+is only bound by the world-wide RESOURCE_MAXIMUMS. "options" is an advanced-options
+profile (defaults to the caller's). A link moves any of its "materials" (default: every
+material) one way, at most "capacity" per min in total, at "cost" MW per unit.
+
+Sites connected by links form one block-structured LP (one block of recipe variables
+per site, coupled by transfer variables). Unconnected groups are independent
+subproblems and are solved in parallel; if together they exceed a world-wide resource
+maximum, everything is re-solved as one LP with the shared caps.
+"""
+import io, json
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import pulp
+from typing import Dict, List
+import lib.recipe_optimization as recipe_op
+import lib.plan_export as plan_export
+from lib.scrape_data import RESOURCE_MAXIMUMS
+from lib.profiling import profiled, span
+
+DEFAULT_TRANSFER_COST = 1e-6  # MW per unit moved; breaks ties in favour of producing on site
+
+def load_sites(sites_file) -> Dict:
+    with open(sites_file, "r", encoding="utf-8") as f:
+        return validate_sites(json.load(f))
+
+def validate_sites(data) -> Dict:
+    """
+    Checks a sites definition (see module docstring) and fills in defaults.
+    Returns {"sites": [...], "links": [...]}.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("sites"), list) or not data["sites"]:
+        raise ValueError("Sites definition must be {\"sites\": [...], \"links\": [...]} with at least one site.")
+    sites, names = [], set()
+    for i, site in enumerate(data["sites"], start=1):
+        if not isinstance(site, dict) or not isinstance(site.get("name"), str) or not site["name"]:
+            raise ValueError(f"Site {i}: missing name.")
+        name = site["name"]
+        if name in names:
+            raise ValueError(f"Site '{name}' is defined twice.")
+        names.add(name)
+        for key in ("demand", "resources"):
+            values = site.get(key, {})
+            if not isinstance(values, dict) or not all(isinstance(v, (int, float)) and v >= 0 for v in values.values()):
+                raise ValueError(f"Site '{name}': {key} must map materials to amounts >= 0.")
+        sites.append({"name": name, "demand": dict(site.get("demand", {})),
+                      "resources": dict(site["resources"]) if "resources" in site else None,
+                      "options": site.get("options")})
+    links = []
+    for i, link in enumerate(data.get("links") or [], start=1):
+        if not isinstance(link, dict) or link.get("from") not in names or link.get("to") not in names:
+            raise ValueError(f"Link {i}: 'from' and 'to' must name defined sites.")
+        if link["from"] == link["to"]:
+            raise ValueError(f"Link {i}: a site cannot transfer to itself.")
+        materials = link.get("materials")
+        if materials is not None and (not isinstance(materials, list) or not all(isinstance(m, str) for m in materials)):
+            raise ValueError(f"Link {i}: materials must be a list of names.")
+        capacity = link.get("capacity")
+        if capacity is not None and not (isinstance(capacity, (int, float)) and capacity >= 0):
+            raise ValueError(f"Link {i}: capacity must be a number >= 0.")
+        links.append({"from": link["from"], "to": link["to"], "materials": materials, "capacity": capacity,
+                      "cost": float(link.get("cost", DEFAULT_TRANSFER_COST))})
+    return {"sites": sites, "links": links}
+
+def link_components(sites: List[Dict], links: List[Dict]) -> List[List[str]]:
+    # Groups of site names connected by links (in either direction), in site order
+    parent = {site["name"]: site["name"] for site in sites}
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+    for link in links:
+        parent[find(link["from"])] = find(link["to"])
+    groups = {}
+    for site in sites:
+        groups.setdefault(find(site["name"]), []).append(site["name"])
+    return list(groups.values())
+
+def solve_sites(recipes, sites_data: Dict, default_options=-1, resource_maximums: Dict = None,
+                workers: int = None, solver=None) -> Dict:
+    """
+    Minimizes the total power of all sites so that each site nets at least its demand.
+    recipes is the shared RecipeStore (or list of recipe dicts); each site keeps the
+    recipes its options unlock. workers > 1 solves independent site groups in parallel
+    processes.
+    Returns {"total_power", "sites": {name: {"solution", "total_power", "plan", "flow_ledger"}},
+             "transfers": DataFrame(From, To, Material, Rate), "decomposed": bool}.
+    """
+    sites_data = validate_sites(sites_data)
+    resource_maximums = RESOURCE_MAXIMUMS if resource_maximums is None else resource_maximums
+    sites, links = sites_data["sites"], sites_data["links"]
+    groups = link_components(sites, links)
+
+    blocks = []
+    for group in groups:
+        members = set(group)
+        blocks.append(([site for site in sites if site["name"] in members],
+                       [link for link in links if link["from"] in members]))
+    if len(blocks) > 1:
+        # Independent subproblems: world caps are checked afterwards
+        args = [(recipes, block_sites, block_links, default_options, {}, solver) for block_sites, block_links in blocks]
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as executor:
+                results = list(executor.map(_solve_block_args, args))
+        else:
+            results = [_solve_block_args(a) for a in args]
+        extracted = {}
+        for result in results:
+            for mat, rate in result["extracted"].items():
+                extracted[mat] = extracted.get(mat, 0.0) + rate
+        if all(rate <= resource_maximums.get(mat, np.inf) + 1e-6 for mat, rate in extracted.items()):
+            return _merge_results(results, decomposed=True)
+    return _merge_results([_solve_block(recipes, sites, links, default_options, resource_maximums, solver)],
+                          decomposed=False)
+
+def _solve_block_args(args):
+    return _solve_block(*args)
+
+@profiled("multi_site.block")
+def _solve_block(recipes, sites, links, default_options, resource_maximums, solver):
+    """
+    One block-structured LP over the given sites and links. resource_maximums are
+    world-wide extraction caps shared by these sites (empty when checked by the caller).
+    """
+    models = {}
+    for site in sites:
+        options = default_options if site["options"] is None else site["options"]
+        models[site["name"]] = recipe_op.compile_recipe_model(recipes, options)
+
+    prob = pulp.LpProblem("SatisfactoryMultiSitePlan", pulp.LpMinimize)
+    recipe_vars = {name: [pulp.LpVariable(f"Recipe_{k}_{i}", lowBound=0) for i in range(len(model.store))]
+                   for k, (name, model) in enumerate(models.items())}
+
+    # Transfer variables: one per (link, material) the link can carry
+    transfers = []  # (link index, material, variable)
+    link_terms = {}
+    for j, link in enumerate(links):
+        if link["materials"] is not None:
+            materials = link["materials"]
+        else:
+            materials = sorted(set(models[link["from"]].store.used_materials()) |
+                               set(models[link["to"]].store.used_materials()))
+        link_vars = []
+        for m, mat in enumerate(materials):
+            var = pulp.LpVariable(f"Transfer_{j}_{m}", lowBound=0)
+            transfers.append((j, mat, var))
+            link_vars.append(var)
+            link_terms.setdefault((link["to"], mat), []).append((var, 1.0))
+            link_terms.setdefault((link["from"], mat), []).append((var, -1.0))
+        if link["capacity"] is not None and link_vars:
+            prob += pulp.lpSum(link_vars) <= link["capacity"]
+
+    objective = []
+    for name, model in models.items():
+        objective.extend(zip(recipe_vars[name], model.power))
+    objective.extend((var, links[j]["cost"]) for j, mat, var in transfers)
+    prob += pulp.LpAffineExpression(objective)
+
+    extraction = {}  # raw material -> [(var, quantity)] over all sites, for the world caps
+    for site in sites:
+        name = site["name"]
+        model, variables = models[name], recipe_vars[name]
+        materials = set(model.store.used_materials()) | set(site["demand"])
+        materials |= {mat for (site_name, mat) in link_terms if site_name == name}
+        for mat in sorted(materials):
+            terms = list(_material_terms(model, variables, mat)) + link_terms.get((name, mat), [])
+            amount = float(site["demand"].get(mat, 0.0))
+            if not terms:
+                if amount > 0:
+                    raise ValueError(f"Site '{name}': material '{mat}' can neither be produced there nor received.")
+                continue
+            prob += pulp.LpAffineExpression(terms) >= amount
+        # Local resource nodes: only the listed raw resources, up to their caps
+        raw = set(RESOURCE_MAXIMUMS) | set(site["resources"] or {})
+        for mat in sorted(raw):
+            produced = [(var, q) for var, q in _material_terms(model, variables, mat) if q > 0]
+            if not produced:
+                continue
+            extraction.setdefault(mat, []).extend(produced)
+            if site["resources"] is not None:
+                prob += pulp.LpAffineExpression(produced) <= float(site["resources"].get(mat, 0.0))
+    for mat, produced in extraction.items():
+        if mat in resource_maximums:
+            prob += pulp.LpAffineExpression(produced) <= float(resource_maximums[mat])
+
+    with span("lp.solve", sites=len(sites)):
+        result = prob.solve(solver or pulp.PULP_CBC_CMD(msg=False))
+    status = pulp.LpStatus[result]
+    if status != "Optimal":
+        raise ValueError(f"No feasible multi-site plan for sites {', '.join(models)} (solver status: {status}).")
+
+    site_results = {}
+    for name, model in models.items():
+        counts = np.array([var.varValue or 0.0 for var in recipe_vars[name]], dtype=np.float64)
+        store = model.store
+        solution = {recipe: float(count) for recipe, count in zip(store.names, counts)}
+        site_results[name] = {
+            "solution": solution,
+            "total_power": float(store.power @ counts),
+            "plan": recipe_op.plan_rows(store, solution),
+            "flow_ledger": recipe_op.compute_flow_ledger(store, solution, model.incidence, counts),
+        }
+    rows = [(links[j]["from"], links[j]["to"], mat, float(var.varValue or 0.0)) for j, mat, var in transfers]
+    return {
+        "sites": site_results,
+        "transfers": [row for row in rows if row[3] > 1e-9],
+        "extracted": {mat: sum((var.varValue or 0.0) * q for var, q in produced) for mat, produced in extraction.items()},
+    }
+
+def _material_terms(model, variables, mat):
+    # (recipe variable, net quantity) of every recipe of the site touching mat
+    mat_id = model.store.materials.get(mat)
+    if mat_id < 0 or mat_id + 1 >= len(model.bounds):
+        return []
+    lo, hi = model.bounds[mat_id], model.bounds[mat_id + 1]
+    return [(variables[r], q) for r, q in zip(model.recipe_idx[lo:hi], model.quantity[lo:hi])]
+
+def _merge_results(results, decomposed) -> Dict:
+    sites = {}
+    transfers = []
+    for result in results:
+        sites.update(result["sites"])
+        transfers.extend(result["transfers"])
+    return {
+        "total_power": sum(site["total_power"] for site in sites.values()),
+        "sites": sites,
+        "transfers": pd.DataFrame(transfers, columns=["From", "To", "Material", "Rate"]),
+        "decomposed": decomposed,
+    }
+
+def format_site_plans(result: Dict) -> str:
+    """
+    Text report of a solve_sites result: per-site power, recipe usage and flows, then transfers.
+    """
+    f = io.StringIO()
+    plan_export.write_sites_text(f, result)
+    return f.getvalue()
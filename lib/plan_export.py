@@ -0,0 +1,200 @@
+import csv, io, json, os
+from typing import Dict, Iterator, List
+import lib.recipe_optimization as recipe_op
+from lib.profiling import span
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+# --- Plan exports (text, JSON, CSV, Parquet) ---
+#
+# Every writer streams: records are produced one at a time from the plan rows and the
+# flow ledger DataFrames and written as they come, so a large plan is never built up
+# as one string. Parquet is written in row groups of PARQUET_BATCH_ROWS.
+#
+# JSON keeps the nested layout of the solver service:
+#   {"total_power", "plan": [{Machine, Recipe, Count, Power}], "flow": [{Material, Produced,
+#    Consumed, Net}], "contributions": [{Recipe, Material, Count, Rate}]}
+# and for multi-site results {"total_power", "decomposed", "sites": {name: <plan object>},
+# "transfers": [{From, To, Material, Rate}]}.
+# CSV and Parquet use one long table with a 'Table' column (totals, plan, flow,
+# contributions, transfers) and the columns of LONG_COLUMNS that apply to each table;
+# 'Site' names the site of multi-site rows, and transfers use Site -> To.
+
+EXPORT_FORMATS     = {".txt": "text", ".json": "json", ".csv": "csv", ".parquet": "parquet"}
+LONG_COLUMNS       = ["Table", "Site", "Machine", "Recipe", "Material", "Count", "Power",
+                      "Produced", "Consumed", "Net", "Rate", "To"]
+TEXT_COLUMNS       = {"Table", "Site", "Machine", "Recipe", "Material", "To"}
+PARQUET_BATCH_ROWS = 65536
+PLAN_COLUMNS          = ["Machine", "Recipe", "Count", "Power"]
+FLOW_COLUMNS          = ["Material", "Produced", "Consumed", "Net"]
+CONTRIBUTION_COLUMNS  = ["Recipe", "Material", "Count", "Rate"]
+TRANSFER_COLUMNS      = ["From", "To", "Material", "Rate"]
+
+def export_format(path) -> str:
+    # Export format for a file name, from its extension
+    fmt = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported export file type: {path} (use {', '.join(EXPORT_FORMATS)})")
+    return fmt
+
+def _frame_records(df, columns) -> Iterator[Dict]:
+    for row in df[columns].itertuples(index=False, name=None):
+        yield dict(zip(columns, row))
+
+def _plan_records(plan_rows) -> Iterator[Dict]:
+    for row in plan_rows:
+        yield dict(zip(PLAN_COLUMNS, row))
+
+# --- Long table (CSV / Parquet) ---
+
+def _plan_long_records(total_power, plan_rows, flow_ledger, site=None) -> Iterator[Dict]:
+    yield {"Table": "totals", "Site": site, "Power": total_power}
+    for record in _plan_records(plan_rows):
+        yield dict(record, Table="plan", Site=site)
+    for record in _frame_records(flow_ledger["materials"], FLOW_COLUMNS):
+        yield dict(record, Table="flow", Site=site)
+    for record in _frame_records(flow_ledger["contributions"], CONTRIBUTION_COLUMNS):
+        yield dict(record, Table="contributions", Site=site)
+
+def _sites_long_records(result) -> Iterator[Dict]:
+    yield {"Table": "totals", "Power": result["total_power"]}
+    for name, site in result["sites"].items():
+        yield from _plan_long_records(site["total_power"], site["plan"], site["flow_ledger"], site=name)
+    for record in _frame_records(result["transfers"], TRANSFER_COLUMNS):
+        yield {"Table": "transfers", "Site": record["From"], "To": record["To"],
+               "Material": record["Material"], "Rate": record["Rate"]}
+
+def _write_csv(f, records):
+    writer = csv.DictWriter(f, fieldnames=LONG_COLUMNS, restval="")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+
+def _write_parquet(path, records):
+    if pq is None:
+        raise ImportError("Parquet export needs the pyarrow package (pip install pyarrow).")
+    schema = pa.schema([(col, pa.string() if col in TEXT_COLUMNS else pa.float64()) for col in LONG_COLUMNS])
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = {col: [] for col in LONG_COLUMNS}
+        n = 0
+        for record in records:
+            for col in LONG_COLUMNS:
+                batch[col].append(record.get(col))
+            n += 1
+            if n == PARQUET_BATCH_ROWS:
+                writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+                batch = {col: [] for col in LONG_COLUMNS}
+                n = 0
+        if n:
+            writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+
+# --- JSON ---
+
+def _write_json_array(f, key, records):
+    f.write(f", {json.dumps(key)}: [")
+    for i, record in enumerate(records):
+        if i:
+            f.write(", ")
+        f.write(json.dumps(record))
+    f.write("]")
+
+def write_plan_json(f, total_power, plan_rows, flow_ledger):
+    # One plan as a JSON object, written record by record
+    f.write(f'{{"total_power": {json.dumps(total_power)}')
+    _write_json_array(f, "plan", _plan_records(plan_rows))
+    _write_json_array(f, "flow", _frame_records(flow_ledger["materials"], FLOW_COLUMNS))
+    _write_json_array(f, "contributions", _frame_records(flow_ledger["contributions"], CONTRIBUTION_COLUMNS))
+    f.write("}")
+
+def plan_json(total_power, plan_rows, flow_ledger) -> str:
+    # write_plan_json into a string (the solver service sends it as the response body)
+    f = io.StringIO()
+    write_plan_json(f, total_power, plan_rows, flow_ledger)
+    return f.getvalue()
+
+def write_sites_json(f, result):
+    f.write(f'{{"total_power": {json.dumps(result["total_power"])}, '
+            f'"decomposed": {json.dumps(bool(result.get("decomposed")))}, "sites": {{')
+    for i, (name, site) in enumerate(result["sites"].items()):
+        f.write(f'{", " if i else ""}{json.dumps(name)}: ')
+        write_plan_json(f, site["total_power"], site["plan"], site["flow_ledger"])
+    f.write("}")
+    _write_json_array(f, "transfers", _frame_records(result["transfers"], TRANSFER_COLUMNS))
+    f.write("}")
+
+# --- Text ---
+
+def write_plan_text(f, total_power, plan_rows, flow_ledger):
+    """
+    Human-readable report: total power, recipe usage grouped by machine, material flow
+    and per-recipe contributions.
+    """
+    machine_groups = {}
+    for machine, recipe, count, _ in plan_rows:
+        machine_groups.setdefault(machine, []).append((recipe, count))
+    f.write(f"Total Power Consumption: {total_power:.2f} MW\n\n")
+    for machine, recipes in machine_groups.items():
+        f.write(f"[{machine}]\n")
+        for recipe, count in recipes:
+            f.write(f"  {recipe}: {count}\n")
+        f.write("\n")
+    f.write("Material Flow (per min):\n\n")
+    recipe_op.write_flow_ledger(f, flow_ledger)
+    f.write("\nRecipe Contributions (per min):\n\n")
+    recipe_op.write_flow_contributions(f, flow_ledger)
+
+def write_sites_text(f, result):
+    # Per-site power, recipe usage and flows, then the transfers between sites
+    f.write(f"Total Power Consumption: {result['total_power']:.2f} MW\n\n")
+    for name, site in result["sites"].items():
+        f.write(f"=== Site: {name} ({site['total_power']:.2f} MW) ===\n")
+        for machine, recipe, count, power in site["plan"]:
+            f.write(f"  [{machine}] {recipe}: {count:.4f} ({power:.2f} MW)\n")
+        f.write("\nMaterial Flow (per min):\n")
+        recipe_op.write_flow_ledger(f, site["flow_ledger"])
+        f.write("\n")
+    f.write("Transfers (per min):\n")
+    transfers = result["transfers"]
+    if transfers.empty:
+        f.write("  None\n")
+    for src, dst, mat, rate in transfers[TRANSFER_COLUMNS].itertuples(index=False, name=None):
+        f.write(f"  {src} -> {dst}: {mat} {rate:.3f}\n")
+
+# --- Files ---
+
+def _export(path, fmt, write_text, write_json, long_records):
+    fmt = fmt or export_format(path)
+    with span("export", format=fmt):
+        if fmt == "parquet":
+            _write_parquet(path, long_records())
+            return
+        if fmt not in ("text", "json", "csv"):
+            raise ValueError(f"Unsupported export format: {fmt}")
+        with open(path, "w", encoding="utf-8", newline="" if fmt == "csv" else None) as f:
+            if fmt == "text":
+                write_text(f)
+            elif fmt == "json":
+                write_json(f)
+            else:
+                _write_csv(f, long_records())
+
+def export_plan(path, total_power: float, plan_rows: List[tuple], flow_ledger: Dict, fmt: str = None):
+    """
+    Writes one plan (plan_rows as from recipe_optimization.plan_rows, and its flow ledger)
+    to path as text, JSON, CSV or Parquet; fmt defaults to the format of the extension.
+    """
+    _export(path, fmt,
+            lambda f: write_plan_text(f, total_power, plan_rows, flow_ledger),
+            lambda f: write_plan_json(f, total_power, plan_rows, flow_ledger),
+            lambda: _plan_long_records(total_power, plan_rows, flow_ledger))
+
+def export_sites(path, result: Dict, fmt: str = None):
+    # Writes a multi_site.solve_sites result; formats as for export_plan
+    _export(path, fmt,
+            lambda f: write_sites_text(f, result),
+            lambda f: write_sites_json(f, result),
+            lambda: _sites_long_records(result))
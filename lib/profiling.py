@@ -0,0 +1,191 @@
+import contextlib, functools, json, os, sys, threading, time, tracemalloc
+from typing import List
+
+# --- Phase profiling spans ---
+#
+# Enable with --profile on the command line or SATISFACTORY_PROFILE=1. When disabled,
+# span() returns a shared no-op context manager and @profiled functions call straight
+# through, so instrumented code only pays one global lookup per phase.
+#
+# With memory=True (--profile-memory or SATISFACTORY_PROFILE=memory) spans also record
+# tracemalloc allocations and the peak RSS, which slows the profiled code down noticeably.
+
+DEFAULT_TRACE_FILE = os.path.join(".cache", "profile_trace.json")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_enabled = os.environ.get("SATISFACTORY_PROFILE", "") not in ("", "0")
+_memory = os.environ.get("SATISFACTORY_PROFILE", "") == "memory"
+_started_tracing = _memory  # tracemalloc was started here (and is stopped when memory profiling ends)
+if _memory:
+    tracemalloc.start()
+# (name, start_ns, duration_ns, depth, thread id, args, memory), in completion order; memory is
+# None or (retained bytes, peak bytes above the start, peak RSS bytes at the end)
+_spans = []
+_local = threading.local()
+_NULL_SPAN = contextlib.nullcontext()
+
+def enable(enabled: bool = True, memory: bool = False):
+    global _enabled, _memory, _started_tracing
+    _enabled = enabled
+    _memory = enabled and memory
+    if _memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracing = True
+    elif not _memory and _started_tracing:
+        tracemalloc.stop()
+        _started_tracing = False
+
+def is_enabled() -> bool:
+    return _enabled
+
+def is_memory_enabled() -> bool:
+    return _memory
+
+def peak_rss() -> int:
+    # Peak resident set size of this process in bytes (None where unavailable)
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # bytes on macOS, KiB elsewhere
+
+class _Span:
+    __slots__ = ("name", "args", "start", "depth")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.depth = getattr(_local, "depth", 0)
+        _local.depth = self.depth + 1
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        _local.depth = self.depth
+        _spans.append((self.name, self.start, end - self.start, self.depth, threading.get_ident(), self.args, None))
+        return False
+
+class _MemorySpan(_Span):
+    """
+    Span that also records tracemalloc memory. The tracemalloc peak is reset on entry,
+    so the peak of an enclosing span is carried over from the peaks seen before each
+    nested span started.
+    """
+    __slots__ = ("mem_start", "outer_peak", "carried_peak")
+
+    def __enter__(self):
+        self.mem_start, self.outer_peak = tracemalloc.get_traced_memory()
+        self.carried_peak = 0
+        stack = _local.__dict__.setdefault("memory_stack", [])
+        if stack:
+            stack[-1].carried_peak = max(stack[-1].carried_peak, self.outer_peak)
+        stack.append(self)
+        tracemalloc.reset_peak()
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        current, peak = tracemalloc.get_traced_memory()
+        _local.memory_stack.pop()
+        _local.depth = self.depth
+        peak = max(peak, self.carried_peak)
+        _spans.append((self.name, self.start, end - self.start, self.depth, threading.get_ident(), self.args,
+                       (current - self.mem_start, peak - self.mem_start, peak_rss())))
+        return False
+
+def span(name: str, **args):
+    """
+    Context manager timing one phase. Keyword args are stored with the span (e.g. sizes).
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _MemorySpan(name, args) if _memory else _Span(name, args)
+
+def profiled(name: str):
+    # Decorator form of span() for whole functions
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def mark() -> int:
+    # Position in the span log; pass to summary()/spans() to only see later spans
+    return len(_spans)
+
+def spans(since: int = 0) -> List[tuple]:
+    return _spans[since:]
+
+def reset():
+    _spans.clear()
+
+def memory_by_phase(since: int = 0) -> dict:
+    """
+    {phase name: (retained bytes summed over calls, highest peak bytes, peak RSS bytes)}
+    for the memory spans recorded since mark().
+    """
+    phases = {}
+    for name, _, _, _, _, _, memory in _spans[since:]:
+        if memory is None:
+            continue
+        retained, peak, rss = phases.get(name, (0, 0, None))
+        phases[name] = (retained + memory[0], max(peak, memory[1]),
+                        memory[2] if rss is None else max(rss, memory[2] or 0))
+    return phases
+
+def summary(since: int = 0) -> str:
+    """
+    Fixed-width table of the spans recorded since mark(), one line per phase name in
+    order of first start, indented by nesting depth, with call count and total/mean ms
+    (plus retained/peak KiB and peak RSS MiB for memory spans).
+    """
+    phases = {}
+    for name, start, duration, depth, _, _, _ in _spans[since:]:
+        phase = phases.get(name)
+        if phase is None:
+            phases[name] = [start, depth, 1, duration]
+        else:
+            phase[0] = min(phase[0], start)
+            phase[2] += 1
+            phase[3] += duration
+    if not phases:
+        return "No profiling spans recorded.\n"
+    memory = memory_by_phase(since)
+    rows = sorted(phases.items(), key=lambda item: item[1][0])
+    width = max(len("Phase"), max(len(name) + 2 * phase[1] for name, phase in rows))
+    header = f"{'Phase':<{width}}  {'Calls':>6}  {'Total ms':>10}  {'Mean ms':>10}"
+    lines = [header + (f"  {'Retained KiB':>12}  {'Peak KiB':>10}  {'RSS MiB':>8}" if memory else "")]
+    for name, (_, depth, calls, total) in rows:
+        label = "  " * depth + name
+        line = f"{label:<{width}}  {calls:>6}  {total / 1e6:>10.2f}  {total / 1e6 / calls:>10.2f}"
+        if name in memory:
+            retained, peak, rss = memory[name]
+            rss_text = "-" if rss is None else f"{rss / 2**20:.1f}"
+            line += f"  {retained / 1024:>12.1f}  {peak / 1024:>10.1f}  {rss_text:>8}"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+def write_trace(trace_file=DEFAULT_TRACE_FILE, since: int = 0):
+    """
+    Writes the spans as a Chrome trace-event JSON file (chrome://tracing, Perfetto).
+    """
+    pid = os.getpid()
+    events = []
+    for name, start, duration, _, tid, args, memory in _spans[since:]:
+        if memory is not None:
+            args = dict(args, retained_bytes=memory[0], peak_bytes=memory[1], peak_rss_bytes=memory[2])
+        events.append({"name": name, "ph": "X", "ts": start / 1000.0, "dur": duration / 1000.0,
+                       "pid": pid, "tid": tid, "args": args})
+    os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+    with open(trace_file, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,187 @@
+import json, os
+import numpy as np
+from typing import Dict, List
+from lib.recipe_store import RecipeStore
+from lib.profiling import span
+
+# --- Layered recipe sources (base data + mod overlays) ---
+
+RECIPE_OVERLAYS_FILE = os.path.join(".cache", "recipe_overlays.json")
+
+def read_overlay_profile(profile_file=RECIPE_OVERLAYS_FILE) -> List[str]:
+    """
+    Overlay JSON files of the active mod profile, lowest precedence first ([] if none
+    saved). An unreadable or malformed profile is reported and read as [].
+    """
+    if not os.path.exists(profile_file):
+        return []
+    try:
+        with open(profile_file, "r", encoding="utf-8") as f:
+            overlays = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable recipe overlay profile {profile_file}: {e}")
+        return []
+    if not isinstance(overlays, list) or not all(isinstance(path, str) for path in overlays):
+        print(f"Ignoring recipe overlay profile {profile_file}: expected a list of overlay JSON file paths.")
+        return []
+    return overlays
+
+def write_overlay_profile(overlay_files: List[str], profile_file=RECIPE_OVERLAYS_FILE):
+    with open(profile_file, "w", encoding="utf-8") as f:
+        json.dump(list(overlay_files), f, indent=2)
+
+class RecipeLayer:
+    """
+    One recipe source: its RecipeStore, a name -> rows index and the base recipes it removes.
+
+    Overlay files use the Appendix A format; a record {"Recipe": name, "Removed": true}
+    removes that recipe from the layers below instead of adding one.
+    """
+    __slots__ = ("path", "mtime", "store", "index", "removed")
+
+    def __init__(self, path, store: RecipeStore, removed=(), mtime=None):
+        self.path = path
+        self.mtime = mtime
+        self.store = store
+        self.removed = list(removed)
+        # Recipe name -> every row with that name (recipe names are not guaranteed unique)
+        self.index = {}
+        for row, name in enumerate(store.names.tolist()):
+            self.index.setdefault(name, []).append(row)
+
+    @classmethod
+    def from_json(cls, path, tables=None) -> "RecipeLayer":
+        mtime = os.path.getmtime(path)
+        with span("load.json", file=os.path.basename(path)):
+            with open(path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        if not isinstance(records, list):
+            raise ValueError(f"{path}: expected a list of recipes (Appendix A format).")
+        removed = [r["Recipe"] for r in records if r.get("Removed")]
+        with span("load.store", recipes=len(records)):
+            store = RecipeStore.from_records([r for r in records if not r.get("Removed")], tables=tables)
+            return cls(path, store, removed, mtime)
+
+    def is_stale(self) -> bool:
+        # True when the file was modified (or created) since this layer was read
+        return self.path is not None and os.path.exists(self.path) and os.path.getmtime(self.path) != self.mtime
+
+class LayeredRecipeSource:
+    """
+    Base recipe data plus overlay files, merged by recipe name: a recipe in a later layer
+    replaces every recipe of the same name in the layers below it.
+
+    All layers are built on the base store's intern tables, so the merged store is a
+    plain RecipeStore (base rows in order, then each overlay's rows) that
+    get_materials_df, the unlock filter and run_recipe_optimization use unchanged.
+    Layers are cached by file and mtime: switching overlay profiles only parses the
+    overlay files that are new or modified, and the base layer is reused.
+    """
+
+    def __init__(self, base_file, overlay_files: List[str] = ()):
+        self.base_file = base_file
+        self.base = None
+        self.overlays = []
+        self.overlay_cache = {}  # path -> RecipeLayer on the current base's tables
+        self.skipped_overlays = []  # (path, error) of the overlays the last load could not read
+        self._merged = None
+        self.set_overlays(overlay_files)
+
+    @property
+    def overlay_files(self) -> List[str]:
+        return [layer.path for layer in self.overlays]
+
+    def _load_base(self):
+        if os.path.exists(self.base_file):
+            self.set_base_layer(RecipeLayer.from_json(self.base_file))
+        else:
+            # Empty base until the file exists (is_stale then reports it)
+            self.set_base_layer(RecipeLayer(self.base_file, RecipeStore.from_records([])))
+
+    def set_base_layer(self, layer: RecipeLayer):
+        # Overlays were interned on the old base's tables, so they are rebuilt on the new ones
+        overlay_files = self.overlay_files
+        self.base = layer
+        self.overlay_cache = {}
+        self._merged = None
+        self.overlays = self._load_overlays(overlay_files)
+
+    def set_base(self, store: RecipeStore):
+        """
+        Replaces the base layer with an already built store of base_file (e.g. one patched
+        by RecipeStore.apply_update after the file was rewritten). Overlays are re-merged
+        on top of it.
+        """
+        mtime = os.path.getmtime(self.base_file) if os.path.exists(self.base_file) else None
+        self.set_base_layer(RecipeLayer(self.base_file, store, mtime=mtime))
+
+    def _overlay(self, path) -> RecipeLayer:
+        layer = self.overlay_cache.get(path)
+        if layer is None or layer.is_stale():
+            layer = self.overlay_cache[path] = RecipeLayer.from_json(path, tables=self.base.store.tables)
+        return layer
+
+    def _load_overlays(self, overlay_files: List[str]) -> List[RecipeLayer]:
+        # Missing or unreadable overlays are skipped (and listed in skipped_overlays)
+        layers, self.skipped_overlays = [], []
+        for path in overlay_files:
+            try:
+                layers.append(self._overlay(path))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Skipping recipe overlay {path}: {e}")
+                self.skipped_overlays.append((path, str(e)))
+        return layers
+
+    def set_overlays(self, overlay_files: List[str]):
+        """
+        Uses overlay_files on top of the base. Overlays that are missing or cannot be read
+        are left out; overlay_files then lists the ones in use.
+        """
+        if self.base is None or self.base.is_stale():
+            self._load_base()
+        self.overlays = self._load_overlays(overlay_files)
+        self._merged = None
+
+    def merged(self) -> RecipeStore:
+        """
+        The merged recipe set. Reloads any layer whose file changed since it was read;
+        with no overlays this is the base store itself.
+        """
+        if self.base.is_stale():
+            self._load_base()
+        if any(layer.is_stale() for layer in self.overlays):
+            self.overlays = self._load_overlays(self.overlay_files)
+            self._merged = None
+        if self._merged is None:
+            with span("load.merge_layers", layers=1 + len(self.overlays)):
+                self._merged = merge_layers([self.base] + self.overlays)
+        return self._merged
+
+    def origins(self) -> Dict[str, str]:
+        # Recipe name -> file of the layer its merged definition comes from
+        origins = {}
+        for layer in [self.base] + self.overlays:
+            for name in layer.removed:
+                origins.pop(name, None)
+            origins.update(dict.fromkeys(layer.index, layer.path))
+        return origins
+
+def merge_layers(layers: List[RecipeLayer]) -> RecipeStore:
+    """
+    Merges layers built on the same intern tables; later layers take precedence.
+    Only the names of each overlay are looked up in the layers below, so merging
+    costs the overlay sizes plus array copies.
+    """
+    if len(layers) == 1:
+        return layers[0].store
+    keep = [np.ones(len(layer.store), dtype=bool) for layer in layers]
+    for k, layer in enumerate(layers[1:], start=1):
+        for name in list(layer.index) + layer.removed:
+            for j in range(k):
+                for row in layers[j].index.get(name, ()):
+                    keep[j][row] = False
+    return RecipeStore.concat([layer.store for layer in layers]).subset(np.concatenate(keep))
+
+def load_layered_recipes(base_file, overlay_files: List[str] = ()) -> RecipeStore:
+    # One-shot merged store (headless paths such as the solver service)
+    return LayeredRecipeSource(base_file, overlay_files).merged()
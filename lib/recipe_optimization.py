@@ -1,52 +1,261 @@
+import io, json
 import pulp
+import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, Tuple
+from lib.recipe_store import RecipeStore, NO_ID
+from lib.profiling import span
 
 # --- Optimization code ---
 
-def run_recipe_optimization(materials_df: pd.DataFrame, recipes: List[Dict]) -> Dict:
+def run_recipe_optimization(materials_df: pd.DataFrame, recipes, model: "CompiledRecipeModel" = None) -> Tuple[Dict, float, Dict]:
     """
     Solves the recipe selection problem to satisfy all non-base material requests while minimizing total power usage.
-    Returns a dict: {recipe_name: count_used, ...}
-    """
-    # Identify non-base materials to satisfy
-    to_satisfy = [row["Material"] for _, row in materials_df.iterrows()]
-    requested = {row["Material"]: row["Requested"] + row["Required"] for _, row in materials_df.iterrows()}
-    # Decision variables: one per recipe
-    recipe_vars = []
-    prob = pulp.LpProblem("SatisfactoryRecipeOptimization", pulp.LpMinimize)
-    for i, recipe in enumerate(recipes):
-        var = pulp.LpVariable(f"Recipe_{i}", lowBound=0, cat="Continuous")
-        recipe_vars.append(var)
-    # Objective: minimize total power usage
-    def get_recipe_power(recipe):
-        prod_in = recipe.get("Produced in", [])
-        if prod_in and isinstance(prod_in, list) and "Pwr Cons" in prod_in[0]:
-            return float(prod_in[0]["Pwr Cons"])
-        raise ValueError(f"Power consumption not found for recipe: {recipe.get('Recipe', 'Unknown')}")
-    prob += pulp.lpSum([get_recipe_power(recipes[i]) * recipe_vars[i] for i in range(len(recipes))])
-    # Constraints: for each non-base material, total produced >= requested+required
-    for mat in to_satisfy:
-        # Sum up all production of mat from all recipes
-        prod_sum = []
-        ingred_sum = []
-        for i, recipe in enumerate(recipes):
-            for prod in recipe.get("Products", []):
-                if prod["Material"] == mat:
-                    prod_sum.append(prod["Quantity"] * recipe_vars[i])
-            for ing in recipe.get("Ingredients", []):
-                if ing["Material"] == mat:
-                    ingred_sum.append(ing["Quantity"] * recipe_vars[i])
-                    
-        if prod_sum:
-            prob += pulp.lpSum(prod_sum) >= pulp.lpSum(ingred_sum) + requested[mat]
-        else:
-            raise ValueError(f"Material '{mat}' cannot be produced by any recipe.")
-
-    # Solve
-    result = prob.solve()
-    # Gather solution
-    solution = {recipes[i]["Recipe"]: float(recipe_vars[i].varValue) if recipe_vars[i].varValue is not None else 0 for i in range(len(recipes))}
-    # Calculate total power consumption
-    total_power = sum(get_recipe_power(recipes[i]) * solution[recipes[i]["Recipe"]] for i in range(len(recipes)))
-    return solution, total_power
\ No newline at end of file
+    recipes may be a RecipeStore or a list of recipe dicts; pass a CompiledRecipeModel of the same recipes to skip compiling.
+    Returns a tuple: ({recipe_name: count_used, ...}, total_power, flow_ledger)
+    See compute_flow_ledger for the layout of flow_ledger.
+    """
+    if model is None:
+        model = CompiledRecipeModel(recipes)
+    # Materials to satisfy and their requested+required amounts
+    requested = dict(zip(materials_df["Material"], materials_df["Requested"] + materials_df["Required"]))
+    return model.solve(requested)
+
+class CompiledRecipeModel:
+    """
+    Solver-ready form of a recipe set, built once and reused for every demand.
+
+    Holds the incidence triplets with duplicate (material, recipe) entries summed and
+    grouped by material, so each balance constraint is a slice instead of a scan over
+    all recipes.
+    """
+    __slots__ = ("store", "incidence", "entries", "bounds", "recipe_idx", "quantity", "has_producer", "power")
+
+    def __init__(self, recipes):
+        store = recipes if isinstance(recipes, RecipeStore) else RecipeStore.from_records(recipes)
+        self._check_power(store)
+        with span("model.build", recipes=len(store)):
+            incidence = store.incidence()
+            self._load(store, incidence, *self._sum_entries(incidence, len(store)))
+
+    @staticmethod
+    def _check_power(store):
+        missing_power = np.isnan(store.power)
+        if missing_power.any():
+            raise ValueError(f"Power consumption not found for recipe: {store.names[np.argmax(missing_power)] or 'Unknown'}")
+
+    @staticmethod
+    def _sum_entries(incidence, n_recipes):
+        # Sum duplicate (material, recipe) pairs (a recipe listing mat as ingredient and product) and sort by material
+        n_recipes = max(n_recipes, 1)
+        keys = incidence["material_idx"].astype(np.int64) * n_recipes + incidence["recipe_idx"]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        quantity = np.bincount(inverse, weights=incidence["quantity"], minlength=len(unique_keys))
+        return unique_keys // n_recipes, unique_keys % n_recipes, quantity
+
+    def _load(self, store, incidence, material_idx, recipe_idx, quantity):
+        self.store = store
+        self.power = store.power.tolist()
+        self.incidence = incidence
+        self.entries = (material_idx, recipe_idx, quantity)  # summed entries sorted by (material, recipe)
+        self.bounds = np.searchsorted(material_idx, np.arange(len(store.materials) + 1)).tolist()
+        self.recipe_idx = recipe_idx.tolist()
+        self.quantity = quantity.tolist()
+        has_producer = np.zeros(len(store.materials), dtype=bool)
+        has_producer[incidence["material_idx"][incidence["quantity"] > 0]] = True
+        self.has_producer = has_producer
+
+    def apply_update(self, store: RecipeStore, source: np.ndarray) -> "CompiledRecipeModel":
+        """
+        Returns the model of an updated recipe set (see RecipeStore.apply_update).
+        source[i] is the row of self.store that row i of store was copied from, or NO_ID;
+        the summed entries of copied rows are renumbered and reused, and only the NO_ID
+        rows are aggregated anew.
+        """
+        with span("model.update", recipes=len(store)):
+            return self._apply_update(store, source)
+
+    def _apply_update(self, store, source):
+        fresh = np.flatnonzero(source == NO_ID)
+        fresh_store = store.subset(fresh)
+        self._check_power(fresh_store)
+
+        kept = np.flatnonzero(source != NO_ID)
+        old_to_new = np.full(len(self.store), NO_ID, dtype=np.int64)
+        old_to_new[source[kept]] = kept
+        material_idx, recipe_idx, quantity = self.entries
+        recipe_idx = old_to_new[recipe_idx]
+        keep = recipe_idx != NO_ID
+
+        fresh_material, fresh_recipe, fresh_quantity = self._sum_entries(fresh_store.incidence(), len(fresh))
+        material_idx = np.concatenate([material_idx[keep], fresh_material])
+        recipe_idx = np.concatenate([recipe_idx[keep], fresh[fresh_recipe]])
+        quantity = np.concatenate([quantity[keep], fresh_quantity])
+        order = np.lexsort((recipe_idx, material_idx))
+
+        model = CompiledRecipeModel.__new__(CompiledRecipeModel)
+        model._load(store, store.incidence(), material_idx[order], recipe_idx[order], quantity[order])
+        return model
+
+    def solve(self, requested: Dict[str, float], solver=None) -> Tuple[Dict, float, Dict]:
+        """
+        Minimizes total power so that net production of every material in requested
+        is >= its amount. Returns (solution, total_power, flow_ledger).
+        """
+        store = self.store
+        with span("lp.build", recipes=len(store), constraints=len(requested)):
+            # Decision variables: one per recipe
+            prob = pulp.LpProblem("SatisfactoryRecipeOptimization", pulp.LpMinimize)
+            recipe_vars = [pulp.LpVariable(f"Recipe_{i}", lowBound=0, cat="Continuous") for i in range(len(store))]
+            # Objective: minimize total power usage
+            prob += pulp.LpAffineExpression(zip(recipe_vars, self.power))
+
+            # Constraints: for each material, net production (products - ingredients) >= requested+required
+            for mat, amount in requested.items():
+                mat_id = store.materials.get(mat)
+                if mat_id == NO_ID or not self.has_producer[mat_id]:
+                    raise ValueError(f"Material '{mat}' cannot be produced by any recipe.")
+                lo, hi = self.bounds[mat_id], self.bounds[mat_id + 1]
+                net = pulp.LpAffineExpression([(recipe_vars[r], q) for r, q in zip(self.recipe_idx[lo:hi], self.quantity[lo:hi])])
+                prob += net >= amount
+
+        # Solve (CBC runs as a subprocess)
+        with span("lp.solve"):
+            result = prob.solve(solver)
+        status = pulp.LpStatus[result]
+        if status != "Optimal":
+            raise ValueError(f"No feasible production plan for the requested materials (solver status: {status}).")
+        with span("flow_ledger"):
+            # Gather solution
+            counts = np.array([var.varValue if var.varValue is not None else 0.0 for var in recipe_vars], dtype=np.float64)
+            solution = {name: float(count) for name, count in zip(store.names, counts)}
+            # Calculate total power consumption
+            total_power = float(store.power @ counts)
+            flow_ledger = compute_flow_ledger(store, solution, self.incidence, counts)
+        return solution, total_power, flow_ledger
+
+    def solve_demand(self, demand: Dict[str, float], solver=None) -> Tuple[Dict, float, Dict]:
+        """
+        Headless counterpart of the GUI Calculate: every material of the recipe set must
+        balance (>= 0) and the demanded materials must net at least their amount.
+        """
+        available = self.store.used_materials()
+        unknown = sorted(set(demand) - set(available))
+        if unknown:
+            raise ValueError(f"Materials not available in the recipe set: {', '.join(unknown)}")
+        requested = {mat: float(demand.get(mat, 0.0)) for mat in available}
+        return self.solve(requested, solver)
+
+def options_key(options) -> str:
+    # Canonical key of an advanced-options profile (None/-1 mean "everything unlocked")
+    return json.dumps(options if isinstance(options, dict) else None, sort_keys=True)
+
+def compile_recipe_model(recipes, options=None) -> CompiledRecipeModel:
+    # Applies the advanced-options unlock filter (dict, or None/-1 for everything) and compiles the result
+    store = recipes if isinstance(recipes, RecipeStore) else RecipeStore.from_records(recipes)
+    if isinstance(options, dict):
+        store = store.subset(store.unlocked_mask(options))
+    return CompiledRecipeModel(store)
+
+def plan_rows(recipes, solution: Dict) -> list:
+    # (machine, recipe, count, power in MW) for every recipe used by the solution
+    store = recipes if isinstance(recipes, RecipeStore) else RecipeStore.from_records(recipes)
+    rows = []
+    for name, machine, power in zip(store.names, store.machine, store.power):
+        count = solution.get(name, 0.0)
+        if count > 0:
+            rows.append((store.machines[machine] or 'Unknown Machine', name, count, float(count * power)))
+    return rows
+
+# --- Material flow ledger ---
+
+def build_incidence(recipes) -> Dict:
+    """
+    COO triplets of the recipe x material incidence matrix for a RecipeStore or a list
+    of recipe dicts. Products carry a positive quantity and ingredients a negative one,
+    so incidence @ recipe_counts is the net flow.
+    """
+    store = recipes if isinstance(recipes, RecipeStore) else RecipeStore.from_records(recipes)
+    return store.incidence()
+
+def compute_flow_ledger(recipes, solution: Dict, incidence: Dict = None, counts: np.ndarray = None) -> Dict:
+    """
+    Computes per-minute material flows of a solved plan in one sparse mat-vec pass.
+    counts (one value per recipe row) takes precedence over the name-keyed solution,
+    which cannot tell apart recipes sharing a name.
+    Returns a dict with two DataFrames:
+      "materials":     Material, Produced, Consumed, Net (one row per material touched by a used recipe)
+      "contributions": Recipe, Material, Count, Rate (signed; positive is produced, negative is consumed)
+    """
+    if incidence is None:
+        incidence = build_incidence(recipes)
+    if counts is None:
+        counts = np.array([solution.get(name, 0.0) or 0.0 for name in incidence["recipes"]], dtype=np.float64)
+    n_materials = len(incidence["materials"])
+
+    # Sparse mat-vec: each triplet contributes quantity * count of its recipe
+    rates = incidence["quantity"] * counts[incidence["recipe_idx"]]
+    is_product = incidence["quantity"] > 0
+    produced = np.bincount(incidence["material_idx"], weights=np.where(is_product, rates, 0.0), minlength=n_materials)
+    consumed = np.bincount(incidence["material_idx"], weights=np.where(is_product, 0.0, -rates), minlength=n_materials)
+
+    net = produced - consumed
+    net[np.abs(net) < 1e-6] = 0.0  # solver round-off on balanced materials
+
+    used = rates != 0.0
+    touched = np.bincount(incidence["material_idx"][used], minlength=n_materials) > 0
+    materials = np.asarray(incidence["materials"], dtype=object)
+    materials_ledger = pd.DataFrame({
+        "Material": materials[touched],
+        "Produced": produced[touched],
+        "Consumed": consumed[touched],
+        "Net": net[touched],
+    }).sort_values("Material", ignore_index=True)
+
+    recipe_names = np.asarray(incidence["recipes"], dtype=object)
+    contributions = pd.DataFrame({
+        "Recipe": recipe_names[incidence["recipe_idx"][used]],
+        "Material": materials[incidence["material_idx"][used]],
+        "Count": counts[incidence["recipe_idx"][used]],
+        "Rate": rates[used],
+    })
+    return {"materials": materials_ledger, "contributions": contributions}
+
+def write_flow_ledger(f, flow_ledger: Dict):
+    """
+    Writes the materials part of a flow ledger to a text file as a fixed-width table
+    (rates per minute), one line at a time.
+    """
+    ledger = flow_ledger["materials"]
+    if ledger.empty:
+        f.write("No material flows.\n")
+        return
+    width = max(len("Material"), ledger["Material"].str.len().max())
+    f.write(f"{'Material':<{width}}  {'Produced':>12}  {'Consumed':>12}  {'Net':>12}\n")
+    for mat, prod, cons, net in ledger[["Material", "Produced", "Consumed", "Net"]].itertuples(index=False):
+        f.write(f"{mat:<{width}}  {prod:>12.3f}  {cons:>12.3f}  {net:>12.3f}\n")
+
+def format_flow_ledger(flow_ledger: Dict) -> str:
+    f = io.StringIO()
+    write_flow_ledger(f, flow_ledger)
+    return f.getvalue()
+
+def write_flow_contributions(f, flow_ledger: Dict):
+    """
+    Writes the per-recipe contributions of a flow ledger to a text file as a fixed-width
+    table (signed rates per minute; negative is consumed), one line at a time.
+    """
+    contributions = flow_ledger["contributions"]
+    if contributions.empty:
+        f.write("No recipe contributions.\n")
+        return
+    recipe_width = max(len("Recipe"), contributions["Recipe"].str.len().max())
+    material_width = max(len("Material"), contributions["Material"].str.len().max())
+    f.write(f"{'Recipe':<{recipe_width}}  {'Material':<{material_width}}  {'Count':>12}  {'Rate':>12}\n")
+    for recipe, mat, count, rate in contributions[["Recipe", "Material", "Count", "Rate"]].itertuples(index=False):
+        f.write(f"{recipe:<{recipe_width}}  {mat:<{material_width}}  {count:>12.4f}  {rate:>12.3f}\n")
+
+def format_flow_contributions(flow_ledger: Dict) -> str:
+    f = io.StringIO()
+    write_flow_contributions(f, flow_ledger)
+    return f.getvalue()
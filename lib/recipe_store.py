@@ -0,0 +1,390 @@
+import hashlib, json
+import numpy as np
+from typing import Dict, List, Tuple
+from lib.profiling import span
+
+# --- Compact recipe store ---
+
+NO_ID = -1  # Sentinel for "no machine / tier / section / MAM node" in the int id arrays
+
+class InternTable:
+    """
+    Append-only name <-> id table. Ids are dense ints in insertion order, so an id
+    handed out once stays valid for every store sharing the table.
+    """
+    __slots__ = ("names", "ids")
+
+    def __init__(self, names: List[str] = ()):
+        self.names = []
+        self.ids = {}
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name) -> int:
+        if name is None or name == "":
+            return NO_ID
+        idx = self.ids.get(name)
+        if idx is None:
+            idx = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+    def get(self, name, default=NO_ID) -> int:
+        return self.ids.get(name, default)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, idx):
+        return self.names[idx] if idx != NO_ID else None
+
+class RecipeStore:
+    """
+    Array-backed replacement for the list-of-dicts recipe data.
+
+    Materials, machines, tier sections and MAM trees/nodes are interned into shared
+    InternTables; every per-recipe field is a flat NumPy array. Ingredients and
+    products use a CSR layout: the entries of recipe i are [ptr[i], ptr[i + 1]) of
+    the matching *_mat / *_qty arrays.
+
+    Unlock fields are typed: tier_level/tier_section/mam_tree/mam_node hold NO_ID
+    when absent, alternate is a bool array and no_unlock marks recipes whose
+    'Unlocked by' is empty (always available, e.g. Onboarding and extraction).
+    """
+    __slots__ = (
+        "names", "materials", "machines", "sections", "trees", "nodes",
+        "power", "machine",
+        "ing_ptr", "ing_mat", "ing_qty", "prod_ptr", "prod_mat", "prod_qty",
+        "tier_level", "tier_section", "mam_tree", "mam_node", "alternate", "no_unlock",
+        "_recipe_index", "_content_hash",
+    )
+
+    def __init__(self, names, tables, power, machine, ingredients, products, unlocks):
+        self.names = names
+        self.materials, self.machines, self.sections, self.trees, self.nodes = tables
+        self.power = power
+        self.machine = machine
+        self.ing_ptr, self.ing_mat, self.ing_qty = ingredients
+        self.prod_ptr, self.prod_mat, self.prod_qty = products
+        self.tier_level, self.tier_section, self.mam_tree, self.mam_node, self.alternate, self.no_unlock = unlocks
+        self._recipe_index = None
+        self._content_hash = None
+
+    # --- Construction ---
+
+    @classmethod
+    def from_records(cls, recipes: List[Dict], tables=None) -> "RecipeStore":
+        """
+        Builds a store from recipes in the Appendix A JSON format.
+        Pass tables (from another store) to share its interned ids.
+        """
+        if tables is None:
+            tables = (InternTable(), InternTable(), InternTable(), InternTable(), InternTable())
+        materials, machines, sections, trees, nodes = tables
+        n = len(recipes)
+        names = np.empty(n, dtype=object)
+        power = np.full(n, np.nan, dtype=np.float64)
+        machine = np.full(n, NO_ID, dtype=np.int32)
+        tier_level = np.full(n, NO_ID, dtype=np.int16)
+        tier_section = np.full(n, NO_ID, dtype=np.int32)
+        mam_tree = np.full(n, NO_ID, dtype=np.int32)
+        mam_node = np.full(n, NO_ID, dtype=np.int32)
+        alternate = np.zeros(n, dtype=bool)
+        no_unlock = np.zeros(n, dtype=bool)
+        ing_ptr = np.zeros(n + 1, dtype=np.int64)
+        prod_ptr = np.zeros(n + 1, dtype=np.int64)
+        ing_mat, ing_qty, prod_mat, prod_qty = [], [], [], []
+
+        for i, recipe in enumerate(recipes):
+            names[i] = recipe.get("Recipe", "")
+            produced_in = recipe.get("Produced in") or []
+            if produced_in:
+                machine[i] = machines.intern(produced_in[0].get("Machine"))
+                pwr = produced_in[0].get("Pwr Cons")
+                if pwr is not None:
+                    power[i] = float(pwr)
+            for item in recipe.get("Ingredients") or []:
+                ing_mat.append(materials.intern(item["Material"]))
+                ing_qty.append(float(item["Quantity"]))
+            for item in recipe.get("Products") or []:
+                prod_mat.append(materials.intern(item["Material"]))
+                prod_qty.append(float(item["Quantity"]))
+            ing_ptr[i + 1] = len(ing_mat)
+            prod_ptr[i + 1] = len(prod_mat)
+
+            ub = recipe.get("Unlocked by")
+            if not ub or not isinstance(ub, dict):
+                no_unlock[i] = True
+                continue
+            alternate[i] = bool(ub.get("Alternate"))
+            if ub.get("Tier"):
+                t = ub["Tier"][0]
+                if t.get("Level") is not None:
+                    tier_level[i] = int(t["Level"])
+                tier_section[i] = sections.intern(t.get("Section"))
+            if ub.get("MAM Research"):
+                m = ub["MAM Research"][0]
+                mam_tree[i] = trees.intern(m.get("Tree"))
+                mam_node[i] = nodes.intern(m.get("Node"))
+
+        return cls(
+            names, tables, power, machine,
+            (ing_ptr, np.asarray(ing_mat, dtype=np.int32), np.asarray(ing_qty, dtype=np.float64)),
+            (prod_ptr, np.asarray(prod_mat, dtype=np.int32), np.asarray(prod_qty, dtype=np.float64)),
+            (tier_level, tier_section, mam_tree, mam_node, alternate, no_unlock),
+        )
+
+    @classmethod
+    def from_json(cls, json_file) -> "RecipeStore":
+        with span("load.json"):
+            with open(json_file, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        with span("load.store", recipes=len(records)):
+            return cls.from_records(records)
+
+    @classmethod
+    def concat(cls, stores: List["RecipeStore"]) -> "RecipeStore":
+        """
+        Stacks the rows of stores sharing the same intern tables (see from_records(tables=...)).
+        """
+        tables = stores[0].tables
+        if any(store.materials is not tables[0] for store in stores):
+            raise ValueError("RecipeStore.concat needs stores built on the same intern tables.")
+
+        def stack_csr(ptr_slot, mat_slot, qty_slot):
+            ptrs = [getattr(store, ptr_slot) for store in stores]
+            offsets = np.cumsum([0] + [ptr[-1] for ptr in ptrs[:-1]])
+            ptr = np.concatenate([ptrs[0][:1]] + [p[1:] + off for p, off in zip(ptrs, offsets)])
+            return (ptr, np.concatenate([getattr(store, mat_slot) for store in stores]),
+                    np.concatenate([getattr(store, qty_slot) for store in stores]))
+
+        def stack(slot):
+            return np.concatenate([getattr(store, slot) for store in stores])
+
+        return cls(
+            stack("names"), tables, stack("power"), stack("machine"),
+            stack_csr("ing_ptr", "ing_mat", "ing_qty"),
+            stack_csr("prod_ptr", "prod_mat", "prod_qty"),
+            tuple(stack(slot) for slot in ("tier_level", "tier_section", "mam_tree", "mam_node", "alternate", "no_unlock")),
+        )
+
+    def apply_update(self, names: List[str], records: List) -> Tuple["RecipeStore", np.ndarray]:
+        """
+        Builds the store of an updated recipe set without re-parsing unchanged recipes.
+
+        names lists the recipe of every row of the updated set, in order; records[i] is
+        the Appendix A record of row i, or None when the recipe names[i] is unchanged and
+        its row is copied from this store. Only the given records go through
+        from_records (on the shared intern tables); the rest is array copies.
+        Returns (store, source): source[i] is the row of this store that row i was
+        copied from, or NO_ID for rows built from records.
+        """
+        index = self.recipe_index
+        source = np.array([index[name] if record is None else NO_ID for name, record in zip(names, records)],
+                          dtype=np.int64)
+        fresh = np.flatnonzero(source == NO_ID)
+        fresh_store = RecipeStore.from_records([records[i] for i in fresh], tables=self.tables)
+        # Rows of [self, fresh_store] in the order of the updated set
+        take = source.copy()
+        take[fresh] = len(self) + np.arange(len(fresh))
+        return RecipeStore.concat([self, fresh_store]).subset(take), source
+
+    @property
+    def tables(self):
+        return (self.materials, self.machines, self.sections, self.trees, self.nodes)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self) -> int:
+        # Bytes held by the NumPy arrays (names/intern tables are shared Python objects)
+        return sum(getattr(self, slot).nbytes for slot in self.__slots__
+                   if isinstance(getattr(self, slot, None), np.ndarray))
+
+    @property
+    def recipe_index(self) -> Dict[str, int]:
+        # Recipe name -> row, built on first use
+        if self._recipe_index is None:
+            self._recipe_index = {name: i for i, name in enumerate(self.names)}
+        return self._recipe_index
+
+    def content_hash(self) -> str:
+        """
+        Stable hex digest of the recipe set (names, resolved material/machine/unlock
+        names and all arrays). Ids are hashed by the name they stand for, so equal recipe
+        data gives equal hashes across runs and across stores whose intern tables were
+        filled in a different order (e.g. after apply_update); computed once per store.
+        """
+        if self._content_hash is None:
+            h = hashlib.blake2b(digest_size=16)
+            h.update("\0".join(self.names.tolist()).encode("utf-8"))
+            for table, slot in ((self.machines, "machine"), (self.materials, "ing_mat"), (self.materials, "prod_mat"),
+                                (self.sections, "tier_section"), (self.trees, "mam_tree"), (self.nodes, "mam_node")):
+                # NO_ID indexes the trailing empty name
+                names = np.asarray(table.names + [""], dtype=object)
+                h.update(b"\1" + "\0".join(names[getattr(self, slot)].tolist()).encode("utf-8"))
+            for slot in ("power", "ing_ptr", "ing_qty", "prod_ptr", "prod_qty", "tier_level", "alternate", "no_unlock"):
+                h.update(np.ascontiguousarray(getattr(self, slot)).tobytes())
+            self._content_hash = h.hexdigest()
+        return self._content_hash
+
+    # --- Adapters back to the Appendix A format ---
+
+    def record(self, i: int) -> Dict:
+        a, b = self.ing_ptr[i], self.ing_ptr[i + 1]
+        c, d = self.prod_ptr[i], self.prod_ptr[i + 1]
+        if self.no_unlock[i]:
+            unlocked_by = ""
+        else:
+            unlocked_by = {
+                "Tier": [{"Level": int(self.tier_level[i]) if self.tier_level[i] != NO_ID else None,
+                          "Section": self.sections[self.tier_section[i]]}]
+                        if self.tier_level[i] != NO_ID or self.tier_section[i] != NO_ID else None,
+                "MAM Research": [{"Tree": self.trees[self.mam_tree[i]], "Node": self.nodes[self.mam_node[i]]}]
+                                if self.mam_tree[i] != NO_ID else None,
+                "Alternate": bool(self.alternate[i]),
+            }
+        return {
+            "Recipe": self.names[i],
+            "Ingredients": [{"Material": self.materials[m], "Quantity": float(q)}
+                            for m, q in zip(self.ing_mat[a:b], self.ing_qty[a:b])],
+            "Produced in": [{"Machine": self.machines[self.machine[i]],
+                             "Pwr Cons": None if np.isnan(self.power[i]) else float(self.power[i])}]
+                           if self.machine[i] != NO_ID else [],
+            "Products": [{"Material": self.materials[m], "Quantity": float(q)}
+                         for m, q in zip(self.prod_mat[c:d], self.prod_qty[c:d])],
+            "Unlocked by": unlocked_by,
+        }
+
+    def to_records(self) -> List[Dict]:
+        return [self.record(i) for i in range(len(self))]
+
+    def __iter__(self):
+        return (self.record(i) for i in range(len(self)))
+
+    # --- Views ---
+
+    @staticmethod
+    def _take_csr(ptr, mat, qty, rows):
+        lengths = ptr[rows + 1] - ptr[rows]
+        new_ptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=new_ptr[1:])
+        # Position of every kept entry: its row start plus its offset inside the row
+        starts = np.repeat(ptr[rows] - new_ptr[:-1], lengths)
+        take = starts + np.arange(new_ptr[-1], dtype=np.int64)
+        return new_ptr, mat[take], qty[take]
+
+    def subset(self, rows) -> "RecipeStore":
+        """
+        Returns a store with only the given rows (bool mask or index array).
+        The intern tables are shared, so material/machine ids stay comparable.
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return RecipeStore(
+            self.names[rows], self.tables, self.power[rows], self.machine[rows],
+            self._take_csr(self.ing_ptr, self.ing_mat, self.ing_qty, rows),
+            self._take_csr(self.prod_ptr, self.prod_mat, self.prod_qty, rows),
+            (self.tier_level[rows], self.tier_section[rows], self.mam_tree[rows], self.mam_node[rows],
+             self.alternate[rows], self.no_unlock[rows]),
+        )
+
+    def incidence(self) -> Dict:
+        """
+        COO triplets of the recipe x material incidence matrix: products are positive,
+        ingredients negative, so incidence @ recipe_counts is the net flow per material.
+        """
+        n = len(self)
+        rows = np.arange(n, dtype=np.int32)
+        return {
+            "recipes": self.names,
+            "materials": self.materials.names,
+            "recipe_idx": np.concatenate([np.repeat(rows, np.diff(self.prod_ptr)), np.repeat(rows, np.diff(self.ing_ptr))]),
+            "material_idx": np.concatenate([self.prod_mat, self.ing_mat]),
+            "quantity": np.concatenate([self.prod_qty, -self.ing_qty]),
+        }
+
+    def material_counts(self):
+        # (number of producing entries, number of consuming entries) per material id
+        n_materials = len(self.materials)
+        return (np.bincount(self.prod_mat, minlength=n_materials),
+                np.bincount(self.ing_mat, minlength=n_materials))
+
+    def row_materials(self, rows) -> List[str]:
+        # Sorted names of the materials the given rows (bool mask or index array) consume or produce
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        mats = np.union1d(self._take_csr(self.ing_ptr, self.ing_mat, self.ing_qty, rows)[1],
+                          self._take_csr(self.prod_ptr, self.prod_mat, self.prod_qty, rows)[1])
+        return sorted(self.materials[m] for m in mats.tolist())
+
+    def used_materials(self) -> List[str]:
+        # Sorted names of every material appearing in this store's ingredients or products
+        produced, consumed = self.material_counts()
+        names = np.asarray(self.materials.names, dtype=object)
+        return sorted(names[(produced > 0) | (consumed > 0)].tolist())
+
+    # --- Unlocks ---
+
+    def unlocked_mask(self, options: Dict) -> np.ndarray:
+        """
+        Boolean mask of the recipes unlocked by the advanced options
+        ({"tier", "sections", "mam", "alternate"}). Alternates are only unlocked when
+        selected by name and their tier/MAM conditions are satisfied.
+        """
+        tier = options.get("tier")
+        sections = options.get("sections", [])
+        mam = options.get("mam", {})
+        alternate = options.get("alternate", [])
+
+        selected_alt = np.zeros(len(self), dtype=bool)
+        index = self.recipe_index
+        for name in alternate or []:
+            if name in index:
+                selected_alt[index[name]] = True
+        allowed = ~self.alternate | selected_alt
+
+        if tier is None and not mam:
+            conditions = np.ones(len(self), dtype=bool)
+        else:
+            conditions = np.zeros(len(self), dtype=bool)
+            if tier is not None:
+                section_ids = [self.sections.get(sec) for sec in sections if self.sections.get(sec) != NO_ID]
+                has_tier = self.tier_level != NO_ID
+                conditions |= has_tier & ((self.tier_level < tier) |
+                                          ((self.tier_level == tier) & np.isin(self.tier_section, section_ids)))
+            if mam:
+                # Encode (tree, node) pairs as one int64 key per recipe
+                n_nodes = len(self.nodes) + 1
+                keys = [self.trees.get(tree) * n_nodes + self.nodes.get(node)
+                        for tree, node_list in mam.items() if self.trees.get(tree) != NO_ID
+                        for node in node_list if self.nodes.get(node) != NO_ID]
+                recipe_keys = self.mam_tree.astype(np.int64) * n_nodes + self.mam_node
+                conditions |= (self.mam_tree != NO_ID) & np.isin(recipe_keys, keys)
+
+        return self.no_unlock | (allowed & conditions)
+
+    def unlock_catalogs(self):
+        """
+        Returns ({tier_level: [sections]}, {mam_tree: [nodes]}, [alternate recipe names]), all sorted.
+        """
+        locked = ~self.no_unlock
+        tier_sections = {}
+        for lvl, sec in set(zip(self.tier_level[locked & (self.tier_level != NO_ID)].tolist(),
+                                self.tier_section[locked & (self.tier_level != NO_ID)].tolist())):
+            secs = tier_sections.setdefault(lvl, set())
+            if sec != NO_ID:
+                secs.add(self.sections[sec])
+        mam_nodes = {}
+        for tree, node in set(zip(self.mam_tree[locked & (self.mam_tree != NO_ID)].tolist(),
+                                  self.mam_node[locked & (self.mam_tree != NO_ID)].tolist())):
+            nodes = mam_nodes.setdefault(self.trees[tree], set())
+            if node != NO_ID:
+                nodes.add(self.nodes[node])
+        alternates = sorted(set(name for name in self.names[locked & self.alternate] if name))
+        return ({lvl: sorted(tier_sections[lvl]) for lvl in sorted(tier_sections)},
+                {tree: sorted(mam_nodes[tree]) for tree in sorted(mam_nodes)},
+                alternates)
@@ -1,6 +1,10 @@
+import numpy as np
 import pandas as pd
-import requests, re, json, os
+import requests, re, json, os, sys
 from io import StringIO
+from lib.recipe_store import RecipeStore, NO_ID
+from lib.profiling import profiled, span
+import lib.wiki_parser as wiki_parser
 
 DEFAULT_RECIPE_URL               = "https://satisfactory.wiki.gg/wiki/Recipes"
 DEFAULT_RECIPE_JSON_FILE         = os.path.join(".cache", "Satisfactory_recipes.json")
@@ -40,115 +44,40 @@ RESOURCE_MAXIMUMS = {
     "Water": 13125.0
 }
 
+# Per-cell parsers over the compiled wiki table parser (lib/wiki_parser.py); the update
+# itself parses whole columns with wiki_parser.parse_recipe_table.
+
 # Parse 'Unlocked by' column to SRD structure
 def parse_unlocked_by(recipe_name, unlocked_str):
-    import re
-    result = {
-        "Tier": None,
-        "MAM Research": None,
-        "Alternate": False
-    }
-
-    # Alternate: last word in recipe name is 'Alternate'
-    if isinstance(recipe_name, str) and recipe_name.strip().endswith("Alternate"):
-        result["Alternate"] = True
-    elif unlocked_str.strip() == "Onboarding":
-        return ""
-
-    if not isinstance(unlocked_str, str):
-        return result
-
-    # Format 3: OR
-    if " OR " in unlocked_str:
-        parts = unlocked_str.split(" OR ")
-        tier = None
-        mam = None
-        for part in parts:
-            tier_match = re.match(r"Tier (\d+) - ([^-]+)", part)
-            mam_match = re.match(r"MAM ([^-]+) - ([^-]+)", part)
-            if tier_match:
-                tier = [{"Level": int(tier_match.group(1)), "Section": tier_match.group(2).strip()}]
-            if mam_match:
-                mam = [{"Tree": mam_match.group(1).strip(), "Node": mam_match.group(2).strip()}]
-        result["Tier"] = tier
-        result["MAM Research"] = mam
-        return result
-
-    # Format 1: Tier
-    tier_match = re.match(r"Tier (\d+) - ([^-]+)", unlocked_str)
-    if tier_match:
-        result["Tier"] = [{"Level": int(tier_match.group(1)), "Section": tier_match.group(2).strip()}]
-        return result
-
-    # Format 2: MAM
-    mam_match = re.match(r"MAM ([^-]+) - ([^-]+)", unlocked_str)
-    if mam_match:
-        result["MAM Research"] = [{"Tree": mam_match.group(1).strip(), "Node": mam_match.group(2).strip()}]
-        return result
-
-    # If not matched, leave as None
-    return result
+    return wiki_parser.parse_unlocked_cell(recipe_name, unlocked_str)[0]
 
 def parse_machine_and_power(produced_in_str):
     """
     Parses the 'Produced in' string and returns a dict with 'Machine' and 'Pwr Cons'.
     If a power range is present, uses the max value. Otherwise, uses MACHINE_POWER_CONSUMPTION.
+    Returns [] when the string is not in one of these formats, like the other per-cell parsers;
+    wiki_parser.parse_machine_cell (or the ParseReport of parse_recipe_table) gives the reason.
     """
-    import re
-
-    # Pattern for format 2: "<Machine> <number> sec <Power Range> MW"
-    match = re.match(r'([A-Za-z ]+?)\s+\d+(\.\d+)?\s+sec\s+([\d,\.]+)\s*-\s*([\d,\.]+)\s*MW', produced_in_str)
-    if match:
-        machine = match.group(1).strip()
-        max_power = float(match.group(4).replace(',', ''))
-        return [{"Machine": machine, "Pwr Cons": max_power}]
-
-    # Pattern for format 2 (single value): "<Machine> <number> sec <Power> MW"
-    match = re.match(r'([A-Za-z ]+?)\s+\d+(\.\d+)?\s+sec\s+([\d,\.]+)\s*MW', produced_in_str)
-    if match:
-        machine = match.group(1).strip()
-        power = float(match.group(3).replace(',', ''))
-        return [{"Machine": machine, "Pwr Cons": power}]
-    
-    # Pattern for format 1: "<Machine> <number> sec"
-    match = re.match(r'([A-Za-z ]+?)\s+\d+(\.\d+)?\s+sec', produced_in_str)
-    if match:
-        machine = match.group(1).strip()
-        power = MACHINE_POWER_CONSUMPTION.get(machine, None)
-        return [{"Machine": machine, "Pwr Cons": power}]
-
-    # If no match, return an empty list
-    return []
+    return wiki_parser.parse_machine_cell(produced_in_str, MACHINE_POWER_CONSUMPTION)[0]
 
 def parse_materials(s):
-    if not isinstance(s, str):
-        return []
-    pattern = r'[\d,.]+ x ([^0-9]+?)([\d,\.]+) / min'
-    matches = re.findall(pattern, s)
-    return [{"Material": m[0].strip(), "Quantity": float(m[1].replace(',','').strip())} for m in matches]
+    return wiki_parser.parse_materials_cell(s)[0]
 
 def scrub_table_data(cell):
-    if isinstance(cell, str):
-        # Replace non-breaking space with regular space
-        cell = cell.replace('\xa0', ' ')
-        cell = cell.replace('\u00d7', 'x')
-
-        # Remove any string matching 'Craft Bench  × <variable number>'
-        patterns = [r'Craft Bench\s+x\s+\d+', r'Equipment Workshop\s+x\s+\d+']
-        # Remove patterns from cell strings
-        for pattern in patterns:
-            cell = re.sub(pattern, '', cell)
-        cell = cell.strip()
-    return cell
+    return wiki_parser.scrub_cell(cell)
 
+@profiled("update_recipes_table_from_html")
 def update_recipes_table_from_html( url = DEFAULT_RECIPE_URL, json_file = DEFAULT_RECIPE_JSON_FILE ):
+    # Writes the parsed Recipes table to json_file and returns the wiki_parser.ParseReport of its cells
     # Fetch the HTML content
-    response = requests.get(url)
-    response.raise_for_status()
-    html = response.text
+    with span("scrape.fetch", url=url):
+        response = requests.get(url)
+        response.raise_for_status()
+        html = response.text
 
     # Use pandas to read all tables in the HTML
-    tables = pd.read_html(StringIO(html))
+    with span("scrape.read_html"):
+        tables = pd.read_html(StringIO(html))
 
     # Find the table with the expected columns
     required_columns = DEFAULT_RECIPE_DF_COLS
@@ -157,21 +86,16 @@ def update_recipes_table_from_html( url = DEFAULT_RECIPE_URL, json_file = DEFAUL
         columns = table.columns.astype(str)
         if all(col in columns for col in required_columns):
             columns_found = True
-            # Select only the relevant columns
-            df = table[required_columns]
-            df = df.map(scrub_table_data)
-            # Remove rows where 'Produced in' is empty or equal to ""
-            df = df[df["Produced in"].replace("", pd.NA).notna()]
-            # Parse 'Ingredients', 'Products' and 'Produced In' columns
-            df["Products"]    = df["Products"].apply(parse_materials)
-            df["Ingredients"] = df["Ingredients"].apply(parse_materials)
-            df["Produced in"] = df["Produced in"].apply(parse_machine_and_power)
-            df["Unlocked by"] = [parse_unlocked_by(rn, ub) for rn, ub in zip(df["Recipe"], df["Unlocked by"])]
+            with span("scrape.parse", rows=len(table)):
+                df, report = wiki_parser.parse_recipe_table(table, MACHINE_POWER_CONSUMPTION)
+            if report.n_failures:
+                print(f"{report.n_failures} recipe table cells could not be parsed:\n{report.format_failures()}")
             break
 
     if columns_found:
         # Save to JSON file
-        df.to_json(json_file, orient="records", indent=2)
+        with span("scrape.write"):
+            df.to_json(json_file, orient="records", indent=2)
 
         # Build dictionary of base materials and fetch extraction MJ values from wiki
         recipes = load_recipes_from_json(json_file)
@@ -179,43 +103,55 @@ def update_recipes_table_from_html( url = DEFAULT_RECIPE_URL, json_file = DEFAUL
         base_materials = materials_df[materials_df["Base Material"] == True]["Material"].tolist()
         # Add base material extraction recipes to the DataFrame
         new_rows = []
-        for mat in base_materials:
-            produced_in = "Resource Extraction"
-            try:
-                url = f"https://satisfactory.fandom.com/wiki/{mat.replace(' ', '_')}"
-                resp = requests.get(url)
-                resp.raise_for_status()
-                match = re.search(r'It takes about <span[^>]*title="([\d\.]+)"', resp.text)
-                if match:
-                    power = float(match.group(1)) / 60.0  # Convert from MJ/min to MW
-                elif mat == "Water":
-                    power = 10.0 / 60.0  # Convert from MJ/min to MW
-                else:
-                    print(f"Could not find extraction MJ value for material: {mat} at {url}")
+        with span("scrape.fetch_extraction", materials=len(base_materials)):
+            for mat in base_materials:
+                produced_in = "Resource Extraction"
+                try:
+                    url = f"https://satisfactory.fandom.com/wiki/{mat.replace(' ', '_')}"
+                    resp = requests.get(url)
+                    resp.raise_for_status()
+                    match = re.search(r'It takes about <span[^>]*title="([\d\.]+)"', resp.text)
+                    if match:
+                        power = float(match.group(1)) / 60.0  # Convert from MJ/min to MW
+                    elif mat == "Water":
+                        power = 10.0 / 60.0  # Convert from MJ/min to MW
+                    else:
+                        print(f"Could not find extraction MJ value for material: {mat} at {url}")
+                        power = 10000 # set a high power value to discourage use
+                        produced_in = "Hand Crank"
+                except Exception as e:
+                    print(f"Error fetching data for material: {mat} at {url}: {e}")
                     power = 10000 # set a high power value to discourage use
                     produced_in = "Hand Crank"
-            except Exception as e:
-                print(f"Error fetching data for material: {mat} at {url}: {e}")
-                power = 10000 # set a high power value to discourage use
-                produced_in = "Hand Crank"
-
-            new_rows.append({
-            "Recipe": f"{mat} Extraction",
-            "Ingredients": [],
-            "Produced in": [{"Machine": produced_in, "Pwr Cons": power}],
-            "Products": [{"Material": mat, "Quantity": 1.0}],
-            "Unlocked by": ""
-            })
+
+                new_rows.append({
+                "Recipe": f"{mat} Extraction",
+                "Ingredients": [],
+                "Produced in": [{"Machine": produced_in, "Pwr Cons": power}],
+                "Products": [{"Material": mat, "Quantity": 1.0}],
+                "Unlocked by": ""
+                })
 
         # Append new rows to the DataFrame and save again
         if new_rows:
-            df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
-            df.to_json(json_file, orient="records", indent=2)
-        return
+            with span("scrape.write"):
+                df = pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
+                df.to_json(json_file, orient="records", indent=2)
+        return report
     
     raise ValueError("Could not find the a table with all the required columns.")
 
-def get_recipe_diffs(old_json_file, new_json_file):
+def diff_recipe_data(old_data, new_data):
+    """
+    Compares two recipe lists (Appendix A format).
+    Returns a dict with:
+      "added", "removed": sorted recipe names
+      "old_names":        recipe names of old_data in order (to check a store was loaded from it)
+      "changes":          {recipe name: [readable change lines]} for common recipes
+      "names", "records": the new recipes in order; records[i] is None when recipe names[i]
+                          is identical in both lists (and not duplicated), else its new record,
+                          as expected by RecipeStore.apply_update
+    """
 
     def compare_lists(field, list1, list2):
         if field in ["Ingredients", "Products"]:
@@ -240,19 +176,6 @@ def get_recipe_diffs(old_json_file, new_json_file):
         mam = tuple((m.get("Tree"), m.get("Node")) for m in (ub.get("MAM Research") or [])) if ub.get("MAM Research") else None
         alt = ub.get("Alternate", None)
         return (tier, mam, alt)
-    
-    # Check if both files exist
-    if not os.path.isfile(old_json_file):
-        # raise FileNotFoundError(f"Old JSON file not found: {old_json_file}")
-        return "Old JSON file not found. Assuming all recipes are new."
-    if not os.path.isfile(new_json_file):
-        raise FileNotFoundError(f"New JSON file not found: {new_json_file}")
-
-    # Load both files
-    with open(old_json_file, "r", encoding="utf-8") as f:
-        old_data = json.load(f)
-    with open(new_json_file, "r", encoding="utf-8") as f:
-        new_data = json.load(f)
 
     # Index by recipe name
     old_recipes = {r["Recipe"]: r for r in old_data}
@@ -266,11 +189,7 @@ def get_recipe_diffs(old_json_file, new_json_file):
     common = old_names & new_names
 
     fields_to_compare = DEFAULT_RECIPE_DF_COLS
-    diff_lines = []
-    if added:
-        diff_lines.append("Recipes added:\n" + "\n".join(sorted(added)))
-    if removed:
-        diff_lines.append("Recipes removed:\n" + "\n".join(sorted(removed)))
+    changes_by_name = {}
     for name in sorted(common):
         changes = []
         for field in fields_to_compare:
@@ -290,75 +209,131 @@ def get_recipe_diffs(old_json_file, new_json_file):
                 if old_val != new_val:
                     changes.append(f"  Field '{field}' changed:\n    Old: {old_val}\n    New: {new_val}")
         if changes:
-            diff_lines.append(f"Recipe changed: {name}\n" + "\n".join(changes))
+            changes_by_name[name] = changes
+
+    # Rows that can be copied as-is: exact same record and a name that is unique on both sides
+    duplicated = (len(old_recipes) != len(old_data)) or (len(new_recipes) != len(new_data))
+    counts = {}
+    if duplicated:
+        for r in old_data + new_data:
+            counts[r["Recipe"]] = counts.get(r["Recipe"], 0) + 1
+    names, records = [], []
+    for r in new_data:
+        name = r["Recipe"]
+        unchanged = name in old_recipes and old_recipes[name] == r and counts.get(name, 2) == 2
+        names.append(name)
+        records.append(None if unchanged else r)
+
+    return {"added": sorted(added), "removed": sorted(removed), "changes": changes_by_name,
+            "old_names": [r["Recipe"] for r in old_data], "names": names, "records": records}
+
+def format_recipe_diff(diff):
+    # Readable summary of a diff_recipe_data result for the confirmation dialog
+    diff_lines = []
+    if diff["added"]:
+        diff_lines.append("Recipes added:\n" + "\n".join(diff["added"]))
+    if diff["removed"]:
+        diff_lines.append("Recipes removed:\n" + "\n".join(diff["removed"]))
+    for name, changes in diff["changes"].items():
+        diff_lines.append(f"Recipe changed: {name}\n" + "\n".join(changes))
     if not diff_lines:
         diff_lines.append("No differences found.")
 
     return "\n\n".join(diff_lines)
 
+@profiled("get_recipe_update")
+def get_recipe_update(old_json_file, new_json_file):
+    # diff_recipe_data of two recipe files, or None when there is no old file to compare against
+    if not os.path.isfile(old_json_file):
+        return None
+    if not os.path.isfile(new_json_file):
+        raise FileNotFoundError(f"New JSON file not found: {new_json_file}")
+    return diff_recipe_data(load_recipes_from_json(old_json_file), load_recipes_from_json(new_json_file))
+
+@profiled("get_recipe_diffs")
+def get_recipe_diffs(old_json_file, new_json_file):
+    diff = get_recipe_update(old_json_file, new_json_file)
+    if diff is None:
+        # raise FileNotFoundError(f"Old JSON file not found: {old_json_file}")
+        return "Old JSON file not found. Assuming all recipes are new."
+    return format_recipe_diff(diff)
+
+@profiled("load_recipes_from_json")
 def load_recipes_from_json(json_file):
     # Load recipe data
     with open(json_file, "r", encoding="utf-8") as f:
         recipes = json.load(f)
     return recipes
 
+@profiled("get_materials_df")
 def get_materials_df(recipes):
-
-    # Collect all materials from Ingredients and Products
-    ingredient_materials = set()
-    product_materials = set()
-    material_unlock_conditions = {}
-
-    for recipe in recipes:
-        unlocked_by = recipe.get("Unlocked by", {})
-        no_unlock = True if not unlocked_by else False
-        for prod in recipe.get("Products", []):
-            material = prod["Material"]
-            product_materials.add(material)
-            if material not in material_unlock_conditions:
-                material_unlock_conditions[material] = {"Tier": [], "MAM Research": [], "Alternate": [], "no_condition": no_unlock}
-
-            if no_unlock:
-                material_unlock_conditions[material]["no_condition"] = True
-                continue
-
-            if unlocked_by.get("Tier"):
-                material_unlock_conditions[material]["Tier"].extend(unlocked_by["Tier"])
-            if unlocked_by.get("MAM Research"):
-                material_unlock_conditions[material]["MAM Research"].extend(unlocked_by["MAM Research"])
-            if unlocked_by.get("Alternate"):
-                material_unlock_conditions[material]["Alternate"].extend(recipe.get("Recipe", ""))
-        for ing in recipe.get("Ingredients", []):
-            ingredient_materials.add(ing["Material"])
-
-    all_materials = ingredient_materials | product_materials
-
-    # Build rows for DataFrame
-    rows = []
-    for mat in sorted(all_materials):
-        base = mat in ingredient_materials and mat not in product_materials
-        end = mat in product_materials and mat not in ingredient_materials
-        produced = 0.0 # I need to handle this in the future.
-        if mat in RESOURCE_MAXIMUMS.keys():
-            base = True  # If it's a resource node material, it's a base material
-
-        unlock_conditions = material_unlock_conditions.get(mat, {"Tier": [], "MAM Research": [], "Alternate": False, "no_condition": True})
-
-        rows.append({
-            "Material": mat,
-            "Requested": 0.0,
-            "Required": 0.0,
-            "Produced": produced,
-            "Satisfied": produced >= 0.0,
-            "Base Material": base,
-            "End Material": end,
-            "Tier": unlock_conditions["Tier"],
-            "MAM Research": unlock_conditions["MAM Research"],
-            "Alternate": unlock_conditions["Alternate"],
-            "No Unlock": unlock_conditions["no_condition"]
-        })
-
-    df = pd.DataFrame(rows, columns=[
-        "Material", "Requested", "Required", "Produced", "Base Material", "End Material", "Tier", "MAM Research", "Alternate", "No Unlock"
-    ])
+    """
+    Builds the materials DataFrame (Appendix B) from a RecipeStore or a list of recipe dicts.
+    Unlock columns are typed summaries over the recipes producing each material:
+    'Tier' is the lowest unlocking tier level (nullable Int16), 'MAM Research' and
+    'Alternate' flag whether any MAM-unlocked / alternate recipe produces it.
+    """
+    store = recipes if isinstance(recipes, RecipeStore) else RecipeStore.from_records(recipes)
+    n_materials = len(store.materials)
+
+    # Per-material producer/consumer counts from the CSR entries
+    produced_count, consumed_count = store.material_counts()
+    product_recipe = np.repeat(np.arange(len(store)), np.diff(store.prod_ptr))
+
+    def any_producer(flags):
+        return np.bincount(store.prod_mat, weights=flags[product_recipe], minlength=n_materials) > 0
+
+    min_tier = np.full(n_materials, np.iinfo(np.int16).max, dtype=np.int16)
+    has_tier = (store.tier_level[product_recipe] != NO_ID) & ~store.no_unlock[product_recipe]
+    np.minimum.at(min_tier, store.prod_mat[has_tier], store.tier_level[product_recipe][has_tier])
+
+    present = (produced_count > 0) | (consumed_count > 0)
+    is_produced = produced_count > 0
+    names = np.asarray(store.materials.names, dtype=object)
+    order = np.flatnonzero(present)[np.argsort(names[present])]
+
+    # Materials nobody produces count as unlocked without conditions, as do products of unconditioned recipes
+    no_unlock = ~is_produced | any_producer(store.no_unlock)
+    base = ((consumed_count > 0) & ~is_produced) | np.isin(names, list(RESOURCE_MAXIMUMS.keys()))
+    end = is_produced & (consumed_count == 0)
+    tier = pd.array(min_tier[order], dtype="Int16")
+    tier[min_tier[order] == np.iinfo(np.int16).max] = pd.NA
+    produced = 0.0 # I need to handle this in the future.
+
+    df = pd.DataFrame({
+        "Material": names[order],
+        "Requested": 0.0,
+        "Required": 0.0,
+        "Produced": produced,
+        "Base Material": base[order],
+        "End Material": end[order],
+        "Tier": tier,
+        "MAM Research": any_producer((store.mam_tree != NO_ID) & ~store.no_unlock)[order],
+        "Alternate": any_producer(store.alternate & ~store.no_unlock)[order],
+        "No Unlock": no_unlock[order],
+    })
+    # Key rows by the interned material name so lookups/aggregation align on the index instead of scanning the column
+    df.index = pd.Index([sys.intern(mat) for mat in df["Material"]])
     return df
+
+def update_materials_df(materials_df, recipes, materials):
+    """
+    Recomputes only the rows of the given materials (e.g. those touched by a recipe update)
+    from a RecipeStore. Rows of materials no longer used are dropped, new ones are added,
+    and every other row of materials_df is kept as is.
+    """
+    store = recipes
+    mat_ids = [store.materials.get(mat) for mat in materials]
+    mat_ids = np.asarray([m for m in mat_ids if m != NO_ID], dtype=np.int64)
+    # Every recipe consuming or producing an affected material, so their summaries are complete
+    touching = np.zeros(len(store), dtype=bool)
+    touching[np.repeat(np.arange(len(store)), np.diff(store.ing_ptr))[np.isin(store.ing_mat, mat_ids)]] = True
+    touching[np.repeat(np.arange(len(store)), np.diff(store.prod_ptr))[np.isin(store.prod_mat, mat_ids)]] = True
+    part = get_materials_df(store.subset(touching))
+    part = part[part.index.isin(list(materials))]
+    kept = materials_df[~materials_df.index.isin(list(materials))]
+    if kept.empty:
+        return part
+    if part.empty:
+        return kept
+    return pd.concat([kept, part]).sort_index()
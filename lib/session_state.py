@@ -0,0 +1,70 @@
+import gzip, hashlib, json, os
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+import lib.recipe_optimization as recipe_op
+
+# --- Session snapshot (demand rows and last plan, restored on launch) ---
+
+SESSION_FILE    = os.path.join(".cache", "session.json.gz")
+SESSION_VERSION = 1
+
+def options_hash(options) -> str:
+    # Hash of the advanced-options key the solver service caches models under
+    return hashlib.sha1(recipe_op.options_key(options).encode("utf-8")).hexdigest()
+
+def plan_snapshot(solution: Dict, total_power: float, flow_ledger: Dict, recipe_hash: str, options) -> Dict:
+    """
+    A solved plan with the recipe-set hash and options it was solved for, as kept in
+    memory and written by write_session. Only recipes with a non-zero count are kept.
+    """
+    return {
+        "recipe_hash": recipe_hash,
+        "options_hash": options_hash(options),
+        "total_power": float(total_power),
+        "solution": {name: float(count) for name, count in solution.items() if count},
+        "flow_ledger": flow_ledger,
+    }
+
+def plan_matches(plan: Optional[Dict], recipe_hash: str, options) -> bool:
+    # True when a restored plan was solved for this recipe set and options profile
+    return plan is not None and plan["recipe_hash"] == recipe_hash and plan["options_hash"] == options_hash(options)
+
+def _frame_to_json(df: pd.DataFrame) -> Dict:
+    return {"columns": list(df.columns), "data": df.to_dict(orient="list")}
+
+def _frame_from_json(frame: Dict) -> pd.DataFrame:
+    return pd.DataFrame(frame["data"], columns=frame["columns"])
+
+def write_session(demand_rows: List[Tuple[str, str]], plan: Optional[Dict] = None, session_file=SESSION_FILE):
+    """
+    Writes the demand rows ((material, entry text) pairs) and the last plan (plan_snapshot)
+    as gzip-compressed JSON. The file is replaced atomically, so a crash never leaves
+    half a snapshot.
+    """
+    payload = {"version": SESSION_VERSION, "demand": [[mat, text] for mat, text in demand_rows]}
+    if plan is not None:
+        payload["plan"] = dict(plan, flow_ledger={name: _frame_to_json(df) for name, df in plan["flow_ledger"].items()})
+    os.makedirs(os.path.dirname(session_file) or ".", exist_ok=True)
+    tmp_file = session_file + ".tmp"
+    with gzip.open(tmp_file, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_file, session_file)
+
+def read_session(session_file=SESSION_FILE) -> Optional[Dict]:
+    """
+    Returns {"demand": [(material, text)], "plan": plan_snapshot or None}, or None when
+    there is no snapshot or it cannot be read (an unreadable snapshot is only a lost session).
+    """
+    if not os.path.exists(session_file):
+        return None
+    try:
+        with gzip.open(session_file, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != SESSION_VERSION:
+            return None
+        plan = payload.get("plan")
+        if plan is not None:
+            plan["flow_ledger"] = {name: _frame_from_json(frame) for name, frame in plan["flow_ledger"].items()}
+        return {"demand": [(mat, text) for mat, text in payload["demand"]], "plan": plan}
+    except (OSError, EOFError, ValueError, KeyError, TypeError):
+        return None
@@ -0,0 +1,263 @@
+"""
+Local HTTP/JSON solver service.
+
+Exposes the recipe optimizer to several users sharing one recipe database and
+advanced-options profile:
+
+    python satisfactory_calc_master.py --serve [--port 8765] [--workers N] [--overlay mod.json ...]
+
+Endpoints:
+    GET  /health  -> {"status", "recipes", "recipe_hash", "workers"}
+    POST /solve   <- {"demand": {material: amount per min}, "options": {...} (optional)}
+                  -> {"total_power", "plan", "flow", "contributions", "timings", "coalesced"}
+
+An asyncio front end parses requests and hands solves to a process pool. Each
+worker loads the recipe store once and keeps compiled models warm per options
+profile, and serializes its plan with the streaming JSON exporter (lib/plan_export.py),
+so the front end only splices the timings into the body. Identical in-flight
+queries are coalesced onto one solve.
+"""
+import argparse, asyncio, json, os, time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+import pulp
+import lib.recipe_optimization as recipe_op
+import lib.scrape_data as scrape_data
+import lib.demand_io as demand_io
+import lib.plan_export as plan_export
+from lib.recipe_layers import load_layered_recipes
+
+DEFAULT_HOST        = "127.0.0.1"
+DEFAULT_PORT        = 8765
+MAX_BODY_BYTES      = 1 << 20
+MAX_MODELS_PER_WORKER = 8
+
+# --- Worker process ---
+
+_worker = {"store": None, "models": {}}
+
+def validate_options(options):
+    """
+    Checks the shape of an advanced-options profile from a request body.
+    None/-1 mean "everything unlocked"; otherwise {"tier": int or null, "sections": [str],
+    "mam": {tree: [node]}, "alternate": [str]}.
+    """
+    if options is None or options == -1:
+        return
+    if not isinstance(options, dict):
+        raise ValueError("options must be an object, null or -1.")
+    tier = options.get("tier")
+    if tier is not None and (not isinstance(tier, int) or isinstance(tier, bool)):
+        raise ValueError(f"options.tier must be an integer or null, got {tier!r}.")
+    for key in ("sections", "alternate"):
+        value = options.get(key)
+        if value is not None and (not isinstance(value, list) or not all(isinstance(v, str) for v in value)):
+            raise ValueError(f"options.{key} must be a list of names.")
+    mam = options.get("mam")
+    if mam is not None and (not isinstance(mam, dict) or not all(
+            isinstance(nodes, list) and all(isinstance(n, str) for n in nodes) for nodes in mam.values())):
+        raise ValueError("options.mam must map research trees to lists of nodes.")
+
+def _init_worker(json_file, overlays, default_options):
+    _worker["store"] = load_layered_recipes(json_file, overlays)
+    _worker["models"] = {}
+    _get_model(default_options)
+
+def _get_model(options):
+    key = recipe_op.options_key(options)
+    models = _worker["models"]
+    model = models.pop(key, None)
+    if model is None:
+        model = recipe_op.compile_recipe_model(_worker["store"], options)
+        if len(models) >= MAX_MODELS_PER_WORKER:
+            models.pop(next(iter(models)))  # drop the least recently used profile
+    models[key] = model
+    return model
+
+def _warm_worker():
+    return os.getpid()
+
+def _solve_in_worker(demand, options):
+    t0 = time.perf_counter()
+    model = _get_model(options)
+    t1 = time.perf_counter()
+    solution, total_power, flow_ledger = model.solve_demand(demand, pulp.PULP_CBC_CMD(msg=False))
+    t2 = time.perf_counter()
+    plan = plan_export.plan_json(total_power, recipe_op.plan_rows(model.store, solution), flow_ledger)
+    t3 = time.perf_counter()
+    return {"plan_json": plan,
+            "timings": {"model_ms": (t1 - t0) * 1000.0, "solve_ms": (t2 - t1) * 1000.0, "export_ms": (t3 - t2) * 1000.0}}
+
+def encode_body(payload: dict) -> bytes:
+    """
+    JSON body of a response. A solve result's "plan_json" (the plan object, already
+    serialized by the worker) is extended with the other fields instead of being re-encoded.
+    """
+    plan = payload.get("plan_json")
+    if plan is None:
+        return json.dumps(payload).encode("utf-8")
+    fields = json.dumps({key: value for key, value in payload.items() if key != "plan_json"})
+    if fields != "{}":
+        plan = plan[:-1] + ", " + fields[1:]
+    return plan.encode("utf-8")
+
+# --- Asyncio front end ---
+
+class RequestError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+class SolverService:
+    """
+    Asyncio HTTP front end over a pool of warm solver workers.
+    Use port=0 to bind an ephemeral port (see self.port after start()).
+    overlays are recipe overlay files merged over json_file (see lib.recipe_layers).
+    """
+
+    def __init__(self, json_file=scrape_data.DEFAULT_RECIPE_JSON_FILE, options=-1,
+                 host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, overlays=()):
+        self.json_file = json_file
+        self.overlays = list(overlays)
+        self.options = options
+        self.host = host
+        self.port = port
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.executor = None
+        self.server = None
+        self.inflight = {}  # coalescing key -> asyncio.Future of the running solve
+        self.store = None
+
+    async def start(self) -> int:
+        self.store = load_layered_recipes(self.json_file, self.overlays)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.json_file, self.overlays, self.options))
+        loop = asyncio.get_running_loop()
+        # Start every worker now so the first requests hit compiled models
+        await asyncio.gather(*[loop.run_in_executor(self.executor, _warm_worker) for _ in range(self.workers)])
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Solver service listening on http://{self.host}:{self.port} "
+              f"({len(self.store)} recipes, {self.workers} workers)")
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def solve(self, demand: dict, options=None) -> dict:
+        """
+        Solves a demand, sharing the result with any identical query already in flight.
+        Returns {"plan_json", "timings", "coalesced"}; see encode_body for the response.
+        """
+        options = self.options if options is None else options
+        key = json.dumps({"demand": sorted(demand.items()), "options": recipe_op.options_key(options)})
+        start = time.perf_counter()
+        future = self.inflight.get(key)
+        coalesced = future is not None
+        if not coalesced:
+            loop = asyncio.get_running_loop()
+            future = asyncio.ensure_future(loop.run_in_executor(self.executor, _solve_in_worker, demand, options))
+            self.inflight[key] = future
+            future.add_done_callback(lambda f, k=key: self.inflight.pop(k, None))
+        result = dict(await asyncio.shield(future))
+        result["timings"] = dict(result["timings"], total_ms=(time.perf_counter() - start) * 1000.0)
+        result["coalesced"] = coalesced
+        return result
+
+    # --- HTTP ---
+
+    async def _handle(self, reader, writer):
+        try:
+            status, payload = await self._dispatch(reader)
+        except RequestError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+        body = encode_body(payload)
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("ascii") + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed request line.")
+        method, path = parts[0].upper(), parts[1].split("?", 1)[0]
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, {"status": "ok", "recipes": len(self.store),
+                                   "recipe_hash": self.store.content_hash(), "workers": self.workers}
+        if path == "/solve" and method == "POST":
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Content-Length must be an integer.")
+            if length < 0:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Content-Length must not be negative.")
+            if length > MAX_BODY_BYTES:
+                raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large.")
+            try:
+                request = json.loads(await reader.readexactly(length) or b"{}")
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {e}")
+            if not isinstance(request, dict) or not isinstance(request.get("demand"), dict):
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Body must be {\"demand\": {material: amount}, \"options\": {...}}.")
+            try:
+                validate_options(request.get("options"))
+                demand = demand_io.aggregate_demands(request["demand"].items())
+                return HTTPStatus.OK, await self.solve(demand, request.get("options"))
+            except ValueError as e:
+                raise RequestError(HTTPStatus.BAD_REQUEST, str(e))
+        if path in ("/health", "/solve"):
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}.")
+        raise RequestError(HTTPStatus.NOT_FOUND, f"Unknown path: {path}")
+
+def main(argv=None, default_options=-1, default_overlays=()):
+    parser = argparse.ArgumentParser(description="Serve the recipe optimizer over local HTTP/JSON.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--recipes", default=scrape_data.DEFAULT_RECIPE_JSON_FILE, help="Recipe JSON file (Appendix A format)")
+    parser.add_argument("--options", default=None, help="Advanced options JSON profile shared by all requests")
+    parser.add_argument("--overlay", action="append", default=None,
+                        help="Recipe overlay JSON merged over --recipes (repeatable; later files take precedence)")
+    args, _ = parser.parse_known_args(argv)
+    options = default_options
+    if args.options:
+        with open(args.options, "r", encoding="utf-8") as f:
+            options = json.load(f)
+    overlays = args.overlay if args.overlay is not None else list(default_overlays)
+    service = SolverService(args.recipes, options, args.host, args.port, args.workers, overlays)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
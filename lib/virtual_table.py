@@ -0,0 +1,322 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, List, Sequence
+
+# --- Virtualized table widget ---
+
+class VirtualTable(tk.Frame):
+    """
+    Sortable, filterable table that only creates Treeview items for the rows on screen.
+
+    The full data set lives in a Python list; the Treeview holds a fixed pool of
+    items (one per visible line) whose values are rewritten on scroll, sort or
+    filter. Opening a table costs the same for 10 rows or 100k rows. The selection
+    is kept as a data row index, so it follows the row rather than the pooled item.
+
+    columns:    list of (heading, width, anchor) tuples
+    formatters: optional per-column callables turning a raw cell value into display text
+    filter_columns: indices of the columns matched by set_filter (case-insensitive substring)
+    """
+
+    def __init__(self, parent, columns: Sequence, rows: List[Sequence] = (), formatters: Sequence[Callable] = None,
+                 filter_columns: Sequence[int] = (0,), row_height: int = 20):
+        super().__init__(parent)
+        self.columns = [c[0] for c in columns]
+        self.formatters = list(formatters) if formatters else [str] * len(columns)
+        self.filter_columns = list(filter_columns)
+        self.row_height = row_height
+        self.rows = list(rows)
+        self.view = list(range(len(self.rows)))  # indices into rows after filter + sort
+        self.offset = 0
+        self.selected = None  # index into rows of the selected row
+        self.sort_column = None
+        self.sort_descending = False
+        self.filter_text = ''
+
+        style = ttk.Style(self)
+        style.configure('Virtual.Treeview', rowheight=row_height)
+        self.tree = ttk.Treeview(self, columns=self.columns, show='headings', selectmode='browse',
+                                 style='Virtual.Treeview', height=1)
+        for i, (heading, width, anchor) in enumerate(columns):
+            self.tree.heading(heading, text=heading, command=lambda c=i: self.sort_by(c))
+            self.tree.column(heading, width=width, anchor=anchor, stretch=True)
+        self.scrollbar = tk.Scrollbar(self, orient='vertical', command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.items = []  # pooled Treeview item ids, one per visible line
+        self.tree.bind('<Configure>', self._on_configure)
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll(-1 * (e.delta // 120) * 3))
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+
+    # --- Data ---
+
+    def set_rows(self, rows: List[Sequence]):
+        self.rows = list(rows)
+        self.selected = None
+        self._rebuild_view()
+
+    def selected_row(self):
+        return self.rows[self.selected] if self.selected is not None else None
+
+    def set_filter(self, text: str):
+        self.filter_text = text.lower()
+        self._rebuild_view()
+
+    def sort_by(self, column: int, descending: bool = None):
+        if descending is None:
+            # Clicking the same heading again flips the order
+            descending = not self.sort_descending if self.sort_column == column else False
+        self.sort_column = column
+        self.sort_descending = descending
+        for i, heading in enumerate(self.columns):
+            arrow = (' ▼' if descending else ' ▲') if i == column else ''
+            self.tree.heading(heading, text=heading + arrow)
+        self._rebuild_view()
+
+    def _rebuild_view(self):
+        rows = self.rows
+        view = range(len(rows))
+        if self.filter_text:
+            text = self.filter_text
+            cols = self.filter_columns
+            view = [i for i in view if any(text in str(rows[i][c]).lower() for c in cols)]
+        if self.sort_column is not None:
+            column = self.sort_column
+            view = sorted(view, key=lambda i: rows[i][column], reverse=self.sort_descending)
+        view = list(view)
+        self.view = view
+        self.offset = 0
+        self._render()
+
+    # --- Rendering ---
+
+    def _on_configure(self, event):
+        visible = max(1, (event.height - self.row_height) // self.row_height)
+        while len(self.items) < visible:
+            self.items.append(self.tree.insert('', tk.END, values=()))
+        while len(self.items) > visible:
+            self.tree.delete(self.items.pop())
+        self._render()
+
+    def scroll(self, lines: int):
+        self.offset += lines
+        self._render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.offset = int(float(amount) * len(self.view))
+        elif action == 'scroll':
+            step = len(self.items) if unit == 'pages' else 1
+            self.offset += int(amount) * step
+        self._render()
+
+    def _render(self):
+        total = len(self.view)
+        visible = len(self.items)
+        self.offset = max(0, min(self.offset, total - visible))
+        selected_item = None
+        for k, item in enumerate(self.items):
+            idx = self.offset + k
+            if idx < total:
+                row_idx = self.view[idx]
+                self.tree.item(item, values=[fmt(v) for fmt, v in zip(self.formatters, self.rows[row_idx])])
+                if row_idx == self.selected:
+                    selected_item = item
+            else:
+                self.tree.item(item, values=())
+        # Re-apply the selection to whichever pooled item now shows the selected row
+        if selected_item is not None:
+            if self.tree.selection() != (selected_item,):
+                self.tree.selection_set(selected_item)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_select(self, event):
+        # Only user clicks change the tracked row; an empty selection comes from _render
+        # scrolling the selected row off screen and must not forget it
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.items:
+            return
+        idx = self.offset + self.items.index(selection[0])
+        if idx < len(self.view):
+            self.selected = self.view[idx]
+        else:
+            self.tree.selection_remove(selection[0])
+
+class VirtualDemandList(tk.Frame):
+    """
+    Editable material -> amount list that only keeps one row of widgets per visible line.
+
+    Demands live in a dict (material -> entry text) plus an ordered key list with
+    lazy deletion: a name -> position index tells the live entries of the list from
+    removed ones, and the list is compacted only once removed entries make up
+    COMPACT_FRACTION of it. Adding, updating and removing a material are amortized
+    O(1), and scrolling slices the key list to rebind the pooled Label/Entry/Button rows.
+    """
+    COMPACT_FRACTION = 0.5
+    COMPACT_MIN      = 64  # below this many removed entries skipping them costs less than compacting
+
+    def __init__(self, parent, visible_rows: int = 7, on_remove: Callable = None):
+        super().__init__(parent)
+        self.demands = {}
+        self.order = []     # material names in display order; may hold removed names until compacted
+        self.position = {}  # live material -> its index in self.order
+        self.stale = 0      # removed (or re-added) names still in self.order
+        self.offset = 0
+        self.on_remove = on_remove
+
+        rows_frame = tk.Frame(self)
+        rows_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(self, orient='vertical', command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Fixed pool of row widgets; slot_names[k] is the material currently shown in slot k
+        self.slots = []
+        self.slot_names = [None] * visible_rows
+        for k in range(visible_rows):
+            row_frame = tk.Frame(rows_frame)
+            label = tk.Label(row_frame, text='', width=25, anchor='w')
+            label.pack(side='left', padx=5)
+            float_var = tk.StringVar()
+            entry = tk.Entry(row_frame, textvariable=float_var, width=10)
+            entry.pack(side='left', padx=5)
+            entry.bind('<FocusOut>', lambda e, k=k: self._on_edit(k))
+            entry.bind('<KeyRelease>', lambda e, k=k: self._on_edit(k))
+            remove_btn = tk.Button(row_frame, text='X', width=2, command=lambda k=k: self._on_remove_slot(k))
+            remove_btn.pack(side='left', padx=5)
+            for widget in (row_frame, label, entry, remove_btn):
+                widget.bind('<MouseWheel>', lambda e: self.scroll(-1 * (e.delta // 120)))
+                widget.bind('<Button-4>', lambda e: self.scroll(-1))
+                widget.bind('<Button-5>', lambda e: self.scroll(1))
+            self.slots.append({'frame': row_frame, 'label': label, 'entry': entry, 'var': float_var})
+        self._render()
+
+    # --- Model ---
+
+    def add(self, name: str, amount=None):
+        """
+        Adds a material (one entry per material). An amount for a material already in
+        the list is added to its current value. New materials are scrolled into view.
+        """
+        if name in self.demands:
+            if amount is not None:
+                try:
+                    current = float(self.demands[name])
+                except ValueError:
+                    current = 0.0
+                self.demands[name] = f"{current + float(amount):g}"
+        else:
+            # A re-added name's old entry (if still in self.order) is no longer its position
+            self.demands[name] = f"{float(amount):g}" if amount is not None else ''
+            self.position[name] = len(self.order)
+            self.order.append(name)
+            self.offset = len(self.order)  # clamped to the last page in _render
+        self._render()
+
+    def remove(self, name: str):
+        if self.demands.pop(name, None) is not None:
+            del self.position[name]
+            self.stale += 1
+            if self.stale > self.COMPACT_MIN and self.stale > self.COMPACT_FRACTION * len(self.order):
+                self._compact()
+            self._render()
+
+    def clear(self):
+        self.demands.clear()
+        self.order = []
+        self.position = {}
+        self.stale = 0
+        self.offset = 0
+        self._render()
+
+    def __len__(self):
+        return len(self.demands)
+
+    # --- Rendering ---
+
+    def scroll(self, lines: int):
+        self.offset += lines
+        self._render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.offset = int(float(amount) * len(self.order))
+        elif action == 'scroll':
+            self.offset += int(amount) * (len(self.slots) if unit == 'pages' else 1)
+        self._render()
+
+    def _compact(self):
+        # Drops the removed entries (amortized over the removals that made them)
+        position = self.position
+        self.offset = sum(1 for i, name in enumerate(self.order[:self.offset]) if position.get(name) == i)
+        self.order = [name for i, name in enumerate(self.order) if position.get(name) == i]
+        self.position = {name: i for i, name in enumerate(self.order)}
+        self.stale = 0
+
+    def _visible_names(self):
+        # Live names from self.offset (an index into self.order), skipping removed entries;
+        # near the end the page is filled from before the offset
+        order, position = self.order, self.position
+        visible = len(self.slots)
+        self.offset = max(0, min(self.offset, len(order) - visible))
+        names = []
+        i = self.offset
+        while i < len(order) and len(names) < visible:
+            if position.get(order[i]) == i:
+                names.append(order[i])
+            i += 1
+        i = self.offset - 1
+        while i >= 0 and len(names) < visible:
+            if position.get(order[i]) == i:
+                names.insert(0, order[i])
+                self.offset = i
+            i -= 1
+        return names
+
+    def _render(self):
+        names = self._visible_names()
+        for k, slot in enumerate(self.slots):
+            name = names[k] if k < len(names) else None
+            self.slot_names[k] = name
+            if name is None:
+                slot['frame'].grid_remove()
+                continue
+            slot['label'].config(text=name)
+            slot['var'].set(self.demands[name])
+            self._validate(slot)
+            slot['frame'].grid(row=k, column=0, sticky='ew', pady=2)
+        total = len(self.order)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(self.slots)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_edit(self, k):
+        name = self.slot_names[k]
+        if name is not None and name in self.demands:
+            self.demands[name] = self.slots[k]['var'].get()
+            self._validate(self.slots[k])
+
+    def _on_remove_slot(self, k):
+        name = self.slot_names[k]
+        if name is not None:
+            self.remove(name)
+            if self.on_remove:
+                self.on_remove(name)
+
+    @staticmethod
+    def _validate(slot):
+        # Only values > 0 are valid; an empty entry is neutral
+        val = slot['var'].get()
+        try:
+            ok = float(val) > 0
+        except ValueError:
+            ok = val == ''
+        slot['entry'].config(bg='white' if ok else 'mistyrose')
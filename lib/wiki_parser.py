@@ -0,0 +1,283 @@
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+import pandas as pd
+
+# --- Wiki Recipes table parser ---
+#
+# Parses the cells of the wiki Recipes table into the Appendix A fields, one whole
+# column per call, with module-level compiled patterns. Every column parser records
+# the format of each cell in a ParseReport, and every cell it could not parse fully
+# (no match, text left over, a malformed number, a machine without a known power) as
+# a failure, so nothing is dropped silently.
+#
+# Cell formats (after scrub_column):
+#   Ingredients/Products  "<amount> x <Material><rate> / min", repeated
+#   Produced in           "<Machine> <time> sec", optionally followed by "<power> MW"
+#                         or a range "<min> - <max> MW" (the max is used)
+#   Unlocked by           "Onboarding", "Tier <level> - <Section>", "MAM <Tree> - <Node>",
+#                         or several of these joined by " OR "; alternates are the
+#                         recipes whose name ends with "Alternate"
+
+_SCRUB_RE         = re.compile(r"(?:Craft Bench|Equipment Workshop)\s+x\s+\d+")
+_MATERIAL_RE      = re.compile(r"[\d,.]+ x ([^0-9]+?)([\d,\.]+) / min")
+_MACHINE_RE       = re.compile(r"([A-Za-z ]+?)\s+\d+(?:\.\d+)?\s+sec(?:\s+([\d,\.]+)\s*(?:-\s*([\d,\.]+)\s*)?MW)?")
+_TIER_RE          = re.compile(r"Tier (\d+) - ([^-]+)")
+_MAM_RE           = re.compile(r"MAM ([^-]+) - ([^-]+)")
+_SHAPE_RE         = re.compile(r"[A-Za-z]+(?: [A-Za-z]+)*|\d[\d,.]*")
+MAX_REPORT_SHAPES = 8
+
+class ParseReport:
+    """
+    Formats and failures of the parsed cells, per column:
+        formats   {column: Counter(format name -> cells)}
+        failures  {column: [(label, cell, reason)]}, label being the recipe name or row
+    """
+    __slots__ = ("formats", "failures")
+
+    def __init__(self):
+        self.formats = {}
+        self.failures = {}
+
+    def count(self, column, fmt, n=1):
+        self.formats.setdefault(column, Counter())[fmt] += n
+
+    def fail(self, column, label, cell, reason):
+        self.failures.setdefault(column, []).append((label, cell, reason))
+
+    @property
+    def n_failures(self) -> int:
+        return sum(len(failures) for failures in self.failures.values())
+
+    def format_failures(self, limit=20) -> str:
+        # One line per failed cell, at most limit lines
+        lines = []
+        for column, failures in self.failures.items():
+            for label, cell, reason in failures:
+                if len(lines) == limit:
+                    lines.append(f"... and {self.n_failures - limit} more")
+                    return "\n".join(lines)
+                lines.append(f"{label}: {column} {reason}: {cell!r}")
+        return "\n".join(lines)
+
+    def format_report(self) -> str:
+        """
+        Coverage report: the cells of each format per column, then the failures grouped by
+        reason and cell shape (words as 'A', numbers as '#') with a count and an example.
+        """
+        lines = []
+        for column, formats in self.formats.items():
+            total = sum(formats.values())
+            lines.append(f"{column} ({total} cells)")
+            for fmt, n in formats.most_common():
+                lines.append(f"  {fmt:<24}{n:>8}{100.0 * n / total:>8.1f}%")
+            shapes = Counter()
+            examples = {}
+            for _, cell, reason in self.failures.get(column, []):
+                key = (reason, cell_shape(cell))
+                shapes[key] += 1
+                examples.setdefault(key, cell)
+            if shapes:
+                lines.append("  Unmatched formats:")
+            for (reason, shape), n in shapes.most_common(MAX_REPORT_SHAPES):
+                lines.append(f"    {n:>6}  {reason:<16}{shape!r}  e.g. {examples[(reason, shape)]!r}")
+            if len(shapes) > MAX_REPORT_SHAPES:
+                lines.append(f"    ... {len(shapes) - MAX_REPORT_SHAPES} more shapes")
+        return "\n".join(lines)
+
+def cell_shape(cell) -> str:
+    # A cell with each run of words replaced by 'A' and each number by '#'
+    if not isinstance(cell, str):
+        return type(cell).__name__
+    return _SHAPE_RE.sub(lambda m: "A" if m.group(0)[0].isalpha() else "#", cell)
+
+def _labels(values, labels) -> Sequence:
+    if labels is not None:
+        return labels
+    if isinstance(values, pd.Series):
+        return values.index
+    return range(len(values))
+
+def _number(text) -> float:
+    return float(text.replace(",", ""))
+
+# --- Cells ---
+#
+# Each cell parser returns (value, format, failure reason or None).
+
+def scrub_cell(cell):
+    # Non-breaking spaces to spaces, '×' to 'x', Craft Bench / Equipment Workshop counts removed
+    if isinstance(cell, str):
+        cell = cell.replace("\xa0", " ").replace("×", "x")
+        if "Craft Bench" in cell or "Equipment Workshop" in cell:
+            cell = _SCRUB_RE.sub("", cell)
+        cell = cell.strip()
+    return cell
+
+def parse_materials_cell(s) -> Tuple[List[Dict], str, Optional[str]]:
+    if not isinstance(s, str) or not s:
+        return [], "empty", None
+    materials = []
+    reason = None
+    end = 0
+    for m in _MATERIAL_RE.finditer(s):
+        if s[end:m.start()].strip():
+            reason = "unmatched text"
+        end = m.end()
+        try:
+            materials.append({"Material": m.group(1).strip(), "Quantity": _number(m.group(2))})
+        except ValueError:
+            reason = "bad number"
+    if not materials and reason is None:
+        return [], "unmatched", "no material"
+    if s[end:].strip():
+        reason = "unmatched text"
+    return materials, "materials", reason
+
+def parse_machine_cell(s, machine_power: Dict[str, float]) -> Tuple[List[Dict], str, Optional[str]]:
+    if not isinstance(s, str) or not s:
+        return [], "empty", "no machine"
+    m = _MACHINE_RE.match(s)
+    if m is None:
+        return [], "unmatched", "no machine"
+    machine, power, max_power = m.group(1).strip(), m.group(2), m.group(3)
+    reason = "unmatched text" if s[m.end():].strip() else None
+    fmt = "sec power range" if max_power is not None else "sec power" if power is not None else "sec"
+    try:
+        if max_power is not None:
+            power = _number(max_power)
+        elif power is not None:
+            power = _number(power)
+        else:
+            power = machine_power.get(machine)
+    except ValueError:
+        return [], fmt, "bad number"
+    if power is None:
+        reason = "unknown power"
+    return [{"Machine": machine, "Pwr Cons": power}], fmt, reason
+
+def _parse_unlocked(alternate: bool, s):
+    if not isinstance(s, str):
+        s = ""
+    if not alternate and s.strip() == "Onboarding":
+        return "", "onboarding", None
+    result = {"Tier": None, "MAM Research": None, "Alternate": alternate}
+    reason = None
+    # " OR " joins alternatives; a later part replaces an earlier one of the same kind
+    for part in s.split(" OR "):
+        tier_match = _TIER_RE.match(part)
+        mam_match = _MAM_RE.match(part)
+        if tier_match:
+            result["Tier"] = [{"Level": int(tier_match.group(1)), "Section": tier_match.group(2).strip()}]
+        if mam_match:
+            result["MAM Research"] = [{"Tree": mam_match.group(1).strip(), "Node": mam_match.group(2).strip()}]
+        if not (tier_match or mam_match) and not alternate:
+            reason = "unmatched" if part.strip() else "empty"
+    if " OR " in s:
+        fmt = "or"
+    elif result["Tier"]:
+        fmt = "tier"
+    elif result["MAM Research"]:
+        fmt = "mam"
+    else:
+        fmt = "alternate" if alternate else "unmatched"
+    return result, fmt, reason
+
+def _is_alternate(recipe_name) -> bool:
+    return isinstance(recipe_name, str) and recipe_name.strip().endswith("Alternate")
+
+def parse_unlocked_cell(recipe_name, s):
+    """
+    (value, format, failure reason or None) of an 'Unlocked by' cell: "" for Onboarding
+    recipes, else {"Tier", "MAM Research", "Alternate"}. A missing cell is parsed as "".
+    """
+    return _parse_unlocked(_is_alternate(recipe_name), s)
+
+# --- Columns ---
+
+def scrub_column(values) -> list:
+    # scrub_cell of every cell; repeated cells (machines, unlocks) are scrubbed once
+    cache = {}
+    out = []
+    for cell in values:
+        if isinstance(cell, str):
+            scrubbed = cache.get(cell)
+            if scrubbed is None:
+                scrubbed = cache[cell] = scrub_cell(cell)
+            out.append(scrubbed)
+        else:
+            out.append(cell)
+    return out
+
+def _parse_column(parse, column, values, report, labels, memo, keys=None):
+    """
+    Parses every cell with parse (cell -> (value, format, reason), or (key, cell) -> ...
+    with keys) and records the formats and failures in report. With memo, equal cells
+    (and keys) are parsed once and share their value.
+    """
+    formats = Counter()
+    out = []
+    cache = {}
+    labels = _labels(values, labels)
+    for i, (label, cell) in enumerate(zip(labels, values)):
+        args = (cell,) if keys is None else (keys[i], cell)
+        if memo and isinstance(cell, str):
+            parsed = cache.get(args)
+            if parsed is None:
+                parsed = cache[args] = parse(*args)
+        else:
+            parsed = parse(*args)
+        value, fmt, reason = parsed
+        formats[fmt] += 1
+        if reason is not None:
+            report.fail(column, label, cell, reason)
+        out.append(value)
+    for fmt, n in formats.items():
+        report.count(column, fmt, n)
+    return out
+
+def parse_materials_column(values, report: ParseReport, column="Ingredients", labels=None) -> list:
+    # Ingredients or Products cells -> [{"Material", "Quantity"}] per cell
+    return _parse_column(parse_materials_cell, column, values, report, labels, memo=False)
+
+def parse_machine_column(values, machine_power: Dict[str, float], report: ParseReport, labels=None) -> list:
+    """
+    'Produced in' cells -> [{"Machine", "Pwr Cons"}] per cell; [] (and a failure) when the
+    cell does not match. Machines without a power in the cell use machine_power.
+    Equal cells share one parsed value.
+    """
+    return _parse_column(lambda s: parse_machine_cell(s, machine_power), "Produced in",
+                         values, report, labels, memo=True)
+
+def parse_unlocked_column(recipe_names, values, report: ParseReport, labels=None) -> list:
+    """
+    'Unlocked by' cells of the recipes recipe_names -> "" or {"Tier", "MAM Research",
+    "Alternate"} per cell. Equal cells of recipes that are both (or both not) alternates
+    share one parsed value.
+    """
+    recipe_names = list(recipe_names)
+    return _parse_column(_parse_unlocked, "Unlocked by", values, report,
+                         recipe_names if labels is None else labels, memo=True,
+                         keys=[_is_alternate(name) for name in recipe_names])
+
+def parse_recipe_table(table: pd.DataFrame, machine_power: Dict[str, float],
+                       drop_unproduced: bool = True) -> Tuple[pd.DataFrame, ParseReport]:
+    """
+    Scrubs and parses the Recipe, Ingredients, Produced in, Products and Unlocked by
+    columns of a wiki Recipes table into Appendix A fields. Rows whose 'Produced in' is
+    empty after scrubbing (hand-crafted only) are dropped when drop_unproduced.
+    Failures are labelled with the recipe name.
+    """
+    columns = ["Recipe", "Ingredients", "Produced in", "Products", "Unlocked by"]
+    report = ParseReport()
+    df = pd.DataFrame({col: scrub_column(table[col].tolist()) for col in columns}, index=table.index)
+    if drop_unproduced:
+        produced = df["Produced in"].map(lambda s: isinstance(s, str) and s != "")
+        report.count("Produced in", "dropped (empty)", int((~produced).sum()))
+        df = df[produced]
+    names = df["Recipe"].tolist()
+    df["Products"]    = parse_materials_column(df["Products"].tolist(), report, "Products", names)
+    df["Ingredients"] = parse_materials_column(df["Ingredients"].tolist(), report, "Ingredients", names)
+    df["Produced in"] = parse_machine_column(df["Produced in"].tolist(), machine_power, report, names)
+    df["Unlocked by"] = parse_unlocked_column(names, df["Unlocked by"].tolist(), report, names)
+    return df, report
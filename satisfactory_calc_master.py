@@ -1,12 +1,45 @@
 import tkinter as tk
 from tkinter import messagebox
 from tkinter import filedialog
+from tkinter import ttk
 import lib.scrape_data as scrape_data
 import lib.recipe_optimization as recipe_op
-import shutil, os, json, pandas as pd
+from lib.recipe_store import RecipeStore, NO_ID
+from lib.virtual_table import VirtualTable, VirtualDemandList
+import lib.demand_io as demand_io
+import lib.solver_service as solver_service
+import lib.multi_site as multi_site
+import lib.profiling as profiling
+import lib.session_state as session_state
+import lib.plan_export as plan_export
+from lib.recipe_layers import LayeredRecipeSource, load_layered_recipes, read_overlay_profile, write_overlay_profile
+import argparse, multiprocessing, shutil, os, json, numpy as np, pandas as pd
 
 CACHE_DIR = os.path.join(os.getcwd(), '.cache')
 ADVANCED_OPTIONS_FILE = os.path.join(CACHE_DIR, 'user_advanced_options.json')
+PROFILE_TRACE_FILE = os.path.join(CACHE_DIR, 'profile_trace.json')
+SESSION_FILE = os.path.join(CACHE_DIR, 'session.json.gz')
+
+# Parsed advanced options keyed by the file's mtime, so windows and filters do not re-read unchanged JSON
+_advanced_options_cache = {'mtime': None, 'options': -1}
+
+def read_user_advanced_options() -> dict | int:
+    # Returns the saved options dict (shared, do not mutate) or -1 if none were saved
+    cache_file = ADVANCED_OPTIONS_FILE
+    if not os.path.exists(cache_file):
+        return -1
+    mtime = os.path.getmtime(cache_file)
+    if _advanced_options_cache['mtime'] != mtime:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            _advanced_options_cache['options'] = json.load(f)
+        _advanced_options_cache['mtime'] = mtime
+    return _advanced_options_cache['options']
+
+def write_user_advanced_options(options: dict):
+    with open(ADVANCED_OPTIONS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(options, f, indent=2)
+    _advanced_options_cache['options'] = options
+    _advanced_options_cache['mtime'] = os.path.getmtime(ADVANCED_OPTIONS_FILE)
 
 class MaterialSelector(tk.Frame):
     def __init__(self, parent, MATERIALS_DF, RECIPES, calculate_callback, open_advanced_options_callback):
@@ -21,51 +54,50 @@ class MaterialSelector(tk.Frame):
         search_entry.grid(row=0, column=0, padx=5, pady=5, sticky='ew')
 
         # Dropdown menu (Listbox)
-        self.selected_materials = []
         self.dropdown = tk.Listbox(self, height=6, exportselection=False)
         self.dropdown.grid(row=1, column=0, padx=5, pady=5, sticky='ew')
         self.dropdown.bind('<<ListboxSelect>>', self.on_select)
-        self.reset_available_recipes(RECIPES, MATERIALS_DF)
 
-        # Frame for selected materials (with scrollbar)
+        # Frame for selected materials: one entry per material, only the visible rows have widgets
         self.selected_frame_container = tk.Frame(self)
         self.selected_frame_container.grid(row=2, column=0, sticky='nsew')
         self.selected_frame_container.grid_rowconfigure(0, weight=1)
         self.selected_frame_container.grid_columnconfigure(0, weight=1)
 
-        self.canvas = tk.Canvas(self.selected_frame_container, height=200)
-        self.scrollbar = tk.Scrollbar(self.selected_frame_container, orient='vertical', command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas)
-        self.scrollable_frame.bind(
-            "<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-        self.canvas.grid(row=0, column=0, sticky='nsew')
-        self.scrollbar.grid(row=0, column=1, sticky='ns')
+        self.demand_list = VirtualDemandList(self.selected_frame_container)
+        self.demand_list.grid(row=0, column=0, columnspan=2, sticky='nsew')
+        self.reset_available_recipes(RECIPES, MATERIALS_DF)
 
         self.grid_rowconfigure(2, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
-        # Advanced Options button to the left of Calculate
-        adv_btn = tk.Button(self.selected_frame_container, text="Advanced Options", width=15, height=2, command=self.open_advanced_options_callback)
-        adv_btn.grid(row=1, column=0, pady=10, sticky='w')
+        # Advanced Options and Import Demands buttons to the left of Calculate
+        left_btns = tk.Frame(self.selected_frame_container)
+        left_btns.grid(row=1, column=0, pady=10, sticky='w')
+        adv_btn = tk.Button(left_btns, text="Advanced Options", width=15, height=2, command=self.open_advanced_options_callback)
+        adv_btn.pack(side='left')
+        import_btn = tk.Button(left_btns, text="Import Demands", width=15, height=2, command=self.import_demands)
+        import_btn.pack(side='left', padx=10)
         calc_btn = tk.Button(self.selected_frame_container, text="Calculate", width=15, height=2, command=self.calculate_callback)
         calc_btn.grid(row=1, column=1, pady=10, sticky='e')
 
+    @property
+    def selected_materials(self) -> dict:
+        # {material: entry text}, one entry per material
+        return self.demand_list.demands
+
     def clear_selected_materials(self):
-        # Destroy all row frames in the UI
-        for mat in self.selected_materials:
-            mat['frame'].destroy()
-        self.selected_materials.clear()
+        self.demand_list.clear()
 
     def reset_recipes(self, RECIPES, MATERIALS_DF):
         self.clear_selected_materials()  # Ensure UI and list are both cleared
         self.MATERIALS_DF = MATERIALS_DF
         self.RECIPES = RECIPES
-        self.available_recipes = RECIPES.copy()
-        self.selected_materials = []  # List of dicts: {name, entry_widget, frame}
+        self.available_recipes = RECIPES  # RecipeStore is never mutated in place; filtering builds a subset
+        self.unlocked = None  # unlock mask over RECIPES (None: everything unlocked)
+        self.model = None     # compiled solver model of available_recipes, built on first Calculate
         self.available_materials = sorted(MATERIALS_DF['Material'].tolist())
-        self.filtered_materials = self.available_materials.copy()
+        self.filtered_materials = self.available_materials  # rebound (never mutated) by the search filter
 
     def reset_available_recipes(self, RECIPES, MATERIALS_DF):
         self.reset_recipes(RECIPES, MATERIALS_DF)
@@ -75,13 +107,7 @@ class MaterialSelector(tk.Frame):
         self.update_dropdown()
 
     def load_user_advanced_options(self) -> dict | int:
-        cache_file = ADVANCED_OPTIONS_FILE
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            return -1
-        return {"tier": None, "sections": [], "mam": {}, "alternate": []}
+        return read_user_advanced_options()
 
     def update_recipes_by_unlocked_conditions(self):
         # If not user advanced options, return all materials
@@ -91,60 +117,59 @@ class MaterialSelector(tk.Frame):
             raise ValueError("Invalid user advanced options data.")
   
 
-        unlocked_recipes = []
-        tier = self.user_advanced_options.get("tier")
-        sections = self.user_advanced_options.get("sections", [])
-        mam = self.user_advanced_options.get("mam", {})
-        alternate = self.user_advanced_options.get("alternate", [])
-
-        for recipe in self.RECIPES:
-            ub = recipe.get('Unlocked by', {})
-            # If no unlock conditions, always unlocked
-            if not ub:
-                unlocked_recipes.append(recipe)
-                continue
-            # Alternate unlock
-            # The alternate field is ONLY unlocked if the user specifically selects it, and the tier/MAM conditions are satisfied
-            if ub.get('Alternate'):
-                alt_name = recipe.get('Recipe', '')
-                if not (alternate and alt_name and alt_name in alternate):
-                    continue
-            if tier is None and not mam:
-                unlocked_recipes.append(recipe)
-                continue
-            # Tier unlock
-            if tier is not None and ub.get('Tier'):
-                t = ub['Tier'][0]
-                lvl = t.get('Level')
-                sec = t.get('Section')
-                if lvl is not None and ((lvl < tier) or (lvl == tier and sec in sections)):
-                    unlocked_recipes.append(recipe)
-                    continue
-            # MAM unlock
-            if mam and ub.get('MAM Research'):
-                m = ub['MAM Research'][0]
-                tree = m.get('Tree')
-                node = m.get('Node')
-                if tree in mam and node in mam[tree]:
-                    unlocked_recipes.append(recipe)
-                    continue
-
-        self.available_recipes = unlocked_recipes
+        # Recipes without unlock conditions are always unlocked; alternates only when specifically
+        # selected and their tier/MAM conditions are satisfied (see RecipeStore.unlocked_mask)
+        with profiling.span("update_recipes_by_unlocked_conditions", recipes=len(self.RECIPES)):
+            self.unlocked = self.RECIPES.unlocked_mask(self.user_advanced_options)
+            self.available_recipes = self.RECIPES.subset(self.unlocked)
     
     def update_available_materials(self):
-        unlocked_materials = set()
-        for recipe in self.available_recipes:
-            products = recipe.get('Products', [])
-            ingredients = recipe.get('Ingredients', [])
-            for product in products:
-                mat = product.get('Material', '')
-                if mat:
-                    unlocked_materials.add(mat)
-            for ingredient in ingredients:
-                mat = ingredient.get('Material', '')
-                if mat:
-                    unlocked_materials.add(mat)
-        self.available_materials = list(sorted(unlocked_materials))
+        self.available_materials = self.available_recipes.used_materials()
+
+    def get_model(self):
+        # Compiled model of the available recipes, reused until they change
+        if self.model is None or self.model.store is not self.available_recipes:
+            self.model = recipe_op.CompiledRecipeModel(self.available_recipes)
+        return self.model
+
+    def apply_recipe_update(self, RECIPES, MATERIALS_DF, source) -> list:
+        """
+        Switches to an updated recipe store without resetting the demand list.
+        source maps each row of RECIPES to its row in the previous store (NO_ID for new or
+        changed recipes); only those rows are unlock-filtered and compiled again.
+        Returns the demanded materials that were dropped because they are no longer available.
+        """
+        fresh = source == NO_ID
+        if self.unlocked is None:
+            unlocked = None
+            available_source = source
+        else:
+            unlocked = np.zeros(len(RECIPES), dtype=bool)
+            unlocked[~fresh] = self.unlocked[source[~fresh]]
+            unlocked[fresh] = RECIPES.subset(fresh).unlocked_mask(self.user_advanced_options)
+            # Rows of the new available subset -> rows of the old one
+            old_position = np.cumsum(self.unlocked) - 1
+            available_source = source[unlocked]
+            available_source = np.where(available_source != NO_ID, old_position[available_source], NO_ID)
+
+        if self.model is not None and self.model.store is self.available_recipes:
+            available_recipes = RECIPES if unlocked is None else RECIPES.subset(unlocked)
+            self.model = self.model.apply_update(available_recipes, available_source)
+            self.available_recipes = available_recipes
+        else:
+            self.model = None
+            self.available_recipes = RECIPES if unlocked is None else RECIPES.subset(unlocked)
+        self.RECIPES = RECIPES
+        self.MATERIALS_DF = MATERIALS_DF
+        self.unlocked = unlocked
+        self.update_available_materials()
+
+        available = set(self.available_materials)
+        dropped = [mat for mat in self.demand_list.demands if mat not in available]
+        for mat in dropped:
+            self.remove_material_row(mat)
+        self.update_dropdown()
+        return dropped
 
     def update_dropdown(self, *args):
         search_text = self.search_var.get().lower()
@@ -159,51 +184,47 @@ class MaterialSelector(tk.Frame):
             mat_name = self.filtered_materials[selection[0]]
             self.add_material_row(mat_name)
 
-    def add_material_row(self, mat_name):
-        # Allow multiple of same material
-        row_frame = tk.Frame(self.scrollable_frame)
-        row_frame.pack(fill='x', pady=2)
-        label = tk.Label(row_frame, text=mat_name, width=25, anchor='w')
-        label.pack(side='left', padx=5)
-        float_var = tk.StringVar()
-        entry = tk.Entry(row_frame, textvariable=float_var, width=10)
-        entry.pack(side='left', padx=5)
-        entry.bind('<FocusOut>', lambda e, v=float_var: self.validate_float(v, entry))
-        entry.bind('<KeyRelease>', lambda e, v=float_var: self.validate_float(v, entry))
-        remove_btn = tk.Button(row_frame, text='X', width=2, command=lambda: self.remove_material_row(row_frame))
-        remove_btn.pack(side='left', padx=5)
-        self.selected_materials.append({'name': mat_name, 'entry': entry, 'frame': row_frame, 'var': float_var})
-
-    def remove_material_row(self, row_frame):
-        for i, mat in enumerate(self.selected_materials):
-            if mat['frame'] == row_frame:
-                mat['frame'].destroy()
-                del self.selected_materials[i]
-                break
-
-    def validate_float(self, var, entry):
-        val = var.get()
+    def add_material_row(self, mat_name, amount=None):
+        # Selecting a material already in the list keeps its single entry (amounts from imports are summed)
+        self.demand_list.add(mat_name, amount)
+
+    def remove_material_row(self, mat_name):
+        self.demand_list.remove(mat_name)
+
+    def import_demands(self):
+        file_path = filedialog.askopenfilename(
+            title="Import Demands",
+            filetypes=[("Demand Files", "*.csv *.json"), ("CSV Files", "*.csv"), ("JSON Files", "*.json"), ("All Files", "*.*")]
+        )
+        if not file_path:
+            return
         try:
-            f = float(val)
-            if f > 0:
-                entry.config(bg='white')
-            else:
-                entry.config(bg='mistyrose')
-        except ValueError:
-            if val == '':
-                entry.config(bg='white')
-            else:
-                entry.config(bg='mistyrose')
+            demands = demand_io.load_demands(file_path)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+        available = set(self.available_materials)
+        unknown = [mat for mat in demands if mat not in available]
+        for mat, amount in demands.items():
+            if mat in available:
+                self.add_material_row(mat, amount)
+        if unknown:
+            messagebox.showwarning("Import Demands", "Skipped materials that are not available:\n" + "\n".join(unknown))
 
 class App:
     def __init__(self, root):
         self.root = root
         self.root.title("Satisfactory Calculator")
         self.root.geometry("600x600")
+        self.unlock_catalog_cache = {}  # recipe-set hash -> Advanced Options catalogs
+        # Base recipes plus the overlay files of the active mod profile
+        self.recipe_source = LayeredRecipeSource(scrape_data.DEFAULT_RECIPE_JSON_FILE, read_overlay_profile())
+        self.report_skipped_overlays()
+        self.update_title()
         if os.path.exists(scrape_data.DEFAULT_RECIPE_JSON_FILE):
             self.load_default_recipes()
         else:
-            self.RECIPES = []
+            self.RECIPES = RecipeStore.from_records([])
             self.MATERIALS_DF = pd.DataFrame(columns=['Material', 'Produced', 'Required', 'Requested', 'Satisfied', 'Base Material', 'End Material', 'Tier', 'Section', 'MAM Research', 'Alternate', 'No Unlock'])
 
         # Material selector (top center)
@@ -213,9 +234,16 @@ class App:
         # Frame for button at bottom right
         frame = tk.Frame(self.root)
         frame.place(relx=1.0, rely=1.0, anchor='se')
+        overlays_btn = tk.Button(frame, text="Recipe Overlays", width=15, command=self.choose_recipe_overlays)
+        overlays_btn.pack(pady=(0, 5))
         button = tk.Button(frame, text="Update Recipes", width=15, height=5, command=self.on_update_recipes)
         button.pack()
 
+        # Last demand rows and plan from the previous run (see lib/session_state.py)
+        self.last_plan = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.restore_session()
+
     @staticmethod
     def exception_wrapper(func):
         def wrapper(*args, **kwargs):
@@ -225,53 +253,94 @@ class App:
                 messagebox.showerror("Error", str(e))
         return wrapper
 
+    def restore_session(self):
+        # Restores the demand rows; the last plan is shown without re-solving if its recipes and options still match
+        with profiling.span("session.restore"):
+            session = session_state.read_session(SESSION_FILE)
+            if session is None:
+                return
+            available = set(self.selector.available_materials)
+            for mat, text in session["demand"]:
+                if mat in available:
+                    try:
+                        self.selector.add_material_row(mat, float(text))
+                    except ValueError:
+                        self.selector.add_material_row(mat)
+            plan = session["plan"]
+            if session_state.plan_matches(plan, self.RECIPES.content_hash(), self.selector.user_advanced_options):
+                self.last_plan = plan
+                self.root.after_idle(lambda: self.show_plan(plan))
+
+    def save_session(self):
+        try:
+            session_state.write_session(self.selector.selected_materials.items(), self.last_plan, SESSION_FILE)
+        except OSError as e:
+            # A lost snapshot only costs the next launch its restore
+            print(f"Could not save the session: {e}")
+
+    def on_close(self):
+        self.save_session()
+        self.root.destroy()
+
     def load_default_recipes(self):
-        self.RECIPES = scrape_data.load_recipes_from_json(scrape_data.DEFAULT_RECIPE_JSON_FILE)
-        self.MATERIALS_DF = scrape_data.get_materials_df(self.RECIPES) 
+        # Merged base + overlay recipes; only layers whose files changed are parsed again
+        self.RECIPES = self.recipe_source.merged()
+        self.MATERIALS_DF = scrape_data.get_materials_df(self.RECIPES)
+
+    @exception_wrapper
+    def choose_recipe_overlays(self):
+        file_paths = filedialog.askopenfilenames(
+            title="Select Recipe Overlays (later files take precedence)",
+            filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")]
+        )
+        if not file_paths:
+            if not self.recipe_source.overlays or not messagebox.askyesno(
+                    "Recipe Overlays", "Remove all overlays and use the base recipes only?"):
+                return
+        self.set_recipe_overlays(list(file_paths))
+
+    def set_recipe_overlays(self, overlay_files):
+        # Switching profiles re-parses only the overlay files; the base layer is reused
+        self.recipe_source.set_overlays(overlay_files)
+        write_overlay_profile(self.recipe_source.overlay_files)
+        self.report_skipped_overlays()
+        self.load_default_recipes()
+        self.selector.reset_available_recipes(self.RECIPES, self.MATERIALS_DF)
+        self.update_title()
+
+    def report_skipped_overlays(self):
+        # Overlays that were moved, deleted or unreadable are dropped from the saved profile
+        skipped = self.recipe_source.skipped_overlays
+        if not skipped:
+            return
+        write_overlay_profile(self.recipe_source.overlay_files)
+        messagebox.showwarning("Recipe Overlays", "Skipped overlays that could not be read:\n" +
+                               "\n".join(f"{path}: {error}" for path, error in skipped))
+
+    def update_title(self):
+        overlay_files = self.recipe_source.overlay_files
+        if overlay_files:
+            names = ", ".join(os.path.basename(path) for path in overlay_files)
+            self.root.title(f"Satisfactory Calculator (overlays: {names})")
+        else:
+            self.root.title("Satisfactory Calculator")
+
+    def get_unlock_catalogs(self):
+        # Sorted tier/section, MAM tree/node and alternate catalogs, computed once per recipe-set hash
+        recipe_hash = self.RECIPES.content_hash()
+        if recipe_hash not in self.unlock_catalog_cache:
+            self.unlock_catalog_cache[recipe_hash] = self.RECIPES.unlock_catalogs()
+        return self.unlock_catalog_cache[recipe_hash]
 
     @exception_wrapper
     def open_advanced_options(self):
         cache_dir = CACHE_DIR
-        cache_file = ADVANCED_OPTIONS_FILE
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
 
-        # Gather data from the JSON file directly
-        tier_dict = {}
-        mam_dict = {}
-        alternate_recipes = set()
-
-        for recipe in self.RECIPES:
-            ub = recipe.get('Unlocked by', {})
-            # Tier
-            if ub and isinstance(ub, dict) and ub.get('Tier'):
-                for t in ub['Tier']:
-                    lvl = t.get('Level')
-                    sec = t.get('Section')
-                    if lvl is not None:
-                        tier_dict.setdefault(lvl, set()).add(sec)
-            # MAM
-            if ub and isinstance(ub, dict) and ub.get('MAM Research'):
-                for m in ub['MAM Research']:
-                    tree = m.get('Tree')
-                    node = m.get('Node')
-                    if tree:
-                        mam_dict.setdefault(tree, set()).add(node)
-            # Alternate
-            if ub and isinstance(ub, dict) and ub.get('Alternate'):
-                if ub['Alternate']:
-                    alt_name = recipe.get('Recipe', '')
-                    if alt_name:
-                        alternate_recipes.add(alt_name)
-
-        # Sort tiers and sections
-        sorted_tiers = sorted(tier_dict.keys())
-        tier_sections = {lvl: sorted([s for s in tier_dict[lvl] if s]) for lvl in sorted_tiers}
-        # Sort MAM trees and nodes
-        sorted_trees = sorted(mam_dict.keys())
-        mam_nodes = {tree: sorted([n for n in mam_dict[tree] if n]) for tree in sorted_trees}
-        # Sort alternates
-        alternate_recipes = sorted(list(alternate_recipes))
+        tier_sections, mam_nodes, alternate_recipes = self.get_unlock_catalogs()
+        sorted_tiers = list(tier_sections.keys())
+        sorted_trees = list(mam_nodes.keys())
 
         # Load previous options if exist
         selected = {
@@ -280,13 +349,12 @@ class App:
             'mam': {},
             'alternate': []
         }
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    prev = json.load(f)
-                    selected.update(prev)
-            except Exception:
-                pass
+        try:
+            prev = read_user_advanced_options()
+            if isinstance(prev, dict):
+                selected.update(prev)
+        except Exception:
+            pass
 
         # Create window
         adv_win = tk.Toplevel(self.root)
@@ -355,39 +423,77 @@ class App:
         update_sections()
 
         # --- MAM Research Trees ---
+        # Each tree is a collapsible section; its checkboxes are only created the first time it is expanded
         mam_frame = tk.Frame(content_frame)
         mam_frame.pack(fill='x', pady=10)
         tk.Label(mam_frame, text='MAM Research Trees:', font=('TkDefaultFont', 12, 'bold')).pack(anchor='w', padx=5)
         mam_node_vars = {}
+
+        def toggle_tree(tree, toggle_btn, count_label, node_frame):
+            if tree not in mam_node_vars:
+                # Create columns of checkboxes for nodes
+                mam_node_vars[tree] = {}
+                columns = [mam_nodes[tree][i:i+4] for i in range(0, len(mam_nodes[tree]), 4)]
+                for col in columns:
+                    col_frame = tk.Frame(node_frame)
+                    col_frame.pack(side='left', padx=10, anchor='n')
+                    for node in col:
+                        var = tk.BooleanVar(value=node in selected['mam'].get(tree, []))
+                        cb = tk.Checkbutton(col_frame, text=node, variable=var, anchor='w')
+                        cb.pack(anchor='w')
+                        mam_node_vars[tree][node] = var
+            if node_frame.winfo_manager():
+                node_frame.pack_forget()
+                toggle_btn.config(text=f"\u25b6 {tree}")
+            else:
+                node_frame.pack(fill='x', padx=20, after=count_label)
+                toggle_btn.config(text=f"\u25bc {tree}")
+
         for tree in sorted_trees:
-            tree_label = tk.Label(mam_frame, text=tree, font=('TkDefaultFont', 10, 'bold'))
-            tree_label.pack(anchor='w', padx=10)
+            n_selected = len(set(selected['mam'].get(tree, [])) & set(mam_nodes[tree]))
+            toggle_btn = tk.Button(mam_frame, text=f"\u25b6 {tree}", font=('TkDefaultFont', 10, 'bold'),
+                                   relief='flat', anchor='w')
+            toggle_btn.pack(anchor='w', padx=10)
+            count_label = tk.Label(mam_frame, text=f"{len(mam_nodes[tree])} nodes, {n_selected} selected")
+            count_label.pack(anchor='w', padx=30)
             node_frame = tk.Frame(mam_frame)
-            node_frame.pack(fill='x', padx=20)
-
-            # Create columns of checkboxes for nodes
-            columns = [mam_nodes[tree][i:i+4] for i in range(0, len(mam_nodes[tree]), 4)]
-            for col in columns:
-                col_frame = tk.Frame(node_frame)
-                col_frame.pack(side='left', padx=10, anchor='n')
-                for node in col:
-                    var = tk.BooleanVar(value=node in selected['mam'].get(tree, []))
-                    cb = tk.Checkbutton(col_frame, text=node, variable=var, anchor='w')
-                    cb.pack(anchor='w')
-                    mam_node_vars.setdefault(tree, {})[node] = var
+            toggle_btn.config(command=lambda t=tree, b=toggle_btn, l=count_label, f=node_frame: toggle_tree(t, b, l, f))
 
         # --- Alternate Recipes ---
+        # Selection is tracked in a set so it survives changes to the search filter
         alt_frame = tk.Frame(content_frame)
         alt_frame.pack(fill='x', pady=10)
         tk.Label(alt_frame, text='Alternate Recipes:', font=('TkDefaultFont', 12, 'bold')).pack(anchor='w', padx=5)
-        alt_listbox = tk.Listbox(alt_frame, selectmode='multiple', height=8)
-        for recipe in alternate_recipes:
-            alt_listbox.insert(tk.END, recipe)
+        alt_search_var = tk.StringVar()
+        alt_search_frame = tk.Frame(alt_frame)
+        alt_search_frame.pack(fill='x', padx=10)
+        tk.Label(alt_search_frame, text='Search:').pack(side='left')
+        tk.Entry(alt_search_frame, textvariable=alt_search_var, width=30).pack(side='left', padx=5)
+        alt_listbox = tk.Listbox(alt_frame, selectmode='multiple', height=8, exportselection=False)
         alt_listbox.pack(fill='x', padx=10)
-        # Preselect
-        for i, recipe in enumerate(alternate_recipes):
-            if recipe in selected['alternate']:
-                alt_listbox.selection_set(i)
+        alt_selected = set(selected['alternate']) & set(alternate_recipes)
+        alt_shown = []
+
+        def filter_alternates(*args):
+            search_text = alt_search_var.get().lower()
+            alt_shown[:] = [r for r in alternate_recipes if search_text in r.lower()]
+            alt_listbox.delete(0, tk.END)
+            for i, recipe in enumerate(alt_shown):
+                alt_listbox.insert(tk.END, recipe)
+                if recipe in alt_selected:
+                    alt_listbox.selection_set(i)
+
+        def on_alt_select(event):
+            current = set(alt_listbox.curselection())
+            for i, recipe in enumerate(alt_shown):
+                if i in current:
+                    alt_selected.add(recipe)
+                else:
+                    alt_selected.discard(recipe)
+
+        alt_search_var.trace_add('write', filter_alternates)
+        alt_listbox.bind('<<ListboxSelect>>', on_alt_select)
+        filter_alternates()
 
         # Bind mouse wheel to canvas scrolling
         def _on_mouse_wheel(event):
@@ -421,12 +527,15 @@ class App:
             if 'sections' in section_vars:
                 sec_vars = section_vars['sections']['sec_vars']
                 sel_sections = [sec for sec, var in sec_vars.items() if var.get()]
-            # MAM
+            # MAM (trees never expanded keep their previously saved nodes)
             sel_mam = {}
-            for tree, nodes in mam_node_vars.items():
-                sel_mam[tree] = [node for node, var in nodes.items() if var.get()]
+            for tree in sorted_trees:
+                if tree in mam_node_vars:
+                    sel_mam[tree] = [node for node, var in mam_node_vars[tree].items() if var.get()]
+                else:
+                    sel_mam[tree] = [node for node in mam_nodes[tree] if node in selected['mam'].get(tree, [])]
             # Alternate
-            sel_alt = [alternate_recipes[i] for i in alt_listbox.curselection()]
+            sel_alt = [recipe for recipe in alternate_recipes if recipe in alt_selected]
             # Save
             options = {
                 'tier': int(sel_tier) if sel_tier.isdigit() else None,
@@ -434,8 +543,7 @@ class App:
                 'mam': sel_mam,
                 'alternate': sel_alt
             }
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(options, f, indent=2)
+            write_user_advanced_options(options)
             messagebox.showinfo('Saved', 'Advanced options saved.')
         save_btn = tk.Button(btn_frame, text='Save', width=15, command=save_options)
         save_btn.pack(side='left', padx=40)
@@ -484,10 +592,17 @@ class App:
     def on_update_recipes(self):
         # Get new data (do not overwrite yet)
         temp_json_file = scrape_data.TEMP_RECIPE_JSON_FILE
-        scrape_data.update_recipes_table_from_html(json_file=temp_json_file)
+        parse_report = scrape_data.update_recipes_table_from_html(json_file=temp_json_file)
 
-        # Show diff to user in a scrollable dialog
-        diff_msg = scrape_data.get_recipe_diffs(scrape_data.DEFAULT_RECIPE_JSON_FILE, temp_json_file)
+        # Show diff to user in a scrollable dialog (the same diff is applied in memory if accepted)
+        update = scrape_data.get_recipe_update(scrape_data.DEFAULT_RECIPE_JSON_FILE, temp_json_file)
+        if update is None:
+            diff_msg = scrape_data.get_recipe_diffs(scrape_data.DEFAULT_RECIPE_JSON_FILE, temp_json_file)
+        else:
+            diff_msg = scrape_data.format_recipe_diff(update)
+        if parse_report is not None and parse_report.n_failures:
+            diff_msg += (f"\n\n{parse_report.n_failures} wiki table cells could not be fully parsed "
+                         f"(their recipes may be incomplete):\n" + parse_report.format_failures())
         diff_msg += "\n\nAccept updates?"
 
         result = self.show_scrollable_dialog("Confirm Recipe Updates", diff_msg)
@@ -495,119 +610,210 @@ class App:
         if result:
             # Overwrite file by moving temp file
             shutil.move(temp_json_file, scrape_data.DEFAULT_RECIPE_JSON_FILE)
-            messagebox.showinfo("Success", f"Recipes updated and saved to {scrape_data.DEFAULT_RECIPE_JSON_FILE}.")
-            self.load_default_recipes()
-            self.selector.reset_available_recipes(self.RECIPES, self.MATERIALS_DF)
+            dropped = []
+            # The loaded recipes are the base file itself only without overlays; with overlays a
+            # patched merged view would be written back as the base layer
+            if update is not None and not self.recipe_source.overlays \
+                    and self.RECIPES.names.tolist() == update["old_names"]:
+                dropped = self.apply_recipe_update(update)
+            else:
+                # No previous data in memory to patch (or overlays are merged on top): full reload
+                self.load_default_recipes()
+                self.selector.reset_available_recipes(self.RECIPES, self.MATERIALS_DF)
+            message = f"Recipes updated and saved to {scrape_data.DEFAULT_RECIPE_JSON_FILE}."
+            if dropped:
+                message += "\n\nRemoved demands for materials no longer available:\n" + "\n".join(dropped)
+            messagebox.showinfo("Success", message)
         else:
             messagebox.showinfo("Cancelled", "Updates were cancelled. Old recipes preserved.")
 
+    def apply_recipe_update(self, update) -> list:
+        """
+        Applies an accepted diff (scrape_data.diff_recipe_data) to the loaded recipes in place
+        of a full reload: only added/changed recipes are parsed, only the materials they touch
+        are recomputed, and the demand list is kept. Returns the dropped demand materials.
+        """
+        old = self.RECIPES
+        store, source = old.apply_update(update["names"], update["records"])
+        fresh = np.flatnonzero(source == NO_ID)
+        replaced = np.setdiff1d(np.arange(len(old)), source[source != NO_ID])
+        affected = set(old.row_materials(replaced)) | set(store.row_materials(fresh))
+        self.MATERIALS_DF = scrape_data.update_materials_df(self.MATERIALS_DF, store, affected)
+        self.RECIPES = store
+        self.recipe_source.set_base(store)
+        return self.selector.apply_recipe_update(store, self.MATERIALS_DF, source)
+
     @exception_wrapper
     def calculate_requested(self):
-        # Reset all Requested values to 0.0
-        self.MATERIALS_DF['Requested'] = 0.0
-        # For each selected material, add its float value to Requested
-        for mat in self.selector.selected_materials:
-            name = mat['name']
-            try:
-                val = float(mat['var'].get())
+        profile_mark = profiling.mark() if profiling.is_enabled() else None
+        with profiling.span("calculate.demand"):
+            # Collect the valid (>0) values entered for each selected material
+            names, values = [], []
+            for name, text in self.selector.selected_materials.items():
+                try:
+                    val = float(text)
+                except ValueError:
+                    continue
                 if val > 0:
-                    idx = self.MATERIALS_DF[self.MATERIALS_DF['Material'] == name].index
-                    if len(idx) > 0:
-                        self.MATERIALS_DF.loc[idx, 'Requested'] += val
-            except ValueError:
-                continue
-
-        # Update Satisfied column
-        self.MATERIALS_DF['Satisfied'] = self.MATERIALS_DF['Produced'] >= self.MATERIALS_DF['Required'] + self.MATERIALS_DF['Requested']
+                    names.append(name)
+                    values.append(val)
+            # Sum duplicate rows in one grouped pass and align on the material index (unselected materials reset to 0.0)
+            demand = pd.Series(values, index=names, dtype=float).groupby(level=0).sum()
+            self.MATERIALS_DF['Requested'] = demand.reindex(self.MATERIALS_DF.index, fill_value=0.0)
+
+            # Update Satisfied column
+            self.MATERIALS_DF['Satisfied'] = self.MATERIALS_DF['Produced'] >= self.MATERIALS_DF['Required'] + self.MATERIALS_DF['Requested']
+
+            # Only include materials/recipes currently available to be displayed in the MaterialSelector.
+            # The optimizer only reads these columns, so select them instead of copying the whole frame;
+            # with everything available this is a view of MATERIALS_DF.
+            available_recipes = self.selector.available_recipes
+            available_materials = self.selector.available_materials
+            demand_columns = self.MATERIALS_DF[['Material', 'Requested', 'Required']]
+            available = self.MATERIALS_DF.index.isin(available_materials)
+            filtered_df = demand_columns if available.all() else demand_columns[available]
 
-        # Only include materials/recipes currently available to be displayed in the MaterialSelector
+        # Run recipe optimization
+        solution, total_power, flow_ledger = recipe_op.run_recipe_optimization(filtered_df, available_recipes,
+                                                                               model=self.selector.get_model())
+        self.last_plan = session_state.plan_snapshot(solution, total_power, flow_ledger, self.RECIPES.content_hash(),
+                                                     self.selector.user_advanced_options)
+        with profiling.span("session.save"):
+            self.save_session()
+        self.show_plan(self.last_plan, profile_mark)
+
+    def show_plan(self, plan, profile_mark=None):
+        # Result dialog of a plan_snapshot solved for the currently available recipes
+        solution, total_power, flow_ledger = plan["solution"], plan["total_power"], plan["flow_ledger"]
         available_recipes = self.selector.available_recipes
-        available_materials = self.selector.available_materials
-        filtered_df = self.MATERIALS_DF[self.MATERIALS_DF['Material'].isin(available_materials)].copy()
+        with profiling.span("render.plan_rows"):
+            # One row per used recipe for the result table and exports: (machine, recipe, count, power in MW)
+            plan_rows = recipe_op.plan_rows(available_recipes, solution)
 
-        # Run recipe optimization
-        solution, total_power = recipe_op.run_recipe_optimization(filtered_df, available_recipes)
-
-        # Build mapping from recipe name to machine
-        recipe_to_machine = {}
-        for recipe in self.RECIPES:
-            name = recipe.get('Recipe')
-            produced_in = recipe.get('Produced in', [])
-            if produced_in:
-                recipe_to_machine[name] = produced_in[0].get('Machine', 'Unknown Machine')
-
-        # Group solution by machine
-        machine_groups = {}
-        for recipe, count in solution.items():
-            if count > 0:
-                machine = recipe_to_machine.get(recipe, 'Unknown Machine')
-                machine_groups.setdefault(machine, []).append((recipe, count))
-
-        # Build result string for display and file output (grouped by machine)
-        result_str_display = f"Total Power Consumption: {total_power:.2f} MW\n\n"
-        result_str_file = result_str_display
-        for machine, recipes in machine_groups.items():
-            result_str_display += f"[{machine}]\n"
-            result_str_file += f"[{machine}]\n"
-            for recipe, count in recipes:
-                result_str_display += f"  {recipe}: {count}\n"
-                result_str_file += f"  {recipe}: {count}\n"
-            result_str_display += "\n"
-            result_str_file += "\n"
-
-        # Show scrollable dialog with save option and bold total power
-        def show_optimization_result_dialog():
+        self.show_optimization_result_dialog(total_power, plan_rows, flow_ledger, profile_mark)
+
+    def show_optimization_result_dialog(self, total_power, plan_rows, flow_ledger, profile_mark=None):
+        # Result dialog with bold total power, sortable/filterable virtualized tables and a save option.
+        # With profiling enabled, profile_mark (profiling.mark()) adds a Profile tab for the spans since then.
+        with profiling.span("render.result_dialog", rows=len(plan_rows)):
             dialog = tk.Toplevel(self.root)
             dialog.title("Optimization Result")
-            dialog.geometry("600x500")
+            dialog.geometry("700x550")
             dialog.transient(self.root)
             dialog.grab_set()
 
-            # Text widget with vertical scrollbar
-            text_frame = tk.Frame(dialog)
-            text_frame.pack(fill=tk.BOTH, expand=True)
-            scrollbar = tk.Scrollbar(text_frame)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            text = tk.Text(text_frame, wrap=tk.WORD, yscrollcommand=scrollbar.set)
-            # Insert total power in bold
-            text.tag_configure('bold', font=('TkDefaultFont', 10, 'bold'))
-            text.insert(tk.END, "Total Power Consumption: ", ())
-            text.insert(tk.END, f"{total_power:.2f} MW\n\n", 'bold')
-            text.insert(tk.END, "Optimal Recipe Usage (min power):\n\n")
-            for machine, recipes in machine_groups.items():
-                text.insert(tk.END, f"[{machine}]\n", 'bold')
-                for recipe, count in recipes:
-                    text.insert(tk.END, f"  {recipe}: {count}\n")
-                text.insert(tk.END, "\n")
-            text.config(state=tk.DISABLED)
-            text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            scrollbar.config(command=text.yview)
+            header = tk.Frame(dialog)
+            header.pack(fill=tk.X, padx=10, pady=5)
+            tk.Label(header, text="Total Power Consumption: ").pack(side=tk.LEFT)
+            tk.Label(header, text=f"{total_power:.2f} MW", font=('TkDefaultFont', 10, 'bold')).pack(side=tk.LEFT)
+            filter_var = tk.StringVar()
+            tk.Entry(header, textvariable=filter_var, width=25).pack(side=tk.RIGHT)
+            tk.Label(header, text="Filter:").pack(side=tk.RIGHT, padx=5)
+
+            # Tables only create widgets for the visible rows, so large plans open as fast as small ones
+            notebook = ttk.Notebook(dialog)
+            notebook.pack(fill=tk.BOTH, expand=True, padx=10)
+            recipe_table = VirtualTable(
+                notebook,
+                columns=[("Machine", 150, 'w'), ("Recipe", 250, 'w'), ("Count", 90, 'e'), ("Power (MW)", 100, 'e')],
+                rows=plan_rows,
+                formatters=[str, str, lambda v: f"{v:.4f}", lambda v: f"{v:.2f}"],
+                filter_columns=(0, 1),
+            )
+            recipe_table.sort_by(0)
+            notebook.add(recipe_table, text="Optimal Recipe Usage (min power)")
+            flow_table = VirtualTable(
+                notebook,
+                columns=[("Material", 250, 'w'), ("Produced", 100, 'e'), ("Consumed", 100, 'e'), ("Net", 100, 'e')],
+                rows=list(flow_ledger["materials"][["Material", "Produced", "Consumed", "Net"]].itertuples(index=False, name=None)),
+                formatters=[str] + [lambda v: f"{v:.3f}"] * 3,
+            )
+            notebook.add(flow_table, text="Material Flow (per min)")
+            contribution_table = VirtualTable(
+                notebook,
+                columns=[("Recipe", 220, 'w'), ("Material", 200, 'w'), ("Count", 90, 'e'), ("Rate", 100, 'e')],
+                rows=list(flow_ledger["contributions"][["Recipe", "Material", "Count", "Rate"]].itertuples(index=False, name=None)),
+                formatters=[str, str, lambda v: f"{v:.4f}", lambda v: f"{v:.3f}"],
+                filter_columns=(0, 1),
+            )
+            notebook.add(contribution_table, text="Recipe Contributions (per min)")
+
+            def apply_filter(*args):
+                recipe_table.set_filter(filter_var.get())
+                flow_table.set_filter(filter_var.get())
+                contribution_table.set_filter(filter_var.get())
+            filter_var.trace_add('write', apply_filter)
 
             # Button frame
             btn_frame = tk.Frame(dialog)
             btn_frame.pack(fill=tk.X, pady=10)
             def save_to_file():
+                # The format follows the extension: text report, or JSON/CSV/Parquet for other tools
                 file_path = filedialog.asksaveasfilename(
                     title="Save Optimization Result",
                     defaultextension=".txt",
-                    filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")]
+                    filetypes=[("Text Files", "*.txt"), ("JSON Files", "*.json"), ("CSV Files", "*.csv"),
+                               ("Parquet Files", "*.parquet"), ("All Files", "*.*")]
                 )
                 if file_path:
-                    with open(file_path, "w", encoding="utf-8") as f:
-                        f.write(result_str_file)
+                    try:
+                        plan_export.export_plan(file_path, total_power, plan_rows, flow_ledger)
+                    except Exception as e:
+                        messagebox.showerror("Error", str(e), parent=dialog)
             save_btn = tk.Button(btn_frame, text="Save to File", width=15, command=save_to_file)
             save_btn.pack(side=tk.LEFT, padx=20)
             close_btn = tk.Button(btn_frame, text="Close", width=10, command=dialog.destroy)
             close_btn.pack(side=tk.RIGHT, padx=20)
-            dialog.wait_window()
-
-        show_optimization_result_dialog()
+            dialog.update_idletasks()  # include the first layout pass in the span
+
+        if profile_mark is not None:
+            # Phase timings of this Calculate, from reading the demands to drawing this dialog
+            profile_text = tk.Text(notebook, wrap=tk.NONE, font=("TkFixedFont", 9))
+            profile_text.insert(tk.END, profiling.summary(profile_mark))
+            profile_text.config(state=tk.DISABLED)
+            notebook.add(profile_text, text="Profile")
+            profiling.write_trace(PROFILE_TRACE_FILE, profile_mark)
+        dialog.wait_window()
 
 if __name__ == "__main__":
-    root = tk.Tk()
+    multiprocessing.freeze_support()  # solver workers in the PyInstaller build
+    parser = argparse.ArgumentParser(description="Satisfactory Calculator")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run the local HTTP/JSON solver service instead of the GUI (see lib/solver_service.py)")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Record phase timings; Calculate shows them and writes a Chrome trace to {PROFILE_TRACE_FILE}")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Like --profile, also recording tracemalloc allocations and peak RSS per phase (slower)")
+    parser.add_argument("--sites", metavar="FILE",
+                        help="Solve a multi-site plan (see lib/multi_site.py) and print it instead of starting the GUI")
+    parser.add_argument("--export", metavar="FILE",
+                        help="With --sites, also write the result to FILE (.txt, .json, .csv or .parquet)")
+    args, service_args = parser.parse_known_args()
 
     if not os.path.exists(CACHE_DIR):
         os.makedirs(CACHE_DIR)
-
-    app = App(root)
-    root.mainloop()
+    if args.profile or args.profile_memory:
+        profiling.enable(memory=args.profile_memory)
+
+    if args.serve:
+        # Share the saved advanced-options profile unless --options is given
+        solver_service.main(service_args, default_options=read_user_advanced_options(),
+                            default_overlays=read_overlay_profile())
+    elif args.sites:
+        # Independent site groups are solved in parallel worker processes
+        recipes = load_layered_recipes(scrape_data.DEFAULT_RECIPE_JSON_FILE, read_overlay_profile())
+        result = multi_site.solve_sites(recipes, multi_site.load_sites(args.sites), read_user_advanced_options(),
+                                        workers=os.cpu_count())
+        print(multi_site.format_site_plans(result))
+        if args.export:
+            plan_export.export_sites(args.export, result)
+        if profiling.is_enabled():
+            print(profiling.summary())
+            profiling.write_trace(PROFILE_TRACE_FILE)
+    else:
+        root = tk.Tk()
+        app = App(root)
+        root.mainloop()
+        if profiling.is_enabled():
+            # Whole session, including startup loading (each Calculate overwrites it with its own spans)
+            profiling.write_trace(PROFILE_TRACE_FILE)
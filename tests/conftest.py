@@ -0,0 +1,28 @@
+import os, sys
+import pytest
+
+# Tests import the app modules as the GUI does (lib.*), relative to the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib.recipe_store import RecipeStore
+
+def recipe(name, ingredients, products, power=4.0, unlocked_by=""):
+    # One Appendix A recipe made in a Constructor; ingredients/products are (material, quantity) pairs
+    return {"Recipe": name,
+            "Ingredients": [{"Material": m, "Quantity": q} for m, q in ingredients],
+            "Produced in": [{"Machine": "Constructor", "Pwr Cons": power}],
+            "Products": [{"Material": m, "Quantity": q} for m, q in products],
+            "Unlocked by": unlocked_by}
+
+# Iron and copper chains from ore extraction to plates and wire
+IRON_COPPER_RECIPES = [
+    recipe("Iron Ore Extraction", [], [("Iron Ore", 1.0)], 0.05),
+    recipe("Copper Ore Extraction", [], [("Copper Ore", 1.0)], 0.05),
+    recipe("Iron Ingot", [("Iron Ore", 30)], [("Iron Ingot", 30)]),
+    recipe("Iron Plate", [("Iron Ingot", 30)], [("Iron Plate", 20)]),
+    recipe("Copper Ingot", [("Copper Ore", 30)], [("Copper Ingot", 30)]),
+    recipe("Wire", [("Copper Ingot", 15)], [("Wire", 30)]),
+]
+
+@pytest.fixture(scope="session")
+def iron_copper_store() -> RecipeStore:
+    return RecipeStore.from_records(IRON_COPPER_RECIPES)
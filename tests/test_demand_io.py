@@ -0,0 +1,66 @@
+import json, re
+import pytest
+from lib.demand_io import aggregate_demands, load_demands
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_aggregate_sums_repeats_in_first_seen_order():
+    demands = aggregate_demands([("Wire", "10"), (" Iron Plate ", 5), ("Wire", 2.5)])
+    assert demands == {"Wire": 12.5, "Iron Plate": 5.0}
+    assert list(demands) == ["Wire", "Iron Plate"]
+
+@pytest.mark.parametrize("pairs, message", [
+    ([("", 1)], "entry 1: missing material name"),
+    ([("Wire", 1), (None, 1)], "entry 2: missing material name"),
+    ([("Wire", "lots")], "entry 1 (Wire): amount 'lots' is not a number"),
+    ([("Wire", None)], "amount 'None' is not a number"),
+    ([("Wire", 0)], "amount must be > 0, got 0.0"),
+    ([("Wire", -3)], "amount must be > 0, got -3.0"),
+])
+def test_aggregate_rejects_bad_entries(pairs, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        aggregate_demands(pairs, source="demands.csv: ")
+
+def test_csv_with_and_without_header(tmp_path):
+    assert load_demands(write(tmp_path / "a.csv", "Material,Amount\nWire,10\nScrew,4\nWire,5\n")) == \
+        {"Wire": 15.0, "Screw": 4.0}
+    # Header columns may come in any order; blank lines are skipped
+    assert load_demands(write(tmp_path / "b.csv", "\ufeffquantity,Name\n\n3,Rotor\n")) == {"Rotor": 3.0}
+    # A first row that names no known column is data
+    assert load_demands(write(tmp_path / "c.csv", "Wire,10\nScrew,4\n")) == {"Wire": 10.0, "Screw": 4.0}
+    assert load_demands(write(tmp_path / "d.txt", "Wire, 2\n")) == {"Wire": 2.0}
+    assert load_demands(write(tmp_path / "e.csv", "")) == {}
+
+def test_csv_rejected_inputs(tmp_path):
+    with pytest.raises(ValueError, match="has too few columns"):
+        load_demands(write(tmp_path / "a.csv", "Material,Amount\nWire\n"))
+    # An unknown header is read as data, so its amount is not a number
+    with pytest.raises(ValueError, match=r"a.csv: entry 1 \(Item\): amount 'Count' is not a number"):
+        load_demands(write(tmp_path / "a.csv", "Item,Count\nWire,1\n"))
+
+def test_json_shapes(tmp_path):
+    assert load_demands(write(tmp_path / "a.json", json.dumps({"Wire": 10, "Screw": "4"}))) == \
+        {"Wire": 10.0, "Screw": 4.0}
+    records = [{"Material": "Wire", "Amount": 1}, {"name": "Wire", "Requested": 2},
+               {"material": "Rotor", "Quantity": 3}, {"Name": "Rotor", "rate": 1}]
+    assert load_demands(write(tmp_path / "b.json", json.dumps(records))) == {"Wire": 3.0, "Rotor": 4.0}
+    assert load_demands(write(tmp_path / "c.json", json.dumps([["Wire", 1], ["Wire", 1.5]]))) == {"Wire": 2.5}
+
+@pytest.mark.parametrize("data, message", [
+    ("5", "expected a JSON object or list of demands"),
+    ([{"Material": "Wire"}], "has none of the keys"),
+    ([{"Amount": 1}], "has none of the keys"),
+    ([["Wire", 1, 2]], "unsupported demand entry"),
+    (["Wire"], "unsupported demand entry"),
+    ({"Wire": 0}, "amount must be > 0"),
+])
+def test_json_rejected_inputs(tmp_path, data, message):
+    path = write(tmp_path / "d.json", data if isinstance(data, str) else json.dumps(data))
+    with pytest.raises(ValueError, match=message):
+        load_demands(path)
+
+def test_unsupported_extension(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported demand file type: .xlsx"):
+        load_demands(write(tmp_path / "d.xlsx", ""))
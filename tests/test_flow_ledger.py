@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import lib.recipe_optimization as recipe_op
+from lib.recipe_store import RecipeStore
+from conftest import recipe
+
+STORE = RecipeStore.from_records([
+    recipe("Iron Ore Extraction", [], [("Iron Ore", 1.0)], 0.05),
+    recipe("Iron Ingot", [("Iron Ore", 30)], [("Iron Ingot", 30)]),
+    recipe("Iron Plate", [("Iron Ingot", 30)], [("Iron Plate", 20)]),
+    recipe("Iron Rod", [("Iron Ingot", 15)], [("Iron Rod", 15)]),
+    # Lists Iron Plate and Catalyst as both ingredient and product
+    recipe("Catalyzed Plate", [("Iron Plate", 10), ("Catalyst", 2)], [("Iron Plate", 15), ("Catalyst", 2)]),
+])
+SOLUTION = {"Iron Ore Extraction": 30.0, "Iron Ingot": 1.0, "Iron Plate": 1.0, "Iron Rod": 0.0, "Catalyzed Plate": 2.0}
+
+def test_ledger_totals():
+    ledger = recipe_op.compute_flow_ledger(STORE, SOLUTION)["materials"]
+    rows = {row[0]: tuple(row[1:]) for row in ledger.itertuples(index=False, name=None)}
+    # Materials of unused recipes (Iron Rod) are left out; the self-consumed ones count both ways
+    assert rows == {"Catalyst": (4.0, 4.0, 0.0), "Iron Ingot": (30.0, 30.0, 0.0),
+                    "Iron Ore": (30.0, 30.0, 0.0), "Iron Plate": (50.0, 20.0, 30.0)}
+    assert list(ledger["Material"]) == sorted(rows)
+
+def test_ledger_contributions():
+    contributions = recipe_op.compute_flow_ledger(STORE, SOLUTION)["contributions"]
+    assert sorted(contributions.itertuples(index=False, name=None)) == sorted([
+        ("Iron Ore Extraction", "Iron Ore", 30.0, 30.0),
+        ("Iron Ingot", "Iron Ingot", 1.0, 30.0), ("Iron Ingot", "Iron Ore", 1.0, -30.0),
+        ("Iron Plate", "Iron Plate", 1.0, 20.0), ("Iron Plate", "Iron Ingot", 1.0, -30.0),
+        ("Catalyzed Plate", "Iron Plate", 2.0, 30.0), ("Catalyzed Plate", "Catalyst", 2.0, 4.0),
+        ("Catalyzed Plate", "Iron Plate", 2.0, -20.0), ("Catalyzed Plate", "Catalyst", 2.0, -4.0),
+    ])
+    # Per material, the contributions add up to the ledger's net flow
+    net = contributions.groupby("Material")["Rate"].sum()
+    assert net["Iron Plate"] == pytest.approx(30.0) and net["Catalyst"] == 0.0
+
+def test_counts_take_precedence_over_the_solution():
+    counts = np.array([30.0, 1.0, 1.0, 2.0, 0.0])
+    ledger = recipe_op.compute_flow_ledger(STORE, {}, counts=counts)["materials"]
+    assert set(ledger["Material"]) == {"Iron Ore", "Iron Ingot", "Iron Plate", "Iron Rod"}
+    assert ledger.set_index("Material").loc["Iron Rod", "Produced"] == 30.0
+
+def test_text_tables():
+    flow_ledger = recipe_op.compute_flow_ledger(STORE, SOLUTION)
+    lines = recipe_op.format_flow_ledger(flow_ledger).splitlines()
+    assert lines[0].split() == ["Material", "Produced", "Consumed", "Net"]
+    assert lines[-1].split() == ["Iron", "Plate", "50.000", "20.000", "30.000"]
+    contributions = recipe_op.format_flow_contributions(flow_ledger).splitlines()
+    assert contributions[0].split() == ["Recipe", "Material", "Count", "Rate"]
+    assert contributions[-1].split() == ["Catalyzed", "Plate", "Catalyst", "2.0000", "-4.000"]
+    assert len(contributions) == 1 + 9
+    empty = recipe_op.compute_flow_ledger(STORE, {})
+    assert recipe_op.format_flow_ledger(empty) == "No material flows.\n"
+    assert recipe_op.format_flow_contributions(empty) == "No recipe contributions.\n"
@@ -0,0 +1,42 @@
+import pytest
+import lib.multi_site as multi_site
+
+def test_linked_sites_share_one_block_lp(iron_copper_store):
+    sites = {"sites": [{"name": "Mine", "demand": {}, "resources": {"Iron Ore": 300}},
+                       {"name": "Mall", "demand": {"Iron Plate": 20}, "resources": {}}],
+             "links": [{"from": "Mine", "to": "Mall", "materials": ["Iron Ore", "Iron Ingot"], "capacity": 100}]}
+    result = multi_site.solve_sites(iron_copper_store, sites)
+    assert not result["decomposed"]
+    assert result["sites"]["Mine"]["solution"]["Iron Ore Extraction"] == pytest.approx(30.0)
+    assert result["sites"]["Mall"]["solution"]["Iron Ore Extraction"] == 0.0
+    transfers = result["transfers"]
+    assert transfers["Rate"].sum() == pytest.approx(30.0)
+    assert set(transfers["From"]) == {"Mine"} and set(transfers["To"]) == {"Mall"}
+
+def test_unlinked_sites_are_solved_independently(iron_copper_store):
+    sites = {"sites": [{"name": "A", "demand": {"Iron Plate": 20}}, {"name": "B", "demand": {"Wire": 30}}]}
+    result = multi_site.solve_sites(iron_copper_store, sites, workers=2)
+    assert result["decomposed"]
+    assert result["transfers"].empty
+    assert result["total_power"] == pytest.approx(result["sites"]["A"]["total_power"] + result["sites"]["B"]["total_power"])
+
+def test_world_resource_maximums_couple_independent_sites(iron_copper_store):
+    sites = {"sites": [{"name": "A", "demand": {"Wire": 30}}, {"name": "B", "demand": {"Wire": 30}}]}
+    assert multi_site.solve_sites(iron_copper_store, sites, resource_maximums={"Copper Ore": 30})["decomposed"]
+    with pytest.raises(ValueError, match="No feasible multi-site plan"):
+        multi_site.solve_sites(iron_copper_store, sites, resource_maximums={"Copper Ore": 20})
+
+def test_site_without_local_resources_is_infeasible(iron_copper_store):
+    sites = {"sites": [{"name": "A", "demand": {"Iron Plate": 20}, "resources": {"Copper Ore": 100}}]}
+    with pytest.raises(ValueError, match="No feasible multi-site plan"):
+        multi_site.solve_sites(iron_copper_store, sites)
+
+@pytest.mark.parametrize("sites", [
+    {"sites": []},
+    {"sites": [{"name": "A"}, {"name": "A"}]},
+    {"sites": [{"name": "A", "demand": {"Wire": -1}}]},
+    {"sites": [{"name": "A"}], "links": [{"from": "A", "to": "B"}]},
+])
+def test_invalid_sites_are_rejected(iron_copper_store, sites):
+    with pytest.raises(ValueError):
+        multi_site.validate_sites(sites)
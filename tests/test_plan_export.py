@@ -0,0 +1,72 @@
+import json
+import pandas as pd
+import pytest
+import lib.multi_site as multi_site
+import lib.plan_export as plan_export
+import lib.recipe_optimization as recipe_op
+from lib.recipe_optimization import CompiledRecipeModel
+
+def solved(store):
+    solution, total_power, flow_ledger = CompiledRecipeModel(store).solve_demand({"Iron Plate": 20.0, "Wire": 30.0})
+    return total_power, recipe_op.plan_rows(store, solution), flow_ledger
+
+def test_json_export_matches_the_plan(iron_copper_store, tmp_path):
+    total_power, plan_rows, flow_ledger = solved(iron_copper_store)
+    path = tmp_path / "plan.json"
+    plan_export.export_plan(str(path), total_power, plan_rows, flow_ledger)
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["total_power"] == pytest.approx(total_power)
+    assert [tuple(row.values()) for row in data["plan"]] == [tuple(row) for row in plan_rows]
+    assert data["flow"] == flow_ledger["materials"].to_dict(orient="records")
+    assert data["contributions"] == flow_ledger["contributions"].to_dict(orient="records")
+    assert json.loads(plan_export.plan_json(total_power, plan_rows, flow_ledger)) == data
+
+def test_csv_export_is_one_long_table(iron_copper_store, tmp_path):
+    total_power, plan_rows, flow_ledger = solved(iron_copper_store)
+    path = tmp_path / "plan.csv"
+    plan_export.export_plan(str(path), total_power, plan_rows, flow_ledger)
+    df = pd.read_csv(path)
+    assert list(df.columns) == plan_export.LONG_COLUMNS
+    assert df.loc[df["Table"] == "totals", "Power"].item() == pytest.approx(total_power)
+    plan = df[df["Table"] == "plan"]
+    assert list(plan["Recipe"]) == [row[1] for row in plan_rows]
+    assert plan["Power"].sum() == pytest.approx(total_power)
+    assert (df["Table"] == "flow").sum() == len(flow_ledger["materials"])
+    assert (df["Table"] == "contributions").sum() == len(flow_ledger["contributions"])
+
+def test_text_export_is_the_report(iron_copper_store, tmp_path):
+    total_power, plan_rows, flow_ledger = solved(iron_copper_store)
+    path = tmp_path / "plan.txt"
+    plan_export.export_plan(str(path), total_power, plan_rows, flow_ledger)
+    text = path.read_text(encoding="utf-8")
+    assert text.startswith(f"Total Power Consumption: {total_power:.2f} MW\n\n[Constructor]\n")
+    assert recipe_op.format_flow_ledger(flow_ledger) in text
+    assert text.endswith(recipe_op.format_flow_contributions(flow_ledger))
+
+def test_sites_exports(iron_copper_store, tmp_path):
+    sites = {"sites": [{"name": "Mine", "demand": {}, "resources": {"Iron Ore": 300}},
+                       {"name": "Mall", "demand": {"Iron Plate": 20}, "resources": {}}],
+             "links": [{"from": "Mine", "to": "Mall", "materials": ["Iron Ore"]}]}
+    result = multi_site.solve_sites(iron_copper_store, sites)
+    plan_export.export_sites(str(tmp_path / "sites.json"), result)
+    data = json.loads((tmp_path / "sites.json").read_text(encoding="utf-8"))
+    assert set(data["sites"]) == {"Mine", "Mall"}
+    assert data["transfers"] == result["transfers"].to_dict(orient="records")
+    plan_export.export_sites(str(tmp_path / "sites.csv"), result)
+    df = pd.read_csv(tmp_path / "sites.csv")
+    transfers = df[df["Table"] == "transfers"]
+    assert list(zip(transfers["Site"], transfers["To"])) == [("Mine", "Mall")]
+    assert set(df.loc[df["Table"] == "plan", "Site"]) <= {"Mine", "Mall"}
+
+def test_parquet_export(iron_copper_store, tmp_path):
+    pytest.importorskip("pyarrow")
+    total_power, plan_rows, flow_ledger = solved(iron_copper_store)
+    path = tmp_path / "plan.parquet"
+    plan_export.export_plan(str(path), total_power, plan_rows, flow_ledger)
+    df = pd.read_parquet(path)
+    assert list(df.columns) == plan_export.LONG_COLUMNS
+    assert (df["Table"] == "plan").sum() == len(plan_rows)
+
+def test_unknown_extension():
+    with pytest.raises(ValueError):
+        plan_export.export_format("plan.xlsx")
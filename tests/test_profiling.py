@@ -0,0 +1,28 @@
+import lib.profiling as profiling
+
+def test_disabled_spans_record_nothing():
+    profiling.enable(False)
+    mark = profiling.mark()
+    with profiling.span("phase"):
+        pass
+    assert profiling.spans(mark) == []
+
+def test_memory_spans_carry_nested_peaks():
+    profiling.enable(memory=True)
+    try:
+        mark = profiling.mark()
+        with profiling.span("outer"):
+            with profiling.span("inner"):
+                block = bytearray(4 << 20)
+                del block
+            kept = bytearray(1 << 20)
+        memory = profiling.memory_by_phase(mark)
+        # The inner 4 MiB peak counts for the outer span although it was released before it ended
+        assert memory["inner"][1] >= 4 << 20
+        assert memory["outer"][1] >= 4 << 20
+        assert memory["outer"][0] >= 1 << 20 > memory["inner"][0]
+        assert "Peak KiB" in profiling.summary(mark)
+        del kept
+    finally:
+        profiling.enable(False)
+        profiling.reset()
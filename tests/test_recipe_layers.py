@@ -0,0 +1,83 @@
+import json, os
+import lib.scrape_data as scrape_data
+import lib.recipe_optimization as recipe_op
+from lib.recipe_layers import LayeredRecipeSource, load_layered_recipes, read_overlay_profile
+from conftest import recipe
+
+BASE = [
+    recipe("Iron Ore Extraction", [], [("Iron Ore", 1.0)], 0.05),
+    recipe("Iron Ingot", [("Iron Ore", 30)], [("Iron Ingot", 30)]),
+    recipe("Iron Plate", [("Iron Ingot", 30)], [("Iron Plate", 20)]),
+    recipe("Iron Rod", [("Iron Ingot", 15)], [("Iron Rod", 15)]),
+]
+MOD_A = [
+    recipe("Iron Plate", [("Iron Ingot", 10)], [("Iron Plate", 20)]),  # cheaper override
+    recipe("Mod Gear", [("Iron Rod", 5)], [("Mod Gear", 1)],
+           unlocked_by={"Tier": [{"Level": 1, "Section": "Mod"}], "MAM Research": None, "Alternate": False}),
+]
+MOD_B = [
+    {"Recipe": "Iron Rod", "Removed": True},
+    recipe("Mod Gear", [("Iron Plate", 5)], [("Mod Gear", 2)]),
+]
+
+def write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+def test_later_layers_take_precedence(tmp_path):
+    base = write(tmp_path / "base.json", BASE)
+    mod_a = write(tmp_path / "a.json", MOD_A)
+    mod_b = write(tmp_path / "b.json", MOD_B)
+
+    store = load_layered_recipes(base, [mod_a])
+    assert store.names.tolist() == ["Iron Ore Extraction", "Iron Ingot", "Iron Rod", "Iron Plate", "Mod Gear"]
+    assert store.record(3)["Ingredients"] == [{"Material": "Iron Ingot", "Quantity": 10.0}]
+
+    store = load_layered_recipes(base, [mod_a, mod_b])
+    assert store.names.tolist() == ["Iron Ore Extraction", "Iron Ingot", "Iron Plate", "Mod Gear"]
+    assert store.record(3)["Products"] == [{"Material": "Mod Gear", "Quantity": 2.0}]
+
+def test_merged_view_is_accepted_by_consumers(tmp_path):
+    store = load_layered_recipes(write(tmp_path / "base.json", BASE), [write(tmp_path / "a.json", MOD_A)])
+    materials_df = scrape_data.get_materials_df(store)
+    assert "Mod Gear" in materials_df.index
+    unlocked = store.subset(store.unlocked_mask({"tier": 0, "sections": [], "mam": {}, "alternate": []}))
+    assert "Mod Gear" not in unlocked.names.tolist()
+    materials_df.loc["Iron Plate", "Requested"] = 20.0
+    solution, total_power, _ = recipe_op.run_recipe_optimization(materials_df, store)
+    assert solution["Iron Plate"] == 1.0
+    assert abs(solution["Iron Ingot"] - 1.0 / 3.0) < 1e-6  # the overlay's 10 ingots per plate batch
+
+def test_switching_profiles_keeps_the_base_layer(tmp_path):
+    base = write(tmp_path / "base.json", BASE)
+    mod_a = write(tmp_path / "a.json", MOD_A)
+    mod_b = write(tmp_path / "b.json", MOD_B)
+    source = LayeredRecipeSource(base, [mod_a])
+    base_layer, layer_a = source.base, source.overlays[0]
+    source.set_overlays([mod_b])
+    source.set_overlays([mod_a])
+    assert source.base is base_layer and source.overlays[0] is layer_a
+    assert source.merged().names.tolist()[-1] == "Mod Gear"
+    assert source.origins()["Iron Plate"] == mod_a
+
+    # A modified overlay file is re-read on the next merge
+    write(tmp_path / "a.json", MOD_A[:1])
+    os.utime(mod_a, (layer_a.mtime + 10, layer_a.mtime + 10))
+    assert "Mod Gear" not in source.merged().names.tolist()
+    assert source.base is base_layer
+
+def test_missing_or_broken_overlays_are_skipped(tmp_path):
+    base = write(tmp_path / "base.json", BASE)
+    mod_a = write(tmp_path / "a.json", MOD_A)
+    broken = tmp_path / "broken.json"
+    broken.write_text("[{", encoding="utf-8")
+    source = LayeredRecipeSource(base, [str(tmp_path / "moved.json"), mod_a, str(broken)])
+    assert source.overlay_files == [mod_a]
+    assert [path for path, _ in source.skipped_overlays] == [str(tmp_path / "moved.json"), str(broken)]
+    assert source.merged().names.tolist()[-1] == "Mod Gear"
+
+    profile = tmp_path / "overlays.json"
+    profile.write_text("{not json", encoding="utf-8")
+    assert read_overlay_profile(str(profile)) == []
+    profile.write_text('{"a": 1}', encoding="utf-8")
+    assert read_overlay_profile(str(profile)) == []
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+import lib.scrape_data as scrape_data
+from lib.recipe_store import RecipeStore
+from benchmarks.synthetic_recipes import generate_recipes
+from conftest import recipe
+
+def unlock(tier=None, mam=None, alternate=False):
+    return {"Tier": [{"Level": tier[0], "Section": tier[1]}] if tier else None,
+            "MAM Research": [{"Tree": mam[0], "Node": mam[1]}] if mam else None,
+            "Alternate": alternate}
+
+def locked(name, unlocked_by, product=None):
+    return recipe(name, [("Iron Ore", 1.0)], [(product or name, 1.0)], unlocked_by=unlocked_by)
+
+RECIPES = generate_recipes(300, seed=5) + [
+    locked("Onboarding Part", ""),
+    locked("Tier Or MAM Part", unlock(tier=(2, "Logistics"), mam=("Caterium", "Quickwire"))),
+    locked("Alternate Only Part Alternate", unlock(alternate=True), product="Onboarding Part"),
+    locked("Tier Alternate", unlock(tier=(1, "Field Research"), alternate=True), product="Tier Or MAM Part"),
+    locked("MAM Alternate", unlock(mam=("Caterium", "Quickwire"), alternate=True), product="Tier Or MAM Part"),
+    locked("Section Only", {"Tier": [{"Level": None, "Section": "Loose"}], "MAM Research": None, "Alternate": False}),
+]
+
+OPTIONS = [
+    {},
+    {"tier": 0, "sections": [], "mam": {}, "alternate": []},
+    {"tier": 2, "sections": ["Logistics", "Tier 2 Section 1"], "mam": {}, "alternate": ["Tier Alternate"]},
+    {"tier": None, "sections": [], "mam": {"Caterium": ["Quickwire"], "Research 1": ["Research 1 Node 2"]},
+     "alternate": ["MAM Alternate", "Alternate Only Part Alternate"]},
+    {"tier": 5, "sections": ["Tier 5 Section 1"], "mam": {"Research 2": ["Research 2 Node 1", "Research 2 Node 7"]},
+     "alternate": [r["Recipe"] for r in RECIPES if "Alternate" in r["Recipe"]][::2]},
+]
+
+def list_unlocked(recipes, options):
+    # The list-of-dicts unlock filter that RecipeStore.unlocked_mask replaced
+    tier = options.get("tier")
+    sections = options.get("sections", [])
+    mam = options.get("mam", {})
+    alternate = options.get("alternate", [])
+    unlocked = []
+    for r in recipes:
+        ub = r.get("Unlocked by", {})
+        if not ub:
+            unlocked.append(r["Recipe"])
+            continue
+        if ub.get("Alternate"):
+            if not (alternate and r["Recipe"] in alternate):
+                continue
+        if tier is None and not mam:
+            unlocked.append(r["Recipe"])
+            continue
+        if tier is not None and ub.get("Tier"):
+            t = ub["Tier"][0]
+            lvl, sec = t.get("Level"), t.get("Section")
+            if lvl is not None and (lvl < tier or (lvl == tier and sec in sections)):
+                unlocked.append(r["Recipe"])
+                continue
+        if mam and ub.get("MAM Research"):
+            m = ub["MAM Research"][0]
+            if m.get("Tree") in mam and m.get("Node") in mam[m.get("Tree")]:
+                unlocked.append(r["Recipe"])
+    return unlocked
+
+def list_material_unlocks(recipes):
+    # Material -> (tier levels, MAM conditions, alternates, no unlock) as the list-of-dicts get_materials_df built them
+    conditions = {}
+    for r in recipes:
+        ub = r.get("Unlocked by", {})
+        for prod in r["Products"]:
+            c = conditions.setdefault(prod["Material"], {"Tier": [], "MAM Research": [], "Alternate": [], "no": not ub})
+            if not ub:
+                c["no"] = True
+                continue
+            c["Tier"] += [t["Level"] for t in ub.get("Tier") or [] if t["Level"] is not None]
+            c["MAM Research"] += ub.get("MAM Research") or []
+            if ub.get("Alternate"):
+                c["Alternate"].append(r["Recipe"])
+    return conditions
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_unlocked_mask_matches_the_list_filter(options):
+    store = RecipeStore.from_records(RECIPES)
+    assert store.names[store.unlocked_mask(options)].tolist() == list_unlocked(RECIPES, options)
+
+def test_materials_df_unlock_columns_match_the_list_version():
+    df = scrape_data.get_materials_df(RecipeStore.from_records(RECIPES))
+    conditions = list_material_unlocks(RECIPES)
+    materials = {m["Material"] for r in RECIPES for m in r["Ingredients"] + r["Products"]}
+    assert sorted(df.index) == sorted(materials)
+    for mat, row in df.iterrows():
+        c = conditions.get(mat, {"Tier": [], "MAM Research": [], "Alternate": [], "no": True})
+        assert (pd.isna(row["Tier"]) and not c["Tier"]) or row["Tier"] == min(c["Tier"]), mat
+        assert row["MAM Research"] == bool(c["MAM Research"]), mat
+        assert row["Alternate"] == bool(c["Alternate"]), mat
+        assert row["No Unlock"] == c["no"], mat
+    assert df.loc["Onboarding Part", "No Unlock"] and df.loc["Onboarding Part", "Alternate"]
+    assert df.loc["Tier Or MAM Part", "Tier"] == 1 and df.loc["Tier Or MAM Part", "MAM Research"]
+
+def test_records_round_trip():
+    store = RecipeStore.from_records(RECIPES)
+    records = store.to_records()
+    assert RecipeStore.from_records(records).to_records() == records
+    by_name = {r["Recipe"]: r for r in records}
+    assert by_name["Onboarding Part"]["Unlocked by"] == ""
+    assert by_name["Tier Or MAM Part"]["Unlocked by"] == unlock(tier=(2, "Logistics"), mam=("Caterium", "Quickwire"))
+    assert by_name["Section Only"]["Unlocked by"]["Tier"] == [{"Level": None, "Section": "Loose"}]
+    for original in RECIPES[:20]:
+        assert by_name[original["Recipe"]]["Products"] == original["Products"]
+        assert by_name[original["Recipe"]]["Ingredients"] == original["Ingredients"]
+
+def test_subset_and_concat():
+    store = RecipeStore.from_records(RECIPES)
+    records = store.to_records()
+    rows = np.arange(len(store))[::3]
+    mask = np.zeros(len(store), dtype=bool)
+    mask[rows] = True
+    assert store.subset(rows).to_records() == [records[i] for i in rows]
+    assert store.subset(mask).to_records() == [records[i] for i in rows]
+    assert store.subset(rows).materials is store.materials
+
+    first, second = store.subset(np.arange(100)), store.subset(np.arange(100, len(store)))
+    assert RecipeStore.concat([first, second]).to_records() == records
+    with pytest.raises(ValueError):
+        RecipeStore.concat([first, RecipeStore.from_records(RECIPES[:5])])
@@ -0,0 +1,53 @@
+import copy
+import numpy as np
+import pandas as pd
+import lib.scrape_data as scrape_data
+import lib.recipe_optimization as recipe_op
+from lib.recipe_store import RecipeStore, NO_ID
+from conftest import recipe
+
+OLD = [
+    recipe("Iron Ore Extraction", [], [("Iron Ore", 1.0)], 0.05),
+    recipe("Iron Ingot", [("Iron Ore", 30)], [("Iron Ingot", 30)]),
+    recipe("Iron Plate", [("Iron Ingot", 30)], [("Iron Plate", 20)]),
+    recipe("Iron Rod", [("Iron Ingot", 15)], [("Iron Rod", 15)]),
+    recipe("Screw", [("Iron Rod", 10)], [("Screw", 40)]),
+]
+
+def updated():
+    new = copy.deepcopy(OLD)
+    new[2]["Products"][0]["Quantity"] = 25                            # changed
+    del new[4]                                                         # removed
+    new.append(recipe("Steel Ingot", [("Iron Ore", 45), ("Coal", 45)], [("Steel Ingot", 45)], 16.0))
+    new.append(recipe("Coal Extraction", [], [("Coal", 1.0)], 0.05))  # added
+    return new
+
+def test_apply_update_matches_a_fresh_load():
+    new = updated()
+    diff = scrape_data.diff_recipe_data(OLD, new)
+    assert diff["added"] == ["Coal Extraction", "Steel Ingot"] and diff["removed"] == ["Screw"]
+    assert list(diff["changes"]) == ["Iron Plate"]
+    assert sum(record is not None for record in diff["records"]) == 3
+
+    old_store = RecipeStore.from_records(OLD)
+    store, source = old_store.apply_update(diff["names"], diff["records"])
+    fresh = RecipeStore.from_records(new)
+    assert store.to_records() == fresh.to_records()
+    assert store.content_hash() == fresh.content_hash()
+
+    replaced = np.setdiff1d(np.arange(len(old_store)), source[source != NO_ID])
+    affected = set(old_store.row_materials(replaced)) | set(store.row_materials(np.flatnonzero(source == NO_ID)))
+    materials_df = scrape_data.update_materials_df(scrape_data.get_materials_df(old_store), store, affected)
+    pd.testing.assert_frame_equal(materials_df, scrape_data.get_materials_df(fresh))
+
+def test_model_apply_update_matches_a_fresh_compile():
+    diff = scrape_data.diff_recipe_data(OLD, updated())
+    old_store = RecipeStore.from_records(OLD)
+    store, source = old_store.apply_update(diff["names"], diff["records"])
+    model = recipe_op.CompiledRecipeModel(old_store).apply_update(store, source)
+    reference = recipe_op.CompiledRecipeModel(store)
+    for got, expected in zip(model.entries, reference.entries):
+        np.testing.assert_array_equal(got, expected)
+    solution, total_power, _ = model.solve_demand({"Iron Plate": 25, "Steel Ingot": 45})
+    assert solution == reference.solve_demand({"Iron Plate": 25, "Steel Ingot": 45})[0]
+    assert solution["Steel Ingot"] == 1.0
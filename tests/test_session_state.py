@@ -0,0 +1,54 @@
+import gzip
+import pandas as pd
+import lib.session_state as session_state
+from lib.recipe_store import RecipeStore
+from lib.recipe_optimization import CompiledRecipeModel
+
+RECIPES = [
+    {"Recipe": "Iron Ingot", "Ingredients": [{"Material": "Iron Ore", "Quantity": 30}],
+     "Produced in": [{"Machine": "Smelter", "Pwr Cons": 4}], "Products": [{"Material": "Iron Ingot", "Quantity": 30}],
+     "Unlocked by": ""},
+    {"Recipe": "Iron Plate", "Ingredients": [{"Material": "Iron Ingot", "Quantity": 30}],
+     "Produced in": [{"Machine": "Constructor", "Pwr Cons": 4}], "Products": [{"Material": "Iron Plate", "Quantity": 20}],
+     "Unlocked by": ""},
+    {"Recipe": "Iron Ore Extraction", "Ingredients": [],
+     "Produced in": [{"Machine": "Resource Extraction", "Pwr Cons": 0.05}], "Products": [{"Material": "Iron Ore", "Quantity": 60}],
+     "Unlocked by": ""},
+]
+
+def solved_plan(options=-1):
+    store = RecipeStore.from_records(RECIPES)
+    solution, total_power, flow_ledger = CompiledRecipeModel(store).solve_demand({"Iron Plate": 20.0})
+    return store, session_state.plan_snapshot(solution, total_power, flow_ledger, store.content_hash(), options)
+
+def test_round_trip(tmp_path):
+    session_file = str(tmp_path / "session.json.gz")
+    store, plan = solved_plan()
+    session_state.write_session([("Iron Plate", "20"), ("Iron Ingot", "")], plan, session_file)
+    session = session_state.read_session(session_file)
+    assert session["demand"] == [("Iron Plate", "20"), ("Iron Ingot", "")]
+    restored = session["plan"]
+    assert restored["solution"] == plan["solution"] and "Iron Ore Extraction" in restored["solution"]
+    assert restored["total_power"] == plan["total_power"]
+    for name, df in plan["flow_ledger"].items():
+        pd.testing.assert_frame_equal(restored["flow_ledger"][name], df)
+    assert session_state.plan_matches(restored, store.content_hash(), -1)
+    assert session_state.plan_matches(restored, store.content_hash(), None)
+
+def test_plan_only_matches_same_recipes_and_options(tmp_path):
+    store, plan = solved_plan({"tier": 2, "sections": [], "mam": {}, "alternate": []})
+    assert session_state.plan_matches(plan, store.content_hash(), {"alternate": [], "mam": {}, "sections": [], "tier": 2})
+    assert not session_state.plan_matches(plan, store.content_hash(), -1)
+    other = RecipeStore.from_records(RECIPES[:1] + RECIPES[2:])
+    assert not session_state.plan_matches(plan, other.content_hash(), {"tier": 2, "sections": [], "mam": {}, "alternate": []})
+
+def test_unreadable_snapshots_are_ignored(tmp_path):
+    session_file = tmp_path / "session.json.gz"
+    assert session_state.read_session(str(session_file)) is None
+    session_file.write_bytes(b"not gzip")
+    assert session_state.read_session(str(session_file)) is None
+    with gzip.open(session_file, "wt", encoding="utf-8") as f:
+        f.write('{"version": 0, "demand": []}')
+    assert session_state.read_session(str(session_file)) is None
+    session_state.write_session([("Iron Plate", "5")], None, str(session_file))
+    assert session_state.read_session(str(session_file)) == {"demand": [("Iron Plate", "5")], "plan": None}
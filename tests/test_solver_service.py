@@ -0,0 +1,86 @@
+import asyncio, json
+import pytest
+from lib.solver_service import SolverService
+from conftest import recipe
+
+RECIPES = [
+    recipe("Iron Ore Extraction", [], [("Iron Ore", 1.0)], 0.05),
+    recipe("Iron Ingot", [("Iron Ore", 30)], [("Iron Ingot", 30)]),
+    recipe("Iron Plate", [("Iron Ingot", 30)], [("Iron Plate", 20)]),
+    # X and Y only make each other, so any demand on them is infeasible
+    recipe("X", [("Y", 1)], [("X", 1)]),
+    recipe("Y", [("X", 1)], [("Y", 1)]),
+]
+
+@pytest.fixture
+def recipe_file(tmp_path):
+    path = tmp_path / "recipes.json"
+    path.write_text(json.dumps(RECIPES), encoding="utf-8")
+    return str(path)
+
+async def request(port, method, path, body=None, headers=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode("utf-8") if body is not None and not isinstance(body, bytes) else (body or b"")
+    head = {"Content-Length": str(len(data))} if body is not None else {}
+    head.update(headers or {})
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n".encode("ascii") +
+                 "".join(f"{k}: {v}\r\n" for k, v in head.items()).encode("ascii") + b"\r\n" + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status_line, _, rest = response.partition(b"\r\n")
+    payload = rest.split(b"\r\n\r\n", 1)[1]
+    return int(status_line.split()[1]), json.loads(payload)
+
+def run_with_service(recipe_file, scenario):
+    async def main():
+        service = SolverService(recipe_file, options=-1, port=0, workers=1)
+        port = await service.start()
+        try:
+            return await scenario(port)
+        finally:
+            await service.stop()
+    return asyncio.run(main())
+
+def test_health_and_solve(recipe_file):
+    async def scenario(port):
+        health = await request(port, "GET", "/health")
+        solved = await request(port, "POST", "/solve", {"demand": {"Iron Plate": 20}})
+        return health, solved
+    (health_status, health), (solve_status, solved) = run_with_service(recipe_file, scenario)
+    assert health_status == 200
+    assert health["status"] == "ok" and health["recipes"] == len(RECIPES)
+    assert solve_status == 200
+    counts = {row["Recipe"]: row["Count"] for row in solved["plan"]}
+    assert counts["Iron Plate"] == pytest.approx(1.0)
+    assert counts["Iron Ingot"] == pytest.approx(1.0)
+    assert {"flow", "contributions", "timings"} <= set(solved)
+    assert solved["coalesced"] is False
+
+def test_concurrent_identical_solves_are_coalesced(recipe_file):
+    async def scenario(port):
+        body = {"demand": {"Iron Plate": 40}}
+        return await asyncio.gather(*[request(port, "POST", "/solve", body) for _ in range(4)])
+    results = run_with_service(recipe_file, scenario)
+    assert all(status == 200 for status, _ in results)
+    assert any(payload["coalesced"] for _, payload in results)
+    assert len({payload["total_power"] for _, payload in results}) == 1
+
+@pytest.mark.parametrize("body, headers", [
+    (b"{not json", None),
+    ({"demand": []}, None),
+    ({"demand": {"Iron Plate": -1}}, None),
+    ({"demand": {"Unobtainium": 1}}, None),
+    ({"demand": {"X": 1}}, None),  # infeasible X <-> Y cycle
+    ({"demand": {"Iron Plate": 1}, "options": {"tier": "x"}}, None),
+    ({"demand": {"Iron Plate": 1}, "options": {"sections": "HUB"}}, None),
+    ({"demand": {"Iron Plate": 1}, "options": {"mam": {"Caterium": "Quickwire"}}}, None),
+    ({"demand": {"Iron Plate": 1}, "options": "all"}, None),
+    ({"demand": {"Iron Plate": 1}}, {"Content-Length": "abc"}),
+])
+def test_bad_requests_return_400(recipe_file, body, headers):
+    async def scenario(port):
+        return await request(port, "POST", "/solve", body, headers)
+    status, payload = run_with_service(recipe_file, scenario)
+    assert status == 400
+    assert payload["error"]
@@ -0,0 +1,46 @@
+import pulp
+from benchmarks.synthetic_recipes import generate_recipes, end_materials, mutate_recipes
+from benchmarks.bench_scaling import find_regressions
+from lib.recipe_store import RecipeStore
+from lib.recipe_optimization import CompiledRecipeModel
+import lib.scrape_data as scrape_data
+
+def test_generator_is_deterministic_appendix_a():
+    recipes = generate_recipes(500, seed=3)
+    assert recipes == generate_recipes(500, seed=3)
+    assert len(recipes) == 500
+    assert len({r["Recipe"] for r in recipes}) == 500
+    for r in recipes:
+        assert set(r) == set(scrape_data.DEFAULT_RECIPE_DF_COLS)
+        assert r["Products"] and r["Produced in"][0]["Pwr Cons"] > 0
+
+def test_generator_controls():
+    recipes = generate_recipes(1000, fan_in=3.0, fan_out=1.0, cycle_density=0.1, alternate_ratio=0.3)
+    alternates = [r for r in recipes if r["Unlocked by"] and r["Unlocked by"]["Alternate"]]
+    cycles = [r for r in recipes if r["Recipe"].startswith("Recycled")]
+    parts = [r for r in recipes if r["Ingredients"] and r not in alternates and r not in cycles]
+    assert len(alternates) == 300 and len(cycles) == 100
+    assert all(len(r["Products"]) == 1 for r in parts)
+    mean_fan_in = sum(len(r["Ingredients"]) for r in parts) / len(parts)
+    assert 2.5 < mean_fan_in < 3.5
+
+def test_generated_set_solves():
+    recipes = generate_recipes(300)
+    model = CompiledRecipeModel(RecipeStore.from_records(recipes))
+    demand = {mat: 10.0 for mat in end_materials(recipes)}
+    solution, total_power, flow_ledger = model.solve_demand(demand, pulp.PULP_CBC_CMD(msg=False))
+    assert total_power > 0
+    produced = flow_ledger["materials"].set_index("Material")
+    for mat in demand:
+        assert produced.loc[mat, "Net"] >= 10.0 - 1e-6
+
+def test_mutated_set_diff():
+    recipes = generate_recipes(1000)
+    diff = scrape_data.diff_recipe_data(recipes, mutate_recipes(recipes))
+    assert len(diff["added"]) == len(diff["removed"]) == len(diff["changes"]) == 10
+
+def test_find_regressions():
+    baselines = {"100": {"load": 0.010, "solve": 0.001}}
+    results = {100: {"load": 0.030, "solve": 0.003, "diff": 1.0}}
+    # solve is 3x slower but within timer noise; diff has no baseline
+    assert find_regressions(results, baselines, 0.5) == [(100, "load", 0.010, 0.030)]
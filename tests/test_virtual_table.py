@@ -0,0 +1,41 @@
+from lib.virtual_table import VirtualDemandList
+
+def demand_list(visible_rows=3):
+    # The list model without widgets (no display is needed)
+    dl = VirtualDemandList.__new__(VirtualDemandList)
+    dl.demands, dl.order, dl.position, dl.stale, dl.offset = {}, [], {}, 0, 0
+    dl.slots = [None] * visible_rows
+    dl._render = lambda: None
+    return dl
+
+def test_removed_and_re_added_names():
+    dl = demand_list()
+    for i in range(6):
+        dl.add(f"M{i}", i + 1)
+    dl.remove("M4")
+    dl.remove("M1")
+    dl.add("M1", 7)
+    dl.add("M2", 1)
+    assert dl.demands == {"M0": "1", "M2": "4", "M3": "4", "M5": "6", "M1": "7"}
+    assert dl.stale == 2  # removals do not rebuild the order list
+    dl.offset = 0
+    assert dl._visible_names() == ["M0", "M2", "M3"]
+    dl.offset = len(dl.order)
+    assert dl._visible_names() == ["M3", "M5", "M1"]
+    dl._compact()
+    assert dl.order == ["M0", "M2", "M3", "M5", "M1"] and dl.stale == 0
+
+def test_compaction_is_amortized():
+    dl = demand_list()
+    n = 1000
+    for i in range(n):
+        dl.add(f"M{i}")
+    compactions = 0
+    for i in range(n - 1):
+        order = dl.order
+        dl.remove(f"M{i}")
+        compactions += dl.order is not order
+        names = dl._visible_names()
+        assert len(names) == min(3, n - i - 1) and all(name in dl.demands for name in names)
+    assert compactions < 10
+    assert dl.demands == {f"M{n - 1}": ""}
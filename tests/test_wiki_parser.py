@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+import lib.scrape_data as scrape_data
+import lib.wiki_parser as wiki_parser
+from benchmarks.bench_parser import read_corpus, parse_cells, corpus_report, WIKI_CELLS
+
+CORPUS = read_corpus()
+
+@pytest.mark.parametrize("column", list(WIKI_CELLS))
+def test_corpus_parses_as_stored(column):
+    entries = [e for e in CORPUS if e["column"] == column]
+    report = wiki_parser.ParseReport()
+    parsed = parse_cells(column, [e["cell"] for e in entries], [e.get("recipe") for e in entries], report)
+    failed = {row for row, _, _ in report.failures.get(column, [])}
+    assert parsed == [e["expected"] for e in entries]
+    assert [i in failed for i in range(len(entries))] == [e["failed"] for e in entries]
+
+def test_unparsed_cells_are_reported():
+    report = corpus_report(CORPUS)
+    for column, failures in report.failures.items():
+        for _, cell, reason in failures:
+            assert reason in ("no material", "unmatched text", "bad number", "no machine",
+                              "unknown power", "unmatched", "empty"), (column, cell)
+    # Every cell that parsed to nothing is either empty or a failure
+    for e in CORPUS:
+        if e["column"] in ("Ingredients", "Products") and not e["expected"]:
+            assert e["failed"] or not scrape_data.scrub_table_data(e["cell"])
+        if e["column"] == "Produced in" and not e["expected"]:
+            assert e["failed"]
+    assert "Unmatched formats:" in report.format_report()
+
+def test_per_cell_functions_match_the_columns():
+    for e in CORPUS:
+        cell = scrape_data.scrub_table_data(e["cell"])
+        if e["column"] == "Unlocked by":
+            assert scrape_data.parse_unlocked_by(scrape_data.scrub_table_data(e["recipe"]), cell) == e["expected"]
+        elif e["column"] == "Produced in":
+            assert scrape_data.parse_machine_and_power(cell) == e["expected"]
+        else:
+            assert scrape_data.parse_materials(cell) == e["expected"]
+
+def test_cell_formats():
+    power = scrape_data.MACHINE_POWER_CONSUMPTION
+    assert wiki_parser.parse_machine_cell("Particle Accelerator 8 sec 250 - 1,500 MW", power) == \
+        ([{"Machine": "Particle Accelerator", "Pwr Cons": 1500.0}], "sec power range", None)
+    assert wiki_parser.parse_machine_cell("Constructor 4 sec", power) == \
+        ([{"Machine": "Constructor", "Pwr Cons": power["Constructor"]}], "sec", None)
+    assert wiki_parser.parse_machine_cell("Fabricator 4 sec", power)[2] == "unknown power"
+    assert wiki_parser.parse_materials_cell("6 x Iron Plate30 / min12 x Screw60 / min")[0] == \
+        [{"Material": "Iron Plate", "Quantity": 30.0}, {"Material": "Screw", "Quantity": 60.0}]
+    assert wiki_parser.parse_materials_cell("6 x Iron Plate30 / min junk")[2] == "unmatched text"
+    assert wiki_parser.parse_unlocked_cell("Silica", "Tier 5 - Oil Processing OR MAM Quartz - Silica")[0] == \
+        {"Tier": [{"Level": 5, "Section": "Oil Processing"}],
+         "MAM Research": [{"Tree": "Quartz", "Node": "Silica"}], "Alternate": False}
+    assert wiki_parser.parse_unlocked_cell("Iron Ingot", "Onboarding") == ("", "onboarding", None)
+    assert wiki_parser.parse_unlocked_cell("Cast Screw Alternate", "Hard Drive")[2] is None
+    assert wiki_parser.parse_unlocked_cell("Iron Plate", np.nan)[2] == "empty"
+
+def test_recipe_table():
+    table = pd.DataFrame({
+        "Recipe": ["Iron Plate", "Iron Rod Alternate", "Xeno-Zapper", "Mystery"],
+        "Ingredients": ["3 × Iron Ingot\xa030 / min", "1 × Steel Ingot\xa010 / min", "Craft Bench × 4", "1 x Ore 1 / min"],
+        "Produced in": ["Constructor 6 sec", "Constructor 6 sec", "Equipment Workshop × 10", "Teleporter"],
+        "Products": ["2 × Iron Plate\xa020 / min", "4 × Iron Rod\xa040 / min", "1 × Xeno-Zapper", "1 x Thing 1 / min"],
+        "Unlocked by": ["Tier 0 - HUB Upgrade 2", np.nan, "Tier 1 - Equipment", "Quest"],
+        "Extra": [1, 2, 3, 4],
+    })
+    df, report = wiki_parser.parse_recipe_table(table, scrape_data.MACHINE_POWER_CONSUMPTION)
+    assert list(df.columns) == scrape_data.DEFAULT_RECIPE_DF_COLS
+    assert df["Recipe"].tolist() == ["Iron Plate", "Iron Rod Alternate", "Mystery"]
+    assert df["Ingredients"].iloc[0] == [{"Material": "Iron Ingot", "Quantity": 30.0}]
+    assert df["Unlocked by"].iloc[1] == {"Tier": None, "MAM Research": None, "Alternate": True}
+    assert df["Produced in"].iloc[2] == []
+    assert report.formats["Produced in"]["dropped (empty)"] == 1
+    assert report.failures == {"Produced in": [("Mystery", "Teleporter", "no machine")],
+                               "Unlocked by": [("Mystery", "Quest", "unmatched")]}
+    assert "Mystery: Produced in no machine: 'Teleporter'" in report.format_failures()